@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import crud, schemas
 from app.api import deps
+from app.core.serialization import FastJSONResponse
 from app.schemas.response import Status, SuccessfulResponse
 
 router = APIRouter()
@@ -46,21 +47,20 @@ async def create_update_chart(
         )
         return schemas.SuccessfulChartCreateResponse(id=chart.id, status=Status.ok)
 
-    chart = await crud.chart.get(db=db, id=int(chartId))
-    if not chart:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chart not found")
-    chart = await crud.chart.update(
+    charts = await crud.chart.update_where(
         db=db,
-        db_obj=chart,
         obj_in=schemas.ChartUpdate(
-            ownerSource=clientId,
-            ownerId=userId,
             name=chartName,
             symbol=symbol,
             resolution=resolution,
             content=json.loads(content),
         ),
+        id=int(chartId),
+        ownerSource=clientId,
+        ownerId=userId,
     )
+    if not charts:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chart not found")
     return schemas.SuccessfulChartUpdateDeleteResponse(status=Status.ok)
 
 
@@ -108,13 +108,19 @@ async def read_charts(
     )
     if not chart:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chart not found")
-    return schemas.ChartGet(
-        id=chart.id,
-        name=chart.name,
-        symbol=chart.symbol,
-        resolution=chart.resolution,
-        timestamp=time.mktime(chart.lastModified.timetuple()),
-        content=chart.content,
+    # Serialize the JSONB content in one pass instead of validating and re-encoding it
+    return FastJSONResponse(
+        SuccessfulResponse(
+            data=schemas.ChartGet.construct(
+                id=chart.id,
+                name=chart.name,
+                symbol=chart.symbol,
+                resolution=chart.resolution,
+                timestamp=int(time.mktime(chart.lastModified.timetuple())),
+                content=chart.content,
+            ),
+            status=Status.ok,
+        )
     )
 
 
@@ -129,11 +135,9 @@ async def delete_chart(
     """
     Delete an chart.
     """
-    # TODO: Two time query
-    chart = await crud.chart.get_by_id_owner(
-        db=db, id=chartId, ownerSource=clientId, ownerId=userId
+    charts = await crud.chart.remove_where(
+        db=db, id=int(chartId), ownerSource=clientId, ownerId=userId
     )
-    if not chart:
+    if not charts:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chart not found")
-    chart = await crud.chart.remove(db=db, id=chartId)
     return schemas.SuccessfulChartUpdateDeleteResponse(status=Status.ok)
@@ -84,13 +84,11 @@ async def delete_drawing_template(
     """
     Delete an drawing_template.
     """
-    # TODO: Two time query
-    drawing_template = await crud.drawing_template.get_by_owner_tool_name(
+    drawing_templates = await crud.drawing_template.remove_where(
         db=db, ownerSource=clientId, ownerId=userId, tool=tool, name=name
     )
-    if not drawing_template:
+    if not drawing_templates:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Drawing template not found"
         )
-    drawing_template = await crud.drawing_template.remove(db=db, id=drawing_template.id)
     return schemas.SuccessfulDrawingTemplateUpdateDeleteResponse(status=Status.ok)
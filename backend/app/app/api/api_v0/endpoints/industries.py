@@ -8,7 +8,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app import crud, models, schemas
 from app.api import deps
 from app.schemas.response import Status, SuccessfulResponse
-from app.utils import get_limit_offset
+from app.utils import create_keyset_page, get_keyset, get_limit_offset, KeysetPage, KeysetParams
 
 router = APIRouter()
 
@@ -43,6 +43,25 @@ async def read_industries(
     return SuccessfulResponse(data=create_page(industries, total, params), status=Status.ok)
 
 
+@router.get("/cursor", response_model=SuccessfulResponse[KeysetPage[schemas.Industry]])
+async def read_industries_cursor(
+    db: AsyncSession = Depends(deps.get_db),
+    params: KeysetParams = Depends(),
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Retrieve industries by cursor.
+    """
+    after_id, before_id, size = get_keyset(params)
+
+    industries, has_more = await crud.industry.get_multi_keyset(
+        db, after_id=after_id, before_id=before_id, limit=size
+    )
+    total = await crud.industry.get_total(db, params.total)
+    page = create_keyset_page(industries, params, has_more=has_more, total=total)
+    return SuccessfulResponse(data=page, status=Status.ok)
+
+
 @router.get("/{id}", response_model=SuccessfulResponse[schemas.Industry])
 async def read_industry(
     *,
@@ -53,7 +72,7 @@ async def read_industry(
     """
     Get industry by ID.
     """
-    industry = await crud.industry.get(db=db, id=id)
+    industry = await crud.industry.get_cached(db, id=id)
     if not industry:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Industry not found")
     return SuccessfulResponse(data=industry, status=Status.ok)
@@ -70,10 +89,10 @@ async def update_industry(
     """
     Update an industry.
     """
-    industry = await crud.industry.get(db=db, id=id)
-    if not industry:
+    industries = await crud.industry.update_where(db=db, obj_in=industry_in, id=id)
+    if not industries:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Industry not found")
-    industry = await crud.industry.update(db=db, db_obj=industry, obj_in=industry_in)
+    industry = industries[0]
     return SuccessfulResponse(data=industry, status=Status.ok)
 
 
@@ -87,13 +106,8 @@ async def delete_industry(
     """
     Delete an industry.
     """
-    # TODO: Two time query
-
-    industry = await crud.industry.get(db=db, id=id)
-
-    if not industry:
+    industries = await crud.industry.remove_where(db=db, id=id)
+    if not industries:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Industry not found")
-
-    industry = await crud.industry.remove(db=db, id=id)
-
+    industry = industries[0]
     return SuccessfulResponse(data=industry, status=Status.ok)
@@ -70,10 +70,10 @@ async def update_item(
     """
     Update an item.
     """
-    item = await crud.item.get(db=db, id=id)
-    if not item:
+    items = await crud.item.update_where(db=db, obj_in=item_in, id=id)
+    if not items:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found")
-    item = await crud.item.update(db=db, db_obj=item, obj_in=item_in)
+    item = items[0]
     return SuccessfulResponse(data=item, status=Status.ok)
 
 
@@ -87,13 +87,8 @@ async def delete_item(
     """
     Delete an item.
     """
-    # TODO: Two time query
-
-    item = await crud.item.get(db=db, id=id)
-
-    if not item:
+    items = await crud.item.remove_where(db=db, id=id)
+    if not items:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found")
-
-    item = await crud.item.remove(db=db, id=id)
-
+    item = items[0]
     return SuccessfulResponse(data=item, status=Status.ok)
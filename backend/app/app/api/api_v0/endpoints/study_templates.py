@@ -89,13 +89,11 @@ async def delete_study_template(
     """
     Delete an study_template.
     """
-    # TODO: Two time query
-    study_template = await crud.study_template.get_by_owner_name(
+    study_templates = await crud.study_template.remove_where(
         db=db, ownerSource=clientId, ownerId=userId, name=templateName
     )
-    if not study_template:
+    if not study_templates:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Study template not found"
         )
-    study_template = await crud.study_template.remove(db=db, id=study_template.id)
     return schemas.SuccessfulStudyTemplateUpdateDeleteResponse(status=Status.ok)
@@ -5,10 +5,10 @@ from fastapi_pagination.api import create_page, resolve_params
 from fastapi_pagination.default import Page, Params
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app import crud, models, schemas
+from app import crud, datafeed, models, schemas
 from app.api import deps
 from app.schemas.response import Status, SuccessfulResponse
-from app.utils import get_limit_offset
+from app.utils import create_keyset_page, get_keyset, get_limit_offset, KeysetPage, KeysetParams
 
 router = APIRouter()
 
@@ -19,11 +19,13 @@ async def create_ticker(
     db: AsyncSession = Depends(deps.get_db),
     ticker_in: schemas.TickerCreate,
     current_user: models.User = Depends(deps.get_current_active_user),
+    symbol_info: datafeed.SymbolInfoCache = Depends(deps.get_symbol_info_cache),
 ) -> Any:
     """
     Create new ticker.
     """
     ticker = await crud.ticker.create(db=db, obj_in=ticker_in)
+    await symbol_info.invalidate()
     return SuccessfulResponse(data=ticker, status=Status.ok)
 
 
@@ -43,6 +45,25 @@ async def read_tickers(
     return SuccessfulResponse(data=create_page(tickers, total, params), status=Status.ok)
 
 
+@router.get("/cursor", response_model=SuccessfulResponse[KeysetPage[schemas.Ticker]])
+async def read_tickers_cursor(
+    db: AsyncSession = Depends(deps.get_db),
+    params: KeysetParams = Depends(),
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Retrieve tickers by cursor.
+    """
+    after_id, before_id, size = get_keyset(params)
+
+    tickers, has_more = await crud.ticker.get_multi_keyset(
+        db, after_id=after_id, before_id=before_id, limit=size
+    )
+    total = await crud.ticker.get_total(db, params.total)
+    page = create_keyset_page(tickers, params, has_more=has_more, total=total)
+    return SuccessfulResponse(data=page, status=Status.ok)
+
+
 @router.get("/{id}", response_model=SuccessfulResponse[schemas.Ticker])
 async def read_ticker(
     *,
@@ -53,7 +74,7 @@ async def read_ticker(
     """
     Get ticker by ID.
     """
-    ticker = await crud.ticker.get(db=db, id=id)
+    ticker = await crud.ticker.get_cached(db, id=id)
     if not ticker:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ticker not found")
     return SuccessfulResponse(data=ticker, status=Status.ok)
@@ -66,14 +87,16 @@ async def update_ticker(
     id: int,
     ticker_in: schemas.TickerUpdate,
     current_user: models.User = Depends(deps.get_current_active_user),
+    symbol_info: datafeed.SymbolInfoCache = Depends(deps.get_symbol_info_cache),
 ) -> Any:
     """
     Update an ticker.
     """
-    ticker = await crud.ticker.get(db=db, id=id)
-    if not ticker:
+    tickers = await crud.ticker.update_where(db=db, obj_in=ticker_in, id=id)
+    if not tickers:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ticker not found")
-    ticker = await crud.ticker.update(db=db, db_obj=ticker, obj_in=ticker_in)
+    ticker = tickers[0]
+    await symbol_info.invalidate()
     return SuccessfulResponse(data=ticker, status=Status.ok)
 
 
@@ -83,17 +106,15 @@ async def delete_ticker(
     db: AsyncSession = Depends(deps.get_db),
     id: int,
     current_user: models.User = Depends(deps.get_current_active_user),
+    symbol_info: datafeed.SymbolInfoCache = Depends(deps.get_symbol_info_cache),
 ) -> Any:
     """
     Delete an ticker.
     """
-    # TODO: Two time query
-
-    ticker = await crud.ticker.get(db=db, id=id)
-
-    if not ticker:
+    tickers = await crud.ticker.remove_where(db=db, id=id)
+    if not tickers:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ticker not found")
-
-    ticker = await crud.ticker.remove(db=db, id=id)
+    ticker = tickers[0]
+    await symbol_info.invalidate()
 
     return SuccessfulResponse(data=ticker, status=Status.ok)
@@ -1,13 +1,30 @@
+import asyncio
 import math
 import time
-from typing import Any, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
+import anyio
 import httpx
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Response,
+    status,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from redis.exceptions import RedisError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app import crud, schemas
+from app import crud, datafeed, schemas
 from app.api import deps
+from app.core.serialization import dumps, FastJSONResponse
+from app.core.settings import settings
 
 router = APIRouter()
 
@@ -59,7 +76,7 @@ async def get_config() -> Any:
             schemas.tradingview.SymbolType(name="Crypto", value="crypto"),
         ],
         supports_search=True,
-        supports_group_request=False,
+        supports_group_request=True,
     )
 
 
@@ -68,11 +85,15 @@ async def get_config() -> Any:
     response_model=schemas.tradingview.LibrarySymbolInfo,
     response_model_exclude_none=True,
 )
-async def get_symbols(*, db: AsyncSession = Depends(deps.get_db), symbol: str) -> Any:
+async def get_symbols(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    symbol: str,
+) -> Any:
     """
     Get tradingview symbols
     """
-    ticker = await crud.ticker.get_by_ticker(db=db, ticker=symbol)
+    ticker = await crud.ticker.get_cached(db, ticker=symbol)
     if not ticker:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ticker not found")
     return schemas.tradingview.LibrarySymbolInfo(
@@ -80,22 +101,22 @@ async def get_symbols(*, db: AsyncSession = Depends(deps.get_db), symbol: str) -
         full_name=ticker.short_name,
         ticker=ticker.ticker,
         description=ticker.full_name,
-        type="stock" if ticker.type == schemas.TickerType.vn_stock else "crypto",
-        session="0900-1130,1300-1500" if ticker.type == schemas.TickerType.vn_stock else "24x7",
+        type=datafeed.symbol_type(ticker.type),
+        session=datafeed.symbol_session(ticker.type),
         exchange=ticker.exchange,
         listed_exchange=ticker.exchange,
-        timezone="Asia/Ho_Chi_Minh" if ticker.type == schemas.TickerType.vn_stock else "UTC",
+        timezone=datafeed.symbol_timezone(ticker.type),
         format=schemas.SeriesFormat.price,
         pricescale=100,
         minmov=1,
         minmove2=0,
-        supported_resolutions=["1", "5", "15", "30", "60", "D", "W", "M"],
+        supported_resolutions=datafeed.SUPPORTED_RESOLUTIONS,
         has_daily=True,
         has_empty_bars=False,
         has_intraday=True,
         has_no_volume=False,
         has_weekly_and_monthly=True,
-        intraday_multipliers=["1", "5", "15", "30", "60"],
+        intraday_multipliers=datafeed.INTRADAY_MULTIPLIERS,
     )
 
 
@@ -106,37 +127,36 @@ async def get_symbols(*, db: AsyncSession = Depends(deps.get_db), symbol: str) -
 )
 async def get_search(
     *,
-    db: AsyncSession = Depends(deps.get_db),
     limit: int,
     query: str,
     type: Optional[str] = Query(""),
     exchange: Optional[str] = Query(""),
+    symbol_index: datafeed.SymbolIndex = Depends(deps.get_symbol_index),
 ) -> Any:
     """
     Get tradingview search
+
+    Served from the in-memory symbol index: ticker prefix, then short and full name substring.
     """
-    tickers = await crud.ticker.search_by_ticker(
-        db=db,
-        ticker=query,
-        limit=limit,
-        type=None if (type is None or type == "") else schemas.TickerType[type],
-        exchange=None if (exchange is None or exchange == "") else schemas.TickerExchange[exchange],
-    )
+    records = symbol_index.search(query, limit, type=type or None, exchange=exchange or None)
     return [
         schemas.SearchSymbolResultItem(
-            symbol=ticker.ticker,
-            full_name=ticker.short_name,
-            description=ticker.full_name,
-            exchange=ticker.exchange,
-            ticker=ticker.ticker,
-            type="stock" if ticker.type == schemas.TickerType.vn_stock else "crypto",
+            symbol=record.ticker,
+            full_name=record.short_name,
+            description=record.full_name,
+            exchange=record.exchange,
+            ticker=record.ticker,
+            type=record.type,
         )
-        for ticker in tickers
+        for record in records
     ]
 
 
 @router.get(
-    "/history", response_model=schemas.tradingview.HistoryResponse, response_model_exclude_none=True
+    "/history",
+    response_model=schemas.tradingview.HistoryResponse,
+    response_model_exclude_none=True,
+    responses={200: {"content": {datafeed.BARS_MEDIA_TYPE: {}}}},
 )
 async def get_history(
     symbol: str,
@@ -144,46 +164,218 @@ async def get_history(
     from_time: int = Query(..., alias="from"),
     to_time: int = Query(..., alias="to"),
     countback: Optional[int] = Query(None),
+    accept: Optional[str] = Header(None),
+    history: datafeed.HistoryService = Depends(deps.get_history_service),
 ) -> Any:
     """
     Get tradingview history
+
+    With `Accept: application/octet-stream` the bars are returned as little-endian typed arrays,
+    see `datafeed.encode_bars`.
+    """
+    try:
+        bars = await history.get_history(symbol, resolution, from_time, to_time, countback)
+    except (httpx.HTTPError, ValueError) as e:
+        return schemas.tradingview.HistoryErrorResponse(s="error", errmsg=str(e))
+
+    binary = accept is not None and datafeed.BARS_MEDIA_TYPE in accept
+    if not len(bars):
+        next_time = await history.get_next_time(symbol, resolution, from_time - 1)
+        if binary:
+            return Response(
+                content=datafeed.encode_bars(bars, next_time),
+                media_type=datafeed.BARS_MEDIA_TYPE,
+                headers={"Vary": "Accept"},
+            )
+        return schemas.tradingview.HistoryNoDataResponse(s="no_data", nextTime=next_time)
+
+    # Bypass response model validation, the columns are built from typed arrays
+    if binary:
+        return Response(
+            content=datafeed.encode_bars(bars),
+            media_type=datafeed.BARS_MEDIA_TYPE,
+            headers={"Vary": "Accept"},
+        )
+    return Response(
+        content=datafeed.bars_json(bars), media_type="application/json", headers={"Vary": "Accept"}
+    )
+
+
+async def _send_updates(websocket: WebSocket, client: datafeed.StreamClient) -> None:
+    try:
+        while True:
+            for (symbol, resolution), bar in await client.get():
+                await websocket.send_text(
+                    dumps(
+                        {"type": "bar", "symbol": symbol, "resolution": resolution, "bar": bar}
+                    ).decode()
+                )
+    except (WebSocketDisconnect, RuntimeError):
+        # Closed while sending
+        pass
+
+
+@router.websocket("/stream")
+async def stream(
+    websocket: WebSocket, hub: datafeed.StreamHub = Depends(deps.get_stream_hub)
+) -> None:
+    """
+    Stream live bars for TradingView subscribeBars
+
+    Send `{"action": "subscribe" | "unsubscribe", "symbol": ..., "resolution": ...}` to manage
+    subscriptions; every update is a `{"type": "bar", "symbol", "resolution", "bar"}` message
+    with the current bar of the subscription. Slow clients only get the latest bar.
+    """
+    await websocket.accept()
+    client = datafeed.StreamClient()
+    sender = asyncio.ensure_future(_send_updates(websocket, client))
+    try:
+        while True:
+            try:
+                request = schemas.tradingview.StreamRequest.parse_raw(
+                    await websocket.receive_text()
+                )
+                if request.action == schemas.tradingview.StreamAction.subscribe:
+                    await hub.subscribe(client, request.symbol, request.resolution)
+                else:
+                    await hub.unsubscribe(client, request.symbol, request.resolution)
+            except (ValidationError, ValueError, RedisError) as e:
+                await websocket.send_text(dumps({"type": "error", "message": str(e)}).decode())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        await hub.remove(client)
+
+
+def _sse_event(event: str, data: Any) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+def _parse_bar_keys(bars: str) -> List[Tuple[str, str]]:
+    keys = []
+    for item in filter(None, bars.split(",")):
+        symbol, _, resolution = item.rpartition(":")
+        if not symbol:
+            raise ValueError(f"Invalid bar subscription {item!r}, expected SYMBOL:RESOLUTION")
+        keys.append((symbol, datafeed.normalize_resolution(resolution)))
+    return keys
+
+
+def _update_events(
+    client: datafeed.StreamClient, updates: List[Tuple[Tuple[str, str], Dict[str, Any]]]
+) -> List[bytes]:
+    """Events with the changed fields of `updates`, none for unchanged subscriptions."""
+    events = []
+    for key, value in updates:
+        delta = client.delta(key, value)
+        if delta is None:
+            continue
+        symbol, name = key
+        if name == datafeed.QUOTE:
+            events.append(_sse_event("quote", {"symbol": symbol, "quote": delta}))
+        else:
+            events.append(_sse_event("bar", {"symbol": symbol, "resolution": name, "bar": delta}))
+    return events
+
+
+async def _subscribe_all(
+    hub: datafeed.StreamHub,
+    client: datafeed.StreamClient,
+    bars: List[Tuple[str, str]],
+    quotes: List[str],
+) -> None:
+    for symbol, resolution in bars:
+        await hub.subscribe(client, symbol, resolution)
+    for symbol in quotes:
+        await hub.subscribe_quote(client, symbol)
+
+
+async def _stream_events(
+    hub: datafeed.StreamHub,
+    client: datafeed.StreamClient,
+    bars: List[Tuple[str, str]],
+    quotes: List[str],
+) -> AsyncIterator[bytes]:
+    try:
+        # Reconnect after 5 seconds when the connection drops
+        yield b"retry: 5000\n\n"
+        try:
+            await _subscribe_all(hub, client, bars, quotes)
+        except RedisError as e:
+            yield _sse_event("error", {"message": str(e)})
+            return
+
+        interval = 1.0 / settings.STREAM_MAX_FREQUENCY
+        while True:
+            events = _update_events(client, await client.get(settings.STREAM_KEEPALIVE_INTERVAL))
+            if not events:
+                yield b": keep-alive\n\n"
+                continue
+            yield b"".join(events)
+            # Updates of the next `interval` are coalesced into one event per subscription
+            await asyncio.sleep(interval)
+    finally:
+        # Runs when the client disconnects, in the cancelled response task
+        with anyio.CancelScope(shield=True):
+            await hub.remove(client)
+
+
+@router.get(
+    "/stream/sse",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def stream_events(
+    bars: str = Query(""),
+    quotes: str = Query(""),
+    hub: datafeed.StreamHub = Depends(deps.get_stream_hub),
+) -> Any:
     """
+    Stream live bars and quotes as Server-Sent Events, for clients that can not use `/stream`
 
-    headers = {
-        "Accept": "application/json, text/plain, */*",
-        "Accept-Language": "vi,en;q=0.9",
-        "Connection": "keep-alive",
-        "Sec-Fetch-Dest": "empty",
-        "Sec-Fetch-Mode": "cors",
-        "Sec-Fetch-Site": "same-origin",
-        "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36",  # noqa: B950
-        "sec-ch-ua": '"Not?A_Brand";v="8", "Chromium";v="108", "Google Chrome";v="108"',
-        "sec-ch-ua-mobile": "?0",
-        "sec-ch-ua-platform": '"Linux"',
-    }
-
-    params = {
-        "resolution": resolution,
-        "symbol": symbol,
-        "from": str(from_time),
-        "to": str(to_time),
-    }
-
-    async with httpx.AsyncClient(http2=True) as client:
-        response = await client.get(
-            "https://iboard.ssi.com.vn/dchart/api/history",
-            params=params,
-            headers=headers,
+    `bars` is a comma-separated list of `SYMBOL:RESOLUTION` and `quotes` of symbols. Events are
+    `bar` (`{"symbol", "resolution", "bar"}`) and `quote` (`{"symbol", "quote"}`), with the
+    fields that changed since the previous event of the subscription; a new bar is sent whole.
+    Every subscription gets at most `STREAM_MAX_FREQUENCY` events per second.
+    """
+    try:
+        bar_keys = _parse_bar_keys(bars)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    quote_symbols = list(filter(None, quotes.split(",")))
+    count = len(bar_keys) + len(quote_symbols)
+    if not count or count > settings.STREAM_MAX_SUBSCRIPTIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Expected 1 to {settings.STREAM_MAX_SUBSCRIPTIONS} subscriptions",
         )
-        results = response.json()
-        return results
+
+    return StreamingResponse(
+        _stream_events(hub, datafeed.StreamClient(), bar_keys, quote_symbols),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/symbol_info")
-async def get_symbol_info() -> Any:
+async def get_symbol_info(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    group: str,
+    symbol_info: datafeed.SymbolInfoCache = Depends(deps.get_symbol_info_cache),
+) -> Any:
     """
-    Get tradingview symbol info
+    Get tradingview symbol info of a group (exchange), in columnar form
     """
+    try:
+        exchange = schemas.TickerExchange(group)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Group not found")
+    content = await symbol_info.get(
+        exchange.value, lambda: crud.ticker.get_by_exchange(db=db, exchange=exchange)
+    )
+    return Response(content=content, media_type="application/json")
 
 
 @router.get("/marks")
@@ -205,8 +397,38 @@ async def get_timescale_marks(
     """
 
 
-@router.get("/quotes")
-async def get_quotes() -> Any:
+@router.get(
+    "/quotes",
+    response_model=schemas.tradingview.QuotesResponse,
+    response_model_exclude_none=True,
+)
+async def get_quotes(
+    symbols: str,
+    quotes: datafeed.QuoteTable = Depends(deps.get_quote_table),
+) -> Any:
     """
     Get tradingview quotes
+
+    `symbols` is comma-separated, an `EXCHANGE:` prefix is ignored. Quotes are served from the
+    live quote table; the symbols it does not hold yet are loaded with batched upstream calls.
     """
+    names = list(dict.fromkeys(filter(None, symbols.split(","))))
+    if not names or len(names) > settings.QUOTES_MAX_SYMBOLS:
+        return schemas.tradingview.QuotesErrorResponse(
+            s="error", errmsg=f"Expected 1 to {settings.QUOTES_MAX_SYMBOLS} symbols"
+        )
+
+    tickers = [name.rpartition(":")[2] for name in names]
+    table = await quotes.get_many(tickers)
+    # Bypass response model validation, the values come from the quote table
+    return FastJSONResponse(
+        content={
+            "s": "ok",
+            "d": [
+                {"s": "ok", "n": name, "v": table[ticker]}
+                if ticker in table
+                else {"s": "error", "n": name, "v": {}}
+                for name, ticker in zip(names, tickers)
+            ],
+        }
+    )
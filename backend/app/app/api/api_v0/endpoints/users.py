@@ -8,8 +8,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import crud, models, schemas
 from app.api import deps
+from app.core.oidc import IdentityCache
 from app.schemas.response import Status, SuccessfulResponse
-from app.utils import get_limit_offset
+from app.utils import create_keyset_page, get_keyset, get_limit_offset, KeysetPage, KeysetParams
 
 router = APIRouter()
 
@@ -30,12 +31,32 @@ async def read_users(
     return SuccessfulResponse(data=create_page(users, total, params), status=Status.ok)
 
 
+@router.get("/cursor", response_model=SuccessfulResponse[KeysetPage[schemas.User]])
+async def read_users_cursor(
+    db: AsyncSession = Depends(deps.get_db),
+    params: KeysetParams = Depends(),
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Retrieve users by cursor.
+    """
+    after_id, before_id, size = get_keyset(params)
+
+    users, has_more = await crud.user.get_multi_keyset(
+        db, after_id=after_id, before_id=before_id, limit=size
+    )
+    total = await crud.user.get_total(db, params.total)
+    page = create_keyset_page(users, params, has_more=has_more, total=total)
+    return SuccessfulResponse(data=page, status=Status.ok)
+
+
 @router.put("/me", response_model=SuccessfulResponse[schemas.User])
 async def update_user_me(
     *,
     db: AsyncSession = Depends(deps.get_db),
     full_name: str = Body(None),
     current_user: models.User = Depends(deps.get_current_active_user),
+    identity_cache: IdentityCache = Depends(deps.get_identity_cache),
 ) -> Any:
     """
     Update own user.
@@ -45,6 +66,7 @@ async def update_user_me(
     if full_name is not None:
         user_in.full_name = full_name
     user = await crud.user.update(db, db_obj=current_user, obj_in=user_in)
+    await identity_cache.invalidate_user(user.id)
     return SuccessfulResponse(data=user, status=Status.ok)
 
 
@@ -93,6 +115,7 @@ async def update_user(
     user_id: int,
     user_in: schemas.UserUpdate,
     current_user: models.User = Depends(deps.get_current_active_user),
+    identity_cache: IdentityCache = Depends(deps.get_identity_cache),
 ) -> Any:
     """
     Update a user.
@@ -104,4 +127,6 @@ async def update_user(
             detail="The user with this username does not exist in the system",
         )
     user = await crud.user.update(db, db_obj=user, obj_in=user_in)
+    # Deactivation or any other change applies to the next request of the user
+    await identity_cache.invalidate_user(user.id)
     return SuccessfulResponse(data=user, status=Status.ok)
@@ -1,9 +1,10 @@
-from typing import Any
+from typing import Any, Dict
 
 from fastapi import APIRouter, Depends
 
 from app import models, schemas
 from app.api import deps
+from app.core.reference_cache import ReferenceCache
 from app.schemas.response import Status, SuccessfulResponse
 from app.tasks import task_crawl_ticker
 
@@ -24,6 +25,17 @@ async def test_celery(
     return SuccessfulResponse(data={"msg": "Word received"}, status=Status.ok)
 
 
+@router.get("/reference-cache", response_model=SuccessfulResponse[Dict[str, Dict[str, int]]])
+async def read_reference_cache_stats(
+    current_user: models.User = Depends(deps.get_current_active_user),
+    reference_cache: ReferenceCache = Depends(deps.get_reference_cache),
+) -> Any:
+    """
+    Hits, shared hits and misses of the reference data cache of this worker, per table.
+    """
+    return SuccessfulResponse(data=reference_cache.stats, status=Status.ok)
+
+
 # Calling this endpoint to see if the setup works. If yes, an error message will show in Sentry dashboard
 @router.get("/test-sentry")
 async def test_sentry() -> None:  # sourcery skip: raise-specific-error
@@ -1,4 +1,4 @@
-from typing import AsyncGenerator, Optional
+from typing import Any, AsyncGenerator, Dict, Optional, Tuple
 
 from authlib.integrations.base_client import BaseOAuth
 from authlib.integrations.starlette_client.apps import StarletteOAuth1App, StarletteOAuth2App
@@ -6,15 +6,30 @@ from authlib.integrations.starlette_client.integration import StarletteIntegrati
 from authlib.oidc.core import UserInfo
 from fastapi import Depends, FastAPI, HTTPException, Request, status
 from fastapi.openapi.models import OpenIdConnect as OpenIdConnectModel
+from fastapi.requests import HTTPConnection
 from fastapi.security.base import SecurityBase
 from fastapi.security.utils import get_authorization_scheme_param
 from httpx import HTTPStatusError
 from influxdb_client.client.influxdb_client_async import InfluxDBClientAsync
+from jose.exceptions import JWTError
 from pydantic import ValidationError
+from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
 from app import crud, models, schemas
+from app.core.http_client import HttpClients
+from app.core.oidc import Identity, IdentityCache, TokenVerifier
+from app.core.reference_cache import ReferenceCache
 from app.core.settings import settings
+from app.datafeed import (
+    BarStore,
+    HistoryService,
+    QuoteTable,
+    StreamHub,
+    SymbolIndex,
+    SymbolInfoCache,
+)
 from app.db.session import async_session
 
 
@@ -139,9 +154,36 @@ async def get_db() -> AsyncGenerator:
         await session.commit()
 
 
-async def get_userinfo_from_token(accessToken: str) -> schemas.OIDCUser:
+async def get_token_verifier(request: Request) -> TokenVerifier:
+    """
+    Dependency function that yields the oidc access token verifier
+    """
+    if not hasattr(request.app.state, "token_verifier"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="token_verifier attribute not set on app state",
+        )
+    return request.app.state.token_verifier
+
+
+async def get_identity_cache(request: Request) -> IdentityCache:
+    """
+    Dependency function that yields the access token identity cache
+    """
+    if not hasattr(request.app.state, "identity_cache"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="identity_cache attribute not set on app state",
+        )
+    return request.app.state.identity_cache
+
+
+async def fetch_userinfo_fallback(accessToken: str) -> Optional[Dict[str, Any]]:
+    """Userinfo of the token from the identity provider, if `OIDC_USERINFO_FALLBACK` is set."""
+    if not settings.OIDC_USERINFO_FALLBACK:
+        return None
     try:
-        userInfo = await oauth.stockk_oidc.fetch_userinfo(access_token=accessToken)
+        return await oauth.stockk_oidc.fetch_userinfo(access_token=accessToken)
     except HTTPStatusError as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -149,6 +191,24 @@ async def get_userinfo_from_token(accessToken: str) -> schemas.OIDCUser:
             headers={"WWW-Authenticate": "Bearer"},
         ) from e
 
+
+async def get_userinfo_from_token(
+    accessToken: str, tokenVerifier: TokenVerifier
+) -> Tuple[schemas.OIDCUser, Optional[float]]:
+    """OIDC user of the token, and the unix time it expires at if known."""
+    try:
+        userInfo = await tokenVerifier.verify(accessToken)
+    except JWTError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        ) from e
+
+    # Opaque tokens, or no signing keys yet, can only be checked by the identity provider
+    if userInfo is None:
+        userInfo = await fetch_userinfo_fallback(accessToken)
+
     if not userInfo:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -162,12 +222,14 @@ async def get_userinfo_from_token(accessToken: str) -> schemas.OIDCUser:
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
         ) from e
-    return oidcUser
+    return oidcUser, userInfo.get("exp")
 
 
 async def get_current_user_from_oidc(
     db: AsyncSession = Depends(get_db),
     tokenOidc: Optional[str] = Depends(reusable_oidc),
+    tokenVerifier: TokenVerifier = Depends(get_token_verifier),
+    identityCache: IdentityCache = Depends(get_identity_cache),
 ) -> models.User:
     if tokenOidc is None:
         raise HTTPException(
@@ -176,16 +238,38 @@ async def get_current_user_from_oidc(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    oidcUser = await get_userinfo_from_token(tokenOidc)
+    identity = await identityCache.get(tokenOidc)
+    if identity is not None:
+        # Detached row, a session only loads it again if it is added to one
+        user = models.User(**identity.user)
+        make_transient_to_detached(user)
+        return user
+
+    oidcUser, expiresAt = await get_userinfo_from_token(tokenOidc, tokenVerifier)
     user, _ = await crud.user.get_or_create_by_email(
         db, email=oidcUser.email, full_name=oidcUser.name
     )
+    await identityCache.set(
+        tokenOidc,
+        Identity(
+            oidc_user=oidcUser.dict(),
+            user={
+                "id": user.id,
+                "email": user.email,
+                "full_name": user.full_name,
+                "is_active": user.is_active,
+            },
+        ),
+        expiresAt,
+    )
     return user
 
 
 async def get_current_user(
     db: AsyncSession = Depends(get_db),
     tokenOidc: Optional[str] = Depends(reusable_oidc),
+    tokenVerifier: TokenVerifier = Depends(get_token_verifier),
+    identityCache: IdentityCache = Depends(get_identity_cache),
 ) -> models.User:
     if tokenOidc is None:
         raise HTTPException(
@@ -194,7 +278,9 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    return await get_current_user_from_oidc(db=db, tokenOidc=tokenOidc)
+    return await get_current_user_from_oidc(
+        db=db, tokenOidc=tokenOidc, tokenVerifier=tokenVerifier, identityCache=identityCache
+    )
 
 
 async def get_current_active_user(
@@ -207,6 +293,8 @@ async def get_current_active_user(
 
 async def get_current_oidc_user(
     tokenOidc: Optional[str] = Depends(reusable_oidc),
+    tokenVerifier: TokenVerifier = Depends(get_token_verifier),
+    identityCache: IdentityCache = Depends(get_identity_cache),
 ) -> schemas.OIDCUser:
     if tokenOidc is None:
         raise HTTPException(
@@ -214,7 +302,11 @@ async def get_current_oidc_user(
             detail="Not authenticated",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return await get_userinfo_from_token(tokenOidc)
+    identity = await identityCache.get(tokenOidc)
+    if identity is not None:
+        return schemas.OIDCUser(**identity.oidc_user)
+    oidcUser, _ = await get_userinfo_from_token(tokenOidc, tokenVerifier)
+    return oidcUser
 
 
 async def get_influxdb_client(request: Request) -> InfluxDBClientAsync:
@@ -227,3 +319,111 @@ async def get_influxdb_client(request: Request) -> InfluxDBClientAsync:
             detail="influxdb_client attribute not set on app state",
         )
     return request.app.state.influxdb_client
+
+
+async def get_bar_store(request: Request) -> BarStore:
+    """
+    Dependency function that yields the OHLCV bar store
+    """
+    if not hasattr(request.app.state, "bar_store"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="bar_store attribute not set on app state",
+        )
+    return request.app.state.bar_store
+
+
+async def get_http_clients(request: Request) -> HttpClients:
+    """
+    Dependency function that yields the shared upstream http clients
+    """
+    if not hasattr(request.app.state, "http_clients"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="http_clients attribute not set on app state",
+        )
+    return request.app.state.http_clients
+
+
+async def get_redis(request: Request) -> Redis:
+    """
+    Dependency function that yields redis connection
+    """
+    if not hasattr(request.app.state, "redis"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="redis attribute not set on app state",
+        )
+    return request.app.state.redis
+
+
+async def get_history_service(request: Request) -> HistoryService:
+    """
+    Dependency function that yields the history service
+    """
+    if not hasattr(request.app.state, "history"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="history attribute not set on app state",
+        )
+    return request.app.state.history
+
+
+async def get_quote_table(request: Request) -> QuoteTable:
+    """
+    Dependency function that yields the quote table
+    """
+    if not hasattr(request.app.state, "quotes"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="quotes attribute not set on app state",
+        )
+    return request.app.state.quotes
+
+
+async def get_symbol_info_cache(request: Request) -> SymbolInfoCache:
+    """
+    Dependency function that yields the symbol info cache
+    """
+    if not hasattr(request.app.state, "symbol_info"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="symbol_info attribute not set on app state",
+        )
+    return request.app.state.symbol_info
+
+
+async def get_symbol_index(request: Request) -> SymbolIndex:
+    """
+    Dependency function that yields the symbol search index
+    """
+    if not hasattr(request.app.state, "symbol_index"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="symbol_index attribute not set on app state",
+        )
+    return request.app.state.symbol_index
+
+
+async def get_reference_cache(request: Request) -> ReferenceCache:
+    """
+    Dependency function that yields the reference data cache
+    """
+    if not hasattr(request.app.state, "reference_cache"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="reference_cache attribute not set on app state",
+        )
+    return request.app.state.reference_cache
+
+
+async def get_stream_hub(connection: HTTPConnection) -> StreamHub:
+    """
+    Dependency function that yields the live bar stream hub, for http and websocket routes
+    """
+    if not hasattr(connection.app.state, "stream_hub"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="stream_hub attribute not set on app state",
+        )
+    return connection.app.state.stream_hub
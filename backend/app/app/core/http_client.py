@@ -0,0 +1,59 @@
+from typing import Dict, Tuple
+
+import httpx
+
+from app.core.settings import settings
+
+
+class HttpClients:
+    """Application-scoped httpx clients, one per upstream origin.
+
+    Each client keeps its own connection pool so TCP, TLS and HTTP/2 setup is paid once per
+    connection instead of once per request.
+    """
+
+    def __init__(
+        self,
+        *,
+        http2: bool = True,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 60.0,
+        timeout: float = 10.0,
+        connect_timeout: float = 5.0,
+    ) -> None:
+        self.http2 = http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._clients: Dict[Tuple[str, str, int], httpx.AsyncClient] = {}
+
+    @classmethod
+    def from_settings(cls) -> "HttpClients":
+        return cls(
+            http2=settings.UPSTREAM_HTTP2,
+            max_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.UPSTREAM_KEEPALIVE_EXPIRY,
+            timeout=settings.UPSTREAM_TIMEOUT,
+            connect_timeout=settings.UPSTREAM_CONNECT_TIMEOUT,
+        )
+
+    def for_url(self, url: str) -> httpx.AsyncClient:
+        """Shared client for the origin (scheme, host, port) of `url`."""
+        origin = httpx.URL(url)
+        key = (origin.scheme, origin.host, origin.port or (443 if origin.scheme == "https" else 80))
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = self._clients[key] = httpx.AsyncClient(
+                http2=self.http2, limits=self.limits, timeout=self.timeout
+            )
+        return client
+
+    async def aclose(self) -> None:
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            await client.aclose()
@@ -0,0 +1,234 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import httpx
+from jose import jwk, jwt
+from jose.backends.base import Key
+from jose.exceptions import JWKError, JWTError
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.http_client import HttpClients
+from app.core.serialization import dumps
+from app.core.settings import settings
+
+__all__ = ["TokenVerifier", "Identity", "IdentityCache"]
+
+# Seconds between two JWKS reloads triggered by tokens signed with an unknown key
+MIN_REFRESH_INTERVAL = 30.0
+
+
+class TokenVerifier:
+    """Validates OIDC access tokens locally, against the signing keys of the identity provider.
+
+    The issuer and the JWKS are loaded at `start` and reloaded in the background every
+    `refresh_interval` seconds, or sooner when a token names an unknown key after a rotation.
+    Verifying a token is then a signature check and a few claim comparisons, without a round trip
+    to the identity provider.
+    """
+
+    def __init__(
+        self,
+        clients: HttpClients,
+        *,
+        discovery_url: str = settings.OIDC_DISCOVERY_URL,
+        audience: Optional[str] = settings.OIDC_AUDIENCE,
+        algorithms: List[str] = settings.OIDC_ALGORITHMS,
+        leeway: int = settings.OIDC_LEEWAY,
+        refresh_interval: float = settings.OIDC_JWKS_REFRESH_INTERVAL,
+    ) -> None:
+        self.clients = clients
+        self.discovery_url = discovery_url
+        self.audience = audience
+        self.algorithms = algorithms
+        self.leeway = leeway
+        self.refresh_interval = refresh_interval
+        self.issuer: Optional[str] = None
+        self.jwks_uri: Optional[str] = None
+        # kid -> key
+        self._keys: Dict[str, Key] = {}
+        self._refreshed_at = float("-inf")
+        self._lock = asyncio.Lock()
+        self._refresher: Optional["asyncio.Task[None]"] = None
+
+    async def start(self) -> None:
+        await self.refresh()
+        self._refresher = asyncio.ensure_future(self._refresh_forever())
+
+    async def close(self) -> None:
+        if self._refresher is not None:
+            self._refresher.cancel()
+            self._refresher = None
+
+    async def _get_json(self, url: str) -> Any:
+        response = await self.clients.for_url(url).get(url)
+        response.raise_for_status()
+        return response.json()
+
+    async def refresh(self) -> None:
+        """Reload the signing keys, keeping the previous ones on errors."""
+        async with self._lock:
+            self._refreshed_at = time.monotonic()
+            try:
+                if self.jwks_uri is None:
+                    metadata = await self._get_json(self.discovery_url)
+                    self.issuer = metadata["issuer"]
+                    self.jwks_uri = metadata["jwks_uri"]
+                jwks = await self._get_json(self.jwks_uri)  # type: ignore
+                keys: Dict[str, Key] = {}
+                for key in jwks["keys"]:
+                    algorithm = key.get("alg", self.algorithms[0])
+                    if key.get("use", "sig") != "sig" or algorithm not in self.algorithms:
+                        continue
+                    keys[key.get("kid", "")] = jwk.construct(key, algorithm)
+            except (httpx.HTTPError, ValueError, KeyError, JWKError) as e:
+                logger.error("Error when loading oidc signing keys: {error}", error=str(e))
+                return
+            self._keys = keys
+
+    async def _refresh_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh()
+
+    async def _key(self, kid: str) -> Optional[Key]:
+        key = self._keys.get(kid)
+        if key is None and time.monotonic() - self._refreshed_at >= MIN_REFRESH_INTERVAL:
+            await self.refresh()
+            key = self._keys.get(kid)
+        return key
+
+    async def verify(self, token: str) -> Optional[Dict[str, Any]]:
+        """Claims of the JWT `token`, `None` if it is opaque or no signing key is loaded.
+
+        Raises `JWTError` if the token is a JWT but invalid, expired or signed by another issuer.
+        """
+        if token.count(".") != 2:
+            return None
+        header = jwt.get_unverified_header(token)
+        if header.get("alg") not in self.algorithms:
+            raise JWTError("Unsupported signing algorithm")
+        key = await self._key(header.get("kid", ""))
+        if key is None:
+            if self.issuer is None:
+                # The identity provider was unreachable so far
+                return None
+            raise JWTError("Unknown signing key")
+        return jwt.decode(
+            token,
+            key,
+            algorithms=self.algorithms,
+            audience=self.audience,
+            issuer=self.issuer,
+            options={"verify_aud": self.audience is not None, "leeway": self.leeway},
+        )
+
+
+class Identity(NamedTuple):
+    # Claims of an `OIDCUser`
+    oidc_user: Dict[str, Any]
+    # Columns of the `User` row: id, email, full_name, is_active
+    user: Dict[str, Any]
+
+
+class IdentityCache:
+    """Bounded LRU cache of the identity behind an access token, so that authenticated requests
+    neither resolve the token nor look up the user row again.
+
+    Entries are keyed by the sha256 of the token, never the token itself, and expire at the
+    token's "exp" or after `ttl` seconds, whichever comes first. With `redis`, identities are
+    shared by all workers and the local entries only live for `local_ttl` seconds, which bounds
+    how long another worker serves a user after `invalidate_user`.
+    """
+
+    def __init__(
+        self,
+        redis: Optional[Redis] = None,
+        *,
+        max_size: int = settings.OIDC_IDENTITY_CACHE_SIZE,
+        ttl: float = settings.OIDC_IDENTITY_CACHE_TTL,
+        local_ttl: float = settings.OIDC_IDENTITY_CACHE_LOCAL_TTL,
+        prefix: str = settings.OIDC_IDENTITY_CACHE_PREFIX,
+    ) -> None:
+        self.redis = redis
+        self.max_size = max_size
+        self.ttl = ttl
+        self.local_ttl = local_ttl if redis is not None else ttl
+        self.prefix = prefix
+        # fingerprint -> (expiry time, identity)
+        self._entries: "OrderedDict[str, Tuple[float, Identity]]" = OrderedDict()
+
+    @staticmethod
+    def fingerprint(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _remember(self, key: str, expires_at: float, identity: Identity) -> None:
+        self._entries[key] = (min(expires_at, time.time() + self.local_ttl), identity)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get(self, token: str) -> Optional[Identity]:
+        key = self.fingerprint(token)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.time():
+                self._entries.move_to_end(key)
+                return entry[1]
+            del self._entries[key]
+        if self.redis is None:
+            return None
+        try:
+            content = await self.redis.get(f"{self.prefix}:{key}")
+        except RedisError as e:
+            logger.error("Error when reading cached identity: {error}", error=str(e))
+            return None
+        if content is None:
+            return None
+        expires_at, oidc_user, user = json.loads(content)
+        identity = Identity(oidc_user=oidc_user, user=user)
+        self._remember(key, expires_at, identity)
+        return identity
+
+    async def set(self, token: str, identity: Identity, expires_at: Optional[float]) -> None:
+        """Cache `identity` until `expires_at`, a unix time, if the token expires before `ttl`."""
+        expires_at = min(expires_at or float("inf"), time.time() + self.ttl)
+        if expires_at <= time.time():
+            return
+        key = self.fingerprint(token)
+        self._remember(key, expires_at, identity)
+        if self.redis is None:
+            return
+        user_key = f"{self.prefix}:user:{identity.user['id']}"
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.set(
+                    f"{self.prefix}:{key}",
+                    dumps([expires_at, identity.oidc_user, identity.user]),
+                    px=max(int((expires_at - time.time()) * 1000), 1),
+                )
+                # Tokens of a user, for `invalidate_user`
+                pipe.sadd(user_key, key)
+                pipe.expire(user_key, int(self.ttl) + 1)
+                await pipe.execute()
+        except RedisError as e:
+            logger.error("Error when caching identity: {error}", error=str(e))
+
+    async def invalidate_user(self, user_id: int) -> None:
+        """Forget every token of `user_id`, after a change of the user row."""
+        for key, (_, identity) in list(self._entries.items()):
+            if identity.user["id"] == user_id:
+                del self._entries[key]
+        if self.redis is None:
+            return
+        user_key = f"{self.prefix}:user:{user_id}"
+        try:
+            members = await self.redis.smembers(user_key)
+            await self.redis.delete(user_key, *(f"{self.prefix}:{key.decode()}" for key in members))
+        except RedisError as e:
+            logger.error("Error when invalidating cached identities: {error}", error=str(e))
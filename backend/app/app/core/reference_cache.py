@@ -0,0 +1,149 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from loguru import logger
+from redis import Redis as SyncRedis
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.serialization import dumps
+from app.core.settings import settings
+
+__all__ = ["ReferenceCache", "invalidate_reference_sync"]
+
+Row = Optional[Dict[str, Any]]
+
+
+def version_key(namespace: str, prefix: str = settings.REFERENCE_CACHE_PREFIX) -> str:
+    # The ticker version is shared with the symbol info cache and the symbol index
+    if namespace == "ticker":
+        return settings.TICKER_VERSION_KEY
+    return f"{prefix}:{namespace}:version"
+
+
+def invalidate_reference_sync(namespace: str) -> None:
+    """`ReferenceCache.invalidate` for synchronous writers, like celery tasks."""
+    try:
+        with SyncRedis.from_url(settings.REDIS_URL) as redis:
+            redis.incr(version_key(namespace))
+    except RedisError as e:
+        logger.error("Error when bumping reference version: {error}", error=str(e))
+
+
+class ReferenceCache:
+    """Read-through cache of reference rows, like tickers and industries, which change at most a
+    few times a day.
+
+    Rows are cached per namespace (a table) under versioned keys. The CRUD write methods call
+    `invalidate`, which increments the namespace version in redis, so every worker moves to new
+    keys and the old ones expire by themselves. Workers check the version at most every
+    `version_interval` seconds. The "ticker" namespace uses `TICKER_VERSION_KEY`, which the
+    symbol info cache also increments and the symbol index watches. Rows live in a bounded
+    in-process LRU, and with `shared` in redis as well, so that a worker fills its LRU without the
+    database. Missing rows are cached too.
+
+    A hit does not touch the database, so reads only take a pool connection on misses.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        shared: bool = settings.REFERENCE_CACHE_REDIS,
+        max_size: int = settings.REFERENCE_CACHE_SIZE,
+        ttl: float = settings.REFERENCE_CACHE_TTL,
+        version_interval: float = settings.REFERENCE_CACHE_VERSION_INTERVAL,
+        prefix: str = settings.REFERENCE_CACHE_PREFIX,
+    ) -> None:
+        self.redis = redis
+        self.shared = shared
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version_interval = version_interval
+        self.prefix = prefix
+        # namespace -> (check time, version)
+        self._versions: Dict[str, Tuple[float, str]] = {}
+        # (namespace, version, key) -> (expiry time, row)
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[float, Row]]" = OrderedDict()
+        # namespace -> hits, shared hits and misses
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def _version_key(self, namespace: str) -> str:
+        return version_key(namespace, self.prefix)
+
+    async def version(self, namespace: str) -> str:
+        checked = self._versions.get(namespace)
+        now = time.monotonic()
+        if checked is not None and now - checked[0] < self.version_interval:
+            return checked[1]
+        try:
+            version = await self.redis.get(self._version_key(namespace))
+        except RedisError as e:
+            logger.error("Error when reading reference version: {error}", error=str(e))
+            # Keep the last known version, entries still expire after `ttl`
+            return checked[1] if checked is not None else ""
+        self._versions[namespace] = (now, version.decode() if version else "0")
+        return self._versions[namespace][1]
+
+    def _count(self, namespace: str, outcome: str) -> None:
+        stats = self.stats.setdefault(namespace, {"hits": 0, "shared_hits": 0, "misses": 0})
+        stats[outcome] += 1
+
+    def _remember(self, entry: Tuple[str, str, str], row: Row, expires_at: float) -> None:
+        self._entries[entry] = (expires_at, row)
+        self._entries.move_to_end(entry)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get(self, namespace: str, key: str, load: Callable[[], Awaitable[Row]]) -> Row:
+        """Row `key` of `namespace`, loaded with `load` on a miss."""
+        version = await self.version(namespace)
+        entry = (namespace, version, key)
+        cached = self._entries.get(entry)
+        if cached is not None and cached[0] > time.monotonic():
+            self._entries.move_to_end(entry)
+            self._count(namespace, "hits")
+            return cached[1]
+
+        redis_key = f"{self.prefix}:{namespace}:{version}:{key}"
+        content = await self._get_shared(redis_key)
+        if content is not None:
+            row = json.loads(content)
+            self._remember(entry, row, time.monotonic() + self.ttl)
+            self._count(namespace, "shared_hits")
+            return row
+
+        self._count(namespace, "misses")
+        row = await load()
+        self._remember(entry, row, time.monotonic() + self.ttl)
+        await self._set_shared(redis_key, row)
+        return row
+
+    async def _get_shared(self, redis_key: str) -> Optional[bytes]:
+        if not self.shared:
+            return None
+        try:
+            return await self.redis.get(redis_key)
+        except RedisError as e:
+            logger.error("Error when reading cached reference: {error}", error=str(e))
+            return None
+
+    async def _set_shared(self, redis_key: str, row: Row) -> None:
+        if not self.shared:
+            return
+        try:
+            await self.redis.set(redis_key, dumps(row), ex=int(self.ttl))
+        except RedisError as e:
+            logger.error("Error when caching reference: {error}", error=str(e))
+
+    async def invalidate(self, namespace: str) -> None:
+        """Drop the rows of `namespace` in every worker, after a write to its table."""
+        self._versions.pop(namespace, None)
+        for entry in [entry for entry in self._entries if entry[0] == namespace]:
+            del self._entries[entry]
+        try:
+            await self.redis.incr(self._version_key(namespace))
+        except RedisError as e:
+            logger.error("Error when bumping reference version: {error}", error=str(e))
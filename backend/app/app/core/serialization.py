@@ -0,0 +1,46 @@
+import dataclasses
+from decimal import Decimal
+from typing import Any, Callable, Tuple, Type, Union
+
+import numpy as np
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+__all__ = ["dumps", "FastJSONResponse"]
+
+# Types orjson does not serialize by itself, or only in some layouts for numpy arrays
+ENCODERS: Tuple[Tuple[Union[Type, Tuple[Type, ...]], Callable[[Any], Any]], ...] = (
+    (BaseModel, lambda obj: obj.dict(by_alias=True)),
+    (np.ndarray, lambda obj: obj.tolist()),
+    (np.generic, lambda obj: obj.item()),
+    (Decimal, str),
+    ((set, frozenset), list),
+)
+
+
+def _default(obj: Any) -> Any:
+    for types, encode in ENCODERS:
+        if isinstance(obj, types):
+            return encode(obj)
+    if dataclasses.is_dataclass(obj):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize `obj`, including pydantic models and numpy arrays, to compact JSON."""
+    return orjson.dumps(
+        obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    )
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with `dumps`.
+
+    Endpoints can return it with a pydantic model as content to skip the response model
+    validation and `jsonable_encoder` pass of FastAPI.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
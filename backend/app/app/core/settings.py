@@ -1,7 +1,7 @@
 import os
 from datetime import timedelta
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import AnyHttpUrl, BaseSettings, HttpUrl, PostgresDsn, validator
 
@@ -103,11 +103,113 @@ class Settings(BaseSettings):
     def OIDC_DISCOVERY_URL(self) -> str:
         return f"{settings.OIDC_SERVER}/.well-known/openid-configuration"
 
+    # Expected "aud" of access tokens, not checked if unset
+    OIDC_AUDIENCE: Optional[str] = None
+    OIDC_ALGORITHMS: List[str] = ["RS256"]
+    # Seconds of clock skew allowed on "exp", "nbf" and "iat"
+    OIDC_LEEWAY: int = 30
+    OIDC_JWKS_REFRESH_INTERVAL: float = 3600.0
+    # Ask the userinfo endpoint about tokens that are not JWTs
+    OIDC_USERINFO_FALLBACK: bool = True
+    # Token fingerprint -> identity cache, shared through redis if enabled
+    OIDC_IDENTITY_CACHE_SIZE: int = 10_000
+    OIDC_IDENTITY_CACHE_TTL: float = 300.0
+    OIDC_IDENTITY_CACHE_REDIS: bool = False
+    # Seconds a worker keeps an identity read from redis
+    OIDC_IDENTITY_CACHE_LOCAL_TTL: float = 10.0
+    OIDC_IDENTITY_CACHE_PREFIX: str = "identity"
+
     INFLUXDB_DB: str
     INFLUXDB_USERNAME: str
     INFLUXDB_PASSWORD: str
     INFLUXDB_HOST: str
     INFLUXDB_PORT: str
+    INFLUXDB_ORG: str = "-"
+
+    @property
+    def INFLUXDB_URL(self) -> str:
+        return f"http://{self.INFLUXDB_HOST}:{self.INFLUXDB_PORT}"
+
+    @property
+    def INFLUXDB_TOKEN(self) -> str:
+        # InfluxDB 1.8 compatibility API: token is "username:password"
+        return f"{self.INFLUXDB_USERNAME}:{self.INFLUXDB_PASSWORD}"
+
+    @property
+    def INFLUXDB_BUCKET(self) -> str:
+        # InfluxDB 1.8 compatibility API: bucket is "database/retention_policy"
+        return f"{self.INFLUXDB_DB}/autogen"
+
+    REDIS_URL: str = "redis://redis:6379/0"
+
+    UPSTREAM_HTTP2: bool = True
+    UPSTREAM_MAX_CONNECTIONS: int = 100
+    UPSTREAM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    UPSTREAM_KEEPALIVE_EXPIRY: float = 60.0
+    UPSTREAM_TIMEOUT: float = 10.0
+    UPSTREAM_CONNECT_TIMEOUT: float = 5.0
+
+    # Upper bound on the number of bars kept by the in-process history range cache
+    HISTORY_CACHE_MAX_BARS: int = 1_000_000
+
+    # Coalesce identical history fetches across workers through redis
+    HISTORY_SINGLEFLIGHT_REDIS: bool = False
+    HISTORY_SINGLEFLIGHT_TIMEOUT: float = 10.0
+    HISTORY_SINGLEFLIGHT_RESULT_TTL: int = 5
+
+    # History providers in order of preference: ssi, vps, vndirect, mbs, tcbs
+    HISTORY_PROVIDERS: List[str] = ["ssi", "vps", "vndirect", "mbs", "tcbs"]
+    # Hedge delay until a provider has enough latency samples for its p95
+    HISTORY_HEDGE_DELAY: float = 0.5
+    HISTORY_HEDGE_MIN_DELAY: float = 0.05
+    # Seconds a provider is skipped for after repeated failures
+    HISTORY_PROVIDER_COOLDOWN: float = 30.0
+
+    STREAMER_URL: str = "wss://tradingviewrealtime.vps.com.vn/socket.io/?EIO=3&transport=websocket"
+    # Ticks of a symbol are published to the redis channel "<prefix>:<symbol>"
+    STREAMER_CHANNEL_PREFIX: str = "tick"
+    STREAMER_JOIN_BATCH_SIZE: int = 100
+    STREAMER_QUEUE_SIZE: int = 10_000
+    # Streamer worker processes, the ticker universe is sharded across them
+    STREAMER_NUM_PROCESS: int = 4
+    # Seconds between ticker reloads; task_crawl_ticker also triggers one through redis
+    STREAMER_REFRESH_INTERVAL: float = 300.0
+    STREAMER_RELOAD_CHANNEL: str = "streamer:reload"
+    # Seconds between live 1-minute bar flushes to the bar store
+    STREAMER_FLUSH_INTERVAL: float = 5.0
+    # Seconds after the end of its minute a live bar still accepts ticks
+    STREAMER_BAR_CLOSE_GRACE: float = 2.0
+
+    # Max updates per second of one subscription on the live event stream
+    STREAM_MAX_FREQUENCY: float = 4.0
+    # Seconds between keep-alive comments on an idle event stream
+    STREAM_KEEPALIVE_INTERVAL: float = 15.0
+    STREAM_MAX_SUBSCRIPTIONS: int = 100
+
+    # Board snapshot of comma-separated symbols, loaded into the quote table on misses
+    QUOTES_URL: str = "https://bgapidatafeed.vps.com.vn/getliststockdata"
+    # Seconds before a quote snapshot is reloaded, ticks update it in between
+    QUOTES_TTL: float = 60.0
+    QUOTES_BATCH_SIZE: int = 100
+    QUOTES_MAX_SYMBOLS: int = 1000
+
+    # Redis counter incremented on every change of the ticker table
+    TICKER_VERSION_KEY: str = "ticker:version"
+    # Hash of the last synced ssi ticker listing; expires so that a full diff still runs
+    TICKER_SYNC_HASH_KEY: str = "ticker:sync_hash"
+    TICKER_SYNC_HASH_TTL: int = 60 * 60
+    # Seconds a cached `/symbol_info` group is served for at most
+    SYMBOL_INFO_TTL: float = 3600.0
+    # Seconds between ticker version checks of the symbol search index
+    SYMBOL_INDEX_REFRESH_INTERVAL: float = 5.0
+
+    # Read-through cache of ticker and industry rows, shared through redis if enabled
+    REFERENCE_CACHE_SIZE: int = 10_000
+    REFERENCE_CACHE_TTL: float = 3600.0
+    REFERENCE_CACHE_REDIS: bool = False
+    # Seconds between version checks, a bound on how long other workers serve a changed row
+    REFERENCE_CACHE_VERSION_INTERVAL: float = 1.0
+    REFERENCE_CACHE_PREFIX: str = "reference"
 
     class Config:
         case_sensitive = True
@@ -1,45 +1,106 @@
+import time
 from typing import (
     Any,
     AsyncIterator,
     Dict,
+    FrozenSet,
     Generic,
+    Iterable,
     Iterator,
+    List,
     Optional,
+    Sequence,
     Tuple,
     Type,
     TypeVar,
     Union,
 )
 
+import anyio
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy import delete, func
+from sqlalchemy import column, delete, func, text, update, values
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import Session
-from sqlalchemy.sql import Select
+from sqlalchemy.sql import Executable, Select
 
+from app.core.reference_cache import invalidate_reference_sync, ReferenceCache
 from app.db.base_class import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+# Rows per statement of the bulk methods
+BULK_CHUNK_SIZE = 1000
+# Bind parameters per statement allowed by the postgres protocol
+MAX_BIND_PARAMS = 32767
+# Seconds an estimated row count is reused for
+COUNT_ESTIMATE_TTL = 60.0
+# Tables estimated below this many rows are counted exactly
+COUNT_ESTIMATE_MIN_ROWS = 10_000
+
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
-    def __init__(self, model: Type[ModelType]):
+    # Cache of the rows of the `cached` tables, set at startup
+    reference_cache: Optional[ReferenceCache] = None
+
+    def __init__(self, model: Type[ModelType], *, cached: bool = False):
         """
         CRUD object with default methods to Create, Read, Update, Delete (CRUD).
         **Parameters**
         * `model`: A SQLAlchemy model class
         * `schema`: A Pydantic model (schema) class
+        * `cached`: Rows are read through `reference_cache` by `get_cached`, and every write
+          method invalidates them
         """
         self.model = model
+        self.cached = cached
+        # (time, row count) of the last `get_count_estimate`
+        self._count_estimate: Optional[Tuple[float, int]] = None
 
     async def get(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
         q = await db.execute(select(self.model).where(self.model.id == id))
         return q.scalars().one_or_none()
 
+    async def get_cached(self, db: AsyncSession, **filters: Any) -> Optional[ModelType]:
+        """The row whose unique columns equal `filters`, through `reference_cache`.
+
+        The returned model is not attached to `db`, use `get` to modify it.
+        """
+        columns = self.model.__table__.columns
+
+        async def load() -> Optional[Dict[str, Any]]:
+            q = await db.execute(select(self.model).filter_by(**filters))
+            obj = q.scalars().one_or_none()
+            return None if obj is None else {c.key: getattr(obj, c.key) for c in columns}
+
+        if not self.cached or self.reference_cache is None:
+            row = await load()
+        else:
+            key = ",".join(f"{field}={value}" for field, value in sorted(filters.items()))
+            row = await self.reference_cache.get(self.model.__tablename__, key, load)
+        return None if row is None else self.model(**row)
+
+    async def invalidate(self) -> None:
+        """Drop the cached rows of a `cached` table, in every worker.
+
+        The write methods call it after committing, writes made with `commit=False` or outside
+        of this class call it after their commit.
+        """
+        if not self.cached:
+            return
+        if self.reference_cache is None:
+            await anyio.to_thread.run_sync(self.invalidate_sync)
+            return
+        await self.reference_cache.invalidate(self.model.__tablename__)
+
+    def invalidate_sync(self) -> None:
+        if self.cached:
+            invalidate_reference_sync(self.model.__tablename__)
+
     async def get_by_email(self, db: AsyncSession, email: str) -> Optional[ModelType]:
         q = await db.execute(select(self.model).where(self.model.email == email))
         return q.scalars().one_or_none()
@@ -51,6 +112,57 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         q = await db.execute(statement)
         return q.scalars().all()
 
+    async def get_multi_keyset(
+        self,
+        db: AsyncSession,
+        *,
+        after_id: Optional[int] = None,
+        before_id: Optional[int] = None,
+        limit: int = 100,
+    ) -> Tuple[List[ModelType], bool]:
+        """Up to `limit` rows by id, after `after_id` or else before `before_id`, and whether
+        there are more rows past them.
+
+        Pages are read from the primary key index, a deep page costs the same as the first one.
+        """
+        statement = select(self.model)
+        if after_id is None and before_id is not None:
+            statement = statement.where(self.model.id < before_id).order_by(self.model.id.desc())
+        else:
+            if after_id is not None:
+                statement = statement.where(self.model.id > after_id)
+            statement = statement.order_by(self.model.id)
+        q = await db.execute(statement.limit(limit + 1))
+        items = q.scalars().all()
+        has_more = len(items) > limit
+        items = items[:limit]
+        if after_id is None and before_id is not None:
+            items.reverse()
+        return items, has_more
+
+    async def get_count_estimate(self, db: AsyncSession) -> int:
+        """Row count of the table from the planner statistics, reused for `COUNT_ESTIMATE_TTL`
+        seconds; small or never analyzed tables are counted exactly."""
+        cached = self._count_estimate
+        if cached is not None and time.monotonic() - cached[0] < COUNT_ESTIMATE_TTL:
+            return cached[1]
+        estimate = await db.scalar(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+            {"table": self.model.__tablename__},
+        )
+        if estimate is None or estimate < COUNT_ESTIMATE_MIN_ROWS:
+            estimate = await self.get_count(db, select(self.model))
+        self._count_estimate = (time.monotonic(), estimate)
+        return estimate
+
+    async def get_total(self, db: AsyncSession, mode: str) -> Optional[int]:
+        """Row count of the table for a keyset page: "exact", "estimate" or "none" for `None`."""
+        if mode == "exact":
+            return await self.get_count(db, select(self.model))
+        if mode == "estimate":
+            return await self.get_count_estimate(db)
+        return None
+
     async def get_count(self, db: AsyncSession, query: Select) -> int:
         """Counting of results returned by the query
 
@@ -93,6 +205,7 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db_obj = self.model(**obj_in_data)  # type: ignore
         db.add(db_obj)
         await db.commit()
+        await self.invalidate()
         await db.refresh(db_obj)
         return db_obj
 
@@ -103,34 +216,134 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db_obj: ModelType,
         obj_in: Union[UpdateSchemaType, Dict[str, Any]],
     ) -> ModelType:
-        obj_data = jsonable_encoder(db_obj)
-        if isinstance(obj_in, dict):
-            update_data = obj_in
-        else:
-            update_data = obj_in.dict(exclude_unset=True)
-
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+        for field, value in self._column_data(obj_in).items():
+            setattr(db_obj, field, value)
         db.add(db_obj)
         await db.commit()
+        await self.invalidate()
         await db.refresh(db_obj)
         return db_obj
 
+    async def create_many(
+        self,
+        db: AsyncSession,
+        *,
+        objs_in: Iterable[Union[CreateSchemaType, Dict[str, Any]]],
+        chunk_size: int = BULK_CHUNK_SIZE,
+        commit: bool = True,
+    ) -> List[ModelType]:
+        """Insert `objs_in` with one multi-row INSERT per chunk, in one transaction."""
+        return await self._execute_many(
+            db, self._insert_statements(objs_in, chunk_size=chunk_size), commit=commit
+        )
+
+    async def update_many(
+        self,
+        db: AsyncSession,
+        *,
+        objs_in: Iterable[Tuple[Any, Union[UpdateSchemaType, Dict[str, Any]]]],
+        chunk_size: int = BULK_CHUNK_SIZE,
+        commit: bool = True,
+    ) -> List[ModelType]:
+        """Update the rows of the `(id, obj_in)` pairs of `objs_in`, in one transaction.
+
+        Like `update`, only the set fields of a schema are written. Missing rows are skipped, the
+        updated ones are returned.
+        """
+        return await self._execute_many(
+            db, self._update_statements(objs_in, chunk_size=chunk_size), commit=commit
+        )
+
+    async def upsert_many(
+        self,
+        db: AsyncSession,
+        *,
+        objs_in: Iterable[Union[CreateSchemaType, Dict[str, Any]]],
+        index_elements: Sequence[str] = ("id",),
+        update_fields: Optional[Sequence[str]] = None,
+        chunk_size: int = BULK_CHUNK_SIZE,
+        commit: bool = True,
+    ) -> List[ModelType]:
+        """Insert `objs_in`, updating `update_fields` of the rows conflicting on `index_elements`.
+
+        `update_fields` defaults to the other given fields.
+        """
+        statements = self._insert_statements(
+            objs_in,
+            chunk_size=chunk_size,
+            index_elements=index_elements,
+            update_fields=update_fields,
+        )
+        return await self._execute_many(db, statements, commit=commit)
+
+    async def _execute_many(
+        self, db: AsyncSession, statements: Iterable[Executable], *, commit: bool
+    ) -> List[ModelType]:
+        objs: List[ModelType] = []
+        for statement in statements:
+            q = await db.execute(
+                select(self.model)
+                .from_statement(statement)
+                .execution_options(populate_existing=True)
+            )
+            objs.extend(q.scalars().all())
+        if commit:
+            await db.commit()
+            await self.invalidate()
+        return objs
+
+    async def update_where(
+        self,
+        db: AsyncSession,
+        *,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        **filters: Any,
+    ) -> List[ModelType]:
+        """Update the rows whose columns equal `filters` with one UPDATE ... RETURNING, and return
+        them, so that ownership is checked by the same statement."""
+        if not filters:
+            raise ValueError("update_where needs at least one filter")
+        update_data = self._column_data(obj_in)
+        if not update_data:
+            q = await db.execute(select(self.model).filter_by(**filters))
+            return q.scalars().all()
+        statement = (
+            update(self.model)
+            .where(*(getattr(self.model, field) == value for field, value in filters.items()))
+            .values(update_data)
+            .returning(*self.model.__table__.columns)
+        )
+        return await self._execute_many(db, [statement], commit=True)
+
+    async def remove_where(self, db: AsyncSession, **filters: Any) -> List[ModelType]:
+        """Delete the rows whose columns equal `filters` with one DELETE ... RETURNING, and return
+        them."""
+        if not filters:
+            raise ValueError("remove_where needs at least one filter")
+        statement = (
+            delete(self.model)
+            .where(*(getattr(self.model, field) == value for field, value in filters.items()))
+            .returning(*self.model.__table__.columns)
+        )
+        return await self._execute_many(db, [statement], commit=True)
+
     async def remove(self, db: AsyncSession, *, id: int) -> Union[ModelType, None]:
         q = await db.execute(select(self.model).where(self.model.id == id))
         obj = q.scalar_one()
         await db.delete(obj)
         await db.commit()
+        await self.invalidate()
         return obj
 
     async def remove_object(self, db: AsyncSession, *, db_obj: ModelType) -> None:
         await db.delete(db_obj)
         await db.commit()
+        await self.invalidate()
 
     async def remove_all(self, db: AsyncSession) -> None:
         await db.execute(delete(select(self.model)))
         await db.commit()
+        await self.invalidate()
 
     def get_sync(self, db: Session, id: Any) -> Optional[ModelType]:
         q = db.execute(select(self.model).where(self.model.id == id))
@@ -179,5 +392,145 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db_obj = self.model(**obj_in_data)  # type: ignore
         db.add(db_obj)
         db.commit()
+        self.invalidate_sync()
         db.refresh(db_obj)
         return db_obj
+
+    def create_many_sync(
+        self,
+        db: Session,
+        *,
+        objs_in: Iterable[Union[CreateSchemaType, Dict[str, Any]]],
+        chunk_size: int = BULK_CHUNK_SIZE,
+        commit: bool = True,
+    ) -> List[ModelType]:
+        return self._execute_many_sync(
+            db, self._insert_statements(objs_in, chunk_size=chunk_size), commit=commit
+        )
+
+    def update_many_sync(
+        self,
+        db: Session,
+        *,
+        objs_in: Iterable[Tuple[Any, Union[UpdateSchemaType, Dict[str, Any]]]],
+        chunk_size: int = BULK_CHUNK_SIZE,
+        commit: bool = True,
+    ) -> List[ModelType]:
+        return self._execute_many_sync(
+            db, self._update_statements(objs_in, chunk_size=chunk_size), commit=commit
+        )
+
+    def upsert_many_sync(
+        self,
+        db: Session,
+        *,
+        objs_in: Iterable[Union[CreateSchemaType, Dict[str, Any]]],
+        index_elements: Sequence[str] = ("id",),
+        update_fields: Optional[Sequence[str]] = None,
+        chunk_size: int = BULK_CHUNK_SIZE,
+        commit: bool = True,
+    ) -> List[ModelType]:
+        statements = self._insert_statements(
+            objs_in,
+            chunk_size=chunk_size,
+            index_elements=index_elements,
+            update_fields=update_fields,
+        )
+        return self._execute_many_sync(db, statements, commit=commit)
+
+    def _execute_many_sync(
+        self, db: Session, statements: Iterable[Executable], *, commit: bool
+    ) -> List[ModelType]:
+        objs: List[ModelType] = []
+        for statement in statements:
+            q = db.execute(
+                select(self.model)
+                .from_statement(statement)
+                .execution_options(populate_existing=True)
+            )
+            objs.extend(q.scalars().all())
+        if commit:
+            db.commit()
+            self.invalidate_sync()
+        return objs
+
+    def _column_data(self, obj_in: Union[BaseModel, Dict[str, Any]]) -> Dict[str, Any]:
+        """Fields of `obj_in` to write, the set ones of a schema, without the non-column ones."""
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        columns = self.model.__table__.columns
+        return {field: value for field, value in update_data.items() if field in columns}
+
+    def _chunks(
+        self, rows: Iterable[Dict[str, Any]], chunk_size: int
+    ) -> Iterator[Tuple[FrozenSet[str], List[Dict[str, Any]]]]:
+        """Consecutive rows with the same fields, at most `chunk_size` and `MAX_BIND_PARAMS`, in
+        the order of `rows`."""
+        fields: FrozenSet[str] = frozenset()
+        chunk: List[Dict[str, Any]] = []
+        for row in rows:
+            row_fields = frozenset(row)
+            if chunk and (
+                row_fields != fields
+                or len(chunk) >= min(chunk_size, MAX_BIND_PARAMS // max(len(fields), 1))
+            ):
+                yield fields, chunk
+                chunk = []
+            fields = row_fields
+            chunk.append(row)
+        if chunk:
+            yield fields, chunk
+
+    def _insert_statements(
+        self,
+        objs_in: Iterable[Union[BaseModel, Dict[str, Any]]],
+        *,
+        chunk_size: int,
+        index_elements: Optional[Sequence[str]] = None,
+        update_fields: Optional[Sequence[str]] = None,
+    ) -> Iterator[Executable]:
+        # Plain dicts are taken as they are, only schemas go through the encoder
+        rows = (obj if isinstance(obj, dict) else jsonable_encoder(obj) for obj in objs_in)
+        for fields, chunk in self._chunks(rows, chunk_size):
+            statement = insert(self.model).values(chunk)
+            if index_elements is not None:
+                names = (
+                    update_fields
+                    if update_fields is not None
+                    else [name for name in chunk[0] if name not in index_elements]
+                )
+                if names:
+                    statement = statement.on_conflict_do_update(
+                        index_elements=list(index_elements),
+                        set_={name: statement.excluded[name] for name in names},
+                    )
+                else:
+                    statement = statement.on_conflict_do_nothing(
+                        index_elements=list(index_elements)
+                    )
+            yield statement.returning(*self.model.__table__.columns)
+
+    def _update_statements(
+        self,
+        objs_in: Iterable[Tuple[Any, Union[BaseModel, Dict[str, Any]]]],
+        *,
+        chunk_size: int,
+    ) -> Iterator[Executable]:
+        table = self.model.__table__
+        rows = ({**self._column_data(obj_in), "id": id} for id, obj_in in objs_in)
+        for fields, chunk in self._chunks(rows, chunk_size):
+            names = sorted(fields - {"id"})
+            if not names:
+                continue
+            # UPDATE ... FROM (VALUES ...) AS data, one row per object
+            data = values(
+                *(column(name, table.c[name].type) for name in ["id", *names]), name="data"
+            ).data([tuple(row[name] for name in ["id", *names]) for row in chunk])
+            yield (
+                update(table)
+                .where(table.c.id == data.c.id)
+                .values({name: data.c[name] for name in names})
+                .returning(*table.columns)
+            )
@@ -25,6 +25,7 @@ class CRUDIndustry(CRUDBase[Industry, IndustryCreate, IndustryUpdate]):
             industry = self.model(id=id, name=name, enName=enName)
             db.add(industry)
             db.commit()
+            self.invalidate_sync()
             db.refresh(industry)
             return industry, True
         except exc.IntegrityError:
@@ -33,4 +34,4 @@ class CRUDIndustry(CRUDBase[Industry, IndustryCreate, IndustryUpdate]):
             return industry, False
 
 
-industry = CRUDIndustry(Industry)
+industry = CRUDIndustry(Industry, cached=True)
@@ -1,7 +1,9 @@
-from typing import AsyncIterator, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
 
+from sqlalchemy import delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.orm import Session
 
 from app.crud.base import CRUDBase
 from app.models.ticker import Ticker
@@ -13,6 +15,50 @@ class CRUDTicker(CRUDBase[Ticker, TickerCreate, TickerUpdate]):
         q = await db.execute(select(self.model).where(self.model.ticker == ticker))
         return q.scalars().one_or_none()
 
+    async def get_by_exchange(self, db: AsyncSession, exchange: TickerExchange) -> List[Ticker]:
+        q = await db.execute(
+            select(self.model)
+            .where(self.model.exchange == exchange.value)
+            .order_by(self.model.ticker)
+        )
+        return q.scalars().all()
+
+    def get_symbols_sync(self, db: Session) -> List[str]:
+        q = db.execute(select(self.model.ticker).order_by(self.model.ticker))
+        return q.scalars().all()
+
+    def get_listing_sync(self, db: Session) -> Dict[str, Tuple[str, str, str, str]]:
+        """(exchange, full_name, short_name, type) of every ticker, without loading models."""
+        q = db.execute(
+            select(
+                self.model.ticker,
+                self.model.exchange,
+                self.model.full_name,
+                self.model.short_name,
+                self.model.type,
+            )
+        )
+        return {row[0]: tuple(row[1:]) for row in q}  # type: ignore
+
+    def sync_listing_sync(
+        self, db: Session, *, upserts: Sequence[Dict[str, Any]], delistings: Sequence[str]
+    ) -> None:
+        """Insert or update `upserts` by ticker and delete `delistings`, in one transaction.
+
+        Updates only change the exchange and the names, `name` and `type` are set on insert.
+        """
+        self.upsert_many_sync(
+            db,
+            objs_in=upserts,
+            index_elements=["ticker"],
+            update_fields=["exchange", "full_name", "short_name"],
+            commit=False,
+        )
+        if delistings:
+            db.execute(delete(self.model).where(self.model.ticker.in_(delistings)))
+        db.commit()
+        self.invalidate_sync()
+
     async def search_by_ticker(
         self,
         db: AsyncSession,
@@ -31,4 +77,4 @@ class CRUDTicker(CRUDBase[Ticker, TickerCreate, TickerUpdate]):
         return q.scalars().all()
 
 
-ticker = CRUDTicker(Ticker)
+ticker = CRUDTicker(Ticker, cached=True)
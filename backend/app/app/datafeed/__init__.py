@@ -0,0 +1,11 @@
+from .bars import *
+from .encoding import *
+from .history import *
+from .live import *
+from .providers import *
+from .quotes import *
+from .range_cache import *
+from .resample import *
+from .store import *
+from .symbol_index import *
+from .symbol_info import *
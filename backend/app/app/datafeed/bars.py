@@ -0,0 +1,126 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Sequence
+
+import numpy as np
+
+__all__ = ["Bars", "RESOLUTION_SECONDS", "normalize_resolution"]
+
+# Nominal length of one bar for every resolution we advertise to TradingView
+RESOLUTION_SECONDS: Dict[str, int] = {
+    "1": 60,
+    "5": 5 * 60,
+    "15": 15 * 60,
+    "30": 30 * 60,
+    "60": 60 * 60,
+    "D": 24 * 60 * 60,
+    "W": 7 * 24 * 60 * 60,
+    "M": 31 * 24 * 60 * 60,
+}
+
+
+def normalize_resolution(resolution: str) -> str:
+    """Map TradingView resolution aliases ("1D", "1W", "1M") to the canonical keys.
+
+    Raises:
+        ValueError: the resolution is not supported
+    """
+    resolution = resolution.upper()
+    if resolution in ("1D", "1W", "1M"):
+        resolution = resolution[1:]
+    if resolution not in RESOLUTION_SECONDS:
+        raise ValueError(f"Unsupported resolution: {resolution}")
+    return resolution
+
+
+@dataclass
+class Bars:
+    """Columnar OHLCV bars sorted by bar time (unix seconds)."""
+
+    t: np.ndarray
+    o: np.ndarray
+    h: np.ndarray
+    l: np.ndarray  # noqa: E741
+    c: np.ndarray
+    v: np.ndarray
+
+    @classmethod
+    def empty(cls) -> "Bars":
+        return cls(
+            t=np.empty(0, dtype=np.int64),
+            o=np.empty(0, dtype=np.float64),
+            h=np.empty(0, dtype=np.float64),
+            l=np.empty(0, dtype=np.float64),
+            c=np.empty(0, dtype=np.float64),
+            v=np.empty(0, dtype=np.int64),
+        )
+
+    @classmethod
+    def from_history(cls, data: Dict[str, Any]) -> "Bars":
+        """Build bars from a TradingView UDF `/history` payload."""
+        if data.get("s") != "ok" or not data.get("t"):
+            return cls.empty()
+        bars = cls(
+            t=np.asarray(data["t"], dtype=np.int64),
+            o=np.asarray(data["o"], dtype=np.float64),
+            h=np.asarray(data["h"], dtype=np.float64),
+            l=np.asarray(data["l"], dtype=np.float64),
+            c=np.asarray(data["c"], dtype=np.float64),
+            v=np.asarray(data["v"], dtype=np.float64).astype(np.int64),
+        )
+        return bars.sorted()
+
+    @classmethod
+    def concat(cls, parts: Sequence["Bars"]) -> "Bars":
+        """Merge bars into one sorted series; later parts win on equal timestamps."""
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return cls.empty()
+        if len(parts) == 1:
+            return parts[0]
+        return cls(
+            t=np.concatenate([part.t for part in parts]),
+            o=np.concatenate([part.o for part in parts]),
+            h=np.concatenate([part.h for part in parts]),
+            l=np.concatenate([part.l for part in parts]),
+            c=np.concatenate([part.c for part in parts]),
+            v=np.concatenate([part.v for part in parts]),
+        ).sorted()
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    def sorted(self) -> "Bars":
+        if len(self.t) < 2 or bool(np.all(self.t[1:] > self.t[:-1])):
+            return self
+        # Keep the last occurrence of duplicated timestamps
+        order = np.argsort(self.t, kind="stable")
+        t = self.t[order]
+        keep = np.append(t[1:] != t[:-1], True)
+        index = order[keep]
+        return self.take(index)
+
+    def take(self, index: Any) -> "Bars":
+        return Bars(
+            t=self.t[index],
+            o=self.o[index],
+            h=self.h[index],
+            l=self.l[index],
+            c=self.c[index],
+            v=self.v[index],
+        )
+
+    def slice(self, from_time: int, to_time: int) -> "Bars":
+        """Bars with `from_time <= t <= to_time`."""
+        start = int(np.searchsorted(self.t, from_time, side="left"))
+        stop = int(np.searchsorted(self.t, to_time, side="right"))
+        return self.take(slice(start, stop))
+
+    def to_dict(self) -> Dict[str, list]:
+        return {
+            "t": self.t.tolist(),
+            "o": self.o.tolist(),
+            "h": self.h.tolist(),
+            "l": self.l.tolist(),
+            "c": self.c.tolist(),
+            "v": self.v.tolist(),
+        }
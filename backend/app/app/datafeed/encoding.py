@@ -0,0 +1,84 @@
+import struct
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.core.serialization import dumps
+from app.datafeed.bars import Bars
+
+__all__ = [
+    "BARS_MEDIA_TYPE",
+    "STATUS_OK",
+    "STATUS_NO_DATA",
+    "encode_bars",
+    "decode_bars",
+    "bars_json",
+]
+
+BARS_MEDIA_TYPE = "application/octet-stream"
+
+STATUS_OK = 0
+STATUS_NO_DATA = 1
+
+MAGIC = b"BARS"
+VERSION = 1
+
+# magic, version, status, reserved, bar count, nextTime (0 when unknown)
+HEADER = struct.Struct("<4sBBHII")
+
+# 8-byte columns come first so that every column is aligned for typed-array views
+FLOAT_COLUMNS = ("o", "h", "l", "c", "v")
+
+
+def encode_bars(bars: Bars, next_time: Optional[int] = None) -> bytes:
+    """Columnar little-endian encoding of a history response.
+
+    Layout: a 16-byte header (`HEADER`), then `o`, `h`, `l`, `c`, `v` as float64 arrays and
+    `t` as a uint32 array, `count` items each. Empty bars encode a `no_data` response.
+    """
+    status = STATUS_OK if len(bars) else STATUS_NO_DATA
+    parts = [HEADER.pack(MAGIC, VERSION, status, 0, len(bars), next_time or 0)]
+    parts.extend(getattr(bars, name).astype("<f8").tobytes() for name in FLOAT_COLUMNS)
+    parts.append(bars.t.astype("<u4").tobytes())
+    return b"".join(parts)
+
+
+def decode_bars(data: bytes) -> Tuple[int, Bars, Optional[int]]:
+    """Inverse of `encode_bars`.
+
+    Returns:
+        status, bars and nextTime
+
+    Raises:
+        ValueError: not an encoded history response
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("Truncated bars payload")
+    magic, version, status, _, count, next_time = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Unsupported bars payload")
+    if len(data) != HEADER.size + count * (8 * len(FLOAT_COLUMNS) + 4):
+        raise ValueError("Truncated bars payload")
+
+    columns = {}
+    offset = HEADER.size
+    for name in FLOAT_COLUMNS:
+        columns[name] = np.frombuffer(data, dtype="<f8", count=count, offset=offset)
+        offset += 8 * count
+    t = np.frombuffer(data, dtype="<u4", count=count, offset=offset)
+    bars = Bars(
+        t=t.astype(np.int64),
+        o=columns["o"].astype(np.float64),
+        h=columns["h"].astype(np.float64),
+        l=columns["l"].astype(np.float64),
+        c=columns["c"].astype(np.float64),
+        v=columns["v"].astype(np.int64),
+    )
+    return status, bars, next_time or None
+
+
+def bars_json(bars: Bars) -> bytes:
+    """`HistoryFullDataResponse` JSON of `bars`, without per-element validation."""
+    return dumps(
+        {"s": "ok", "t": bars.t, "o": bars.o, "h": bars.h, "l": bars.l, "c": bars.c, "v": bars.v}
+    )
@@ -0,0 +1,258 @@
+import asyncio
+import json
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+from aiohttp import ClientError
+from influxdb_client.client.exceptions import InfluxDBError
+from loguru import logger
+from redis.asyncio import Redis
+from redis.asyncio.lock import Lock
+from redis.exceptions import RedisError
+
+from app.core.http_client import HttpClients
+from app.core.settings import settings
+from app.datafeed.bars import Bars, normalize_resolution, RESOLUTION_SECONDS
+from app.datafeed.providers import ProviderPool
+from app.datafeed.range_cache import IntervalSet, range_cache, RangeCache
+from app.datafeed.resample import BASE_RESOLUTION, bucket_start, resample
+from app.datafeed.store import BarStore
+from app.utils import SingleFlight
+
+__all__ = ["HistoryService"]
+
+STORE_ERRORS = (InfluxDBError, ClientError, asyncio.TimeoutError)
+
+LoadResult = Tuple[Bars, List[Tuple[int, int]]]
+
+
+def _dumps(result: LoadResult) -> str:
+    bars, covered = result
+    return json.dumps({"bars": bars.to_dict(), "covered": covered})
+
+
+def _loads(raw: bytes) -> LoadResult:
+    data = json.loads(raw)
+    return (
+        Bars.from_history({"s": "ok", **data["bars"]}),
+        [(start, end) for start, end in data["covered"]],
+    )
+
+
+def _aggregate(bars: Bars, resolution: str, from_time: int, to_time: int) -> Bars:
+    """Resample base bars to `resolution` and keep the bars starting in `[from_time, to_time]`.
+
+    A bucket starting before `from_time` may be missing base bars and is dropped.
+    """
+    return resample(bars, resolution).slice(from_time, to_time)
+
+
+class HistoryService:
+    """History bars served from the range cache, the bar store and upstream, in that order.
+
+    Only the base resolutions ("1" and "D") are cached, stored and fetched; the others are
+    resampled from them on every request.
+
+    Only the sub-intervals that neither the range cache nor the bar store cover are fetched
+    from the `providers` pool. The most recent bar may still be forming, so coverage is never
+    recorded past `now - bar length`.
+
+    Concurrent loads of the same range share one in-flight task per worker. With `redis` set,
+    workers also serialize on a Redis lock per range and hand the result over for
+    `HISTORY_SINGLEFLIGHT_RESULT_TTL` seconds, so one upstream call serves all of them.
+    """
+
+    def __init__(
+        self,
+        store: BarStore,
+        clients: HttpClients,
+        *,
+        cache: RangeCache = range_cache,
+        redis: Optional[Redis] = None,
+        providers: Optional[ProviderPool] = None,
+    ) -> None:
+        self.store = store
+        self.clients = clients
+        self.providers = providers or ProviderPool.from_settings()
+        self.cache = cache
+        self.redis = redis
+        self._flights: SingleFlight[LoadResult] = SingleFlight()
+
+    async def get_history(
+        self,
+        symbol: str,
+        resolution: str,
+        from_time: int,
+        to_time: int,
+        countback: Optional[int] = None,
+    ) -> Bars:
+        """Bars of `symbol` in `[from_time, to_time]`.
+
+        Only 1-minute and daily bars are loaded; other resolutions are aggregated from them.
+        With `countback`, the last `countback` bars up to `to_time` are returned instead: bars
+        missing from `[from_time, to_time]` are taken from a reverse scan of the bar store,
+        which never goes upstream.
+
+        Raises:
+            ValueError: unsupported resolution or invalid upstream payload
+            httpx.HTTPError: upstream request failed
+        """
+        resolution = normalize_resolution(resolution)
+        base_resolution = BASE_RESOLUTION[resolution]
+
+        bars = await self._get_base_bars(symbol, base_resolution, from_time, to_time)
+        result = _aggregate(bars, resolution, from_time, to_time)
+        if countback is None or countback <= 0:
+            return result
+        if len(result) < countback:
+            # Base bars per target bar while the market is open
+            ratio = RESOLUTION_SECONDS[resolution] // RESOLUTION_SECONDS[base_resolution]
+            try:
+                older = await self.store.get_last_bars(
+                    symbol, base_resolution, from_time - 1, (countback - len(result)) * ratio
+                )
+            except STORE_ERRORS as e:
+                logger.error("Error when reading bar store: {error}", error=str(e))
+                older = Bars.empty()
+            if len(older):
+                result = _aggregate(Bars.concat((older, bars)), resolution, older.t[0], to_time)
+        return result.take(slice(max(len(result) - countback, 0), None))
+
+    async def get_next_time(self, symbol: str, resolution: str, to_time: int) -> Optional[int]:
+        """Time of the closest stored bar at or before `to_time`, for TradingView `nextTime`."""
+        resolution = normalize_resolution(resolution)
+        try:
+            last_time = await self.store.get_last_time(symbol, BASE_RESOLUTION[resolution], to_time)
+        except STORE_ERRORS as e:
+            logger.error("Error when reading bar store: {error}", error=str(e))
+            return None
+        if last_time is None:
+            return None
+        return int(bucket_start(np.array([last_time], dtype=np.int64), resolution)[0])
+
+    async def _get_base_bars(
+        self, symbol: str, resolution: str, from_time: int, to_time: int
+    ) -> Bars:
+        gaps = self.cache.missing(symbol, resolution, from_time, to_time)
+        if gaps:
+            fresh_to = int(time.time()) - RESOLUTION_SECONDS[resolution]
+            results = await asyncio.gather(
+                *(
+                    self._flights.do(
+                        (symbol, resolution, gap_from, gap_to),
+                        lambda gap_from=gap_from, gap_to=gap_to: self._load_range_shared(
+                            symbol, resolution, gap_from, gap_to, fresh_to
+                        ),
+                    )
+                    for gap_from, gap_to in gaps
+                )
+            )
+            for bars, covered in results:
+                self.cache.put(symbol, resolution, bars, covered)
+
+        return self.cache.get(symbol, resolution, from_time, to_time)
+
+    async def _load_range_shared(
+        self, symbol: str, resolution: str, from_time: int, to_time: int, fresh_to: int
+    ) -> LoadResult:
+        if self.redis is None:
+            return await self._load_range(symbol, resolution, from_time, to_time, fresh_to)
+
+        key = f"history:{symbol}:{resolution}:{from_time}:{to_time}"
+        lock = self.redis.lock(
+            f"{key}:lock",
+            timeout=settings.HISTORY_SINGLEFLIGHT_TIMEOUT,
+            blocking_timeout=settings.HISTORY_SINGLEFLIGHT_TIMEOUT,
+        )
+        try:
+            # Blocks while another worker loads the same range
+            acquired = await lock.acquire()
+            if acquired and (raw := await self.redis.get(f"{key}:result")) is not None:
+                await self._release(lock)
+                return _loads(raw)
+        except RedisError as e:
+            logger.error("Error when coalescing history through redis: {error}", error=str(e))
+            acquired = False
+
+        try:
+            result = await self._load_range(symbol, resolution, from_time, to_time, fresh_to)
+            if acquired:
+                await self._share(f"{key}:result", result)
+            return result
+        finally:
+            if acquired:
+                await self._release(lock)
+
+    async def _share(self, key: str, result: LoadResult) -> None:
+        try:
+            await self.redis.set(  # type: ignore
+                key, _dumps(result), ex=settings.HISTORY_SINGLEFLIGHT_RESULT_TTL
+            )
+        except RedisError as e:
+            logger.error("Error when coalescing history through redis: {error}", error=str(e))
+
+    async def _release(self, lock: Lock) -> None:
+        try:
+            await lock.release()
+        except RedisError:
+            # Lock already expired
+            pass
+
+    async def _load_range(
+        self, symbol: str, resolution: str, from_time: int, to_time: int, fresh_to: int
+    ) -> LoadResult:
+        """Bars of `[from_time, to_time]` from the bar store, filling its gaps from upstream.
+
+        Returns:
+            bars and the intervals they completely describe
+        """
+        try:
+            stored = IntervalSet(
+                await self.store.get_coverage(symbol, resolution, from_time, to_time)
+            )
+            gaps = stored.missing(from_time, to_time)
+            parts = []
+            if gaps != [(from_time, to_time)]:
+                parts.append(await self.store.get_bars(symbol, resolution, from_time, to_time))
+        except STORE_ERRORS as e:
+            logger.error("Error when reading bar store: {error}", error=str(e))
+            stored, gaps, parts = IntervalSet(), [(from_time, to_time)], []
+
+        covered = [
+            (max(start, from_time), min(end, to_time))
+            for start, end in stored
+            if start <= to_time and end >= from_time
+        ]
+        for gap_from, gap_to in gaps:
+            bars, fetched = await self._fetch_upstream(
+                symbol, resolution, gap_from, gap_to, stored, fresh_to
+            )
+            parts.append(bars)
+            covered.extend(fetched)
+        return Bars.concat(parts), covered
+
+    async def _fetch_upstream(
+        self,
+        symbol: str,
+        resolution: str,
+        from_time: int,
+        to_time: int,
+        stored: IntervalSet,
+        fresh_to: int,
+    ) -> LoadResult:
+        bars = await self.providers.fetch(self.clients, symbol, resolution, from_time, to_time)
+        covered_to = min(to_time, fresh_to)
+        if covered_to < from_time:
+            return bars, []
+
+        try:
+            await self.store.put_bars(symbol, resolution, bars)
+            stored.add(from_time, covered_to)
+            # Persist the union with neighbouring ranges so coverage lookups stay short
+            for start, end in stored:
+                if start <= from_time <= end:
+                    await self.store.put_coverage(symbol, resolution, start, end)
+        except STORE_ERRORS as e:
+            logger.error("Error when writing bar store: {error}", error=str(e))
+        return bars, [(from_time, covered_to)]
@@ -0,0 +1,329 @@
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import httpx
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.settings import settings
+from app.datafeed.bars import normalize_resolution
+from app.datafeed.history import HistoryService
+from app.datafeed.resample import Session, tick_bucket, VN_SESSION
+
+__all__ = ["QUOTE", "tick_channel", "LiveBar", "LiveQuote", "StreamClient", "StreamHub"]
+
+# (symbol, resolution), or (symbol, QUOTE) for quote subscriptions
+Key = Tuple[str, str]
+
+QUOTE = "quote"
+
+
+def tick_channel(symbol: str) -> str:
+    """Redis channel the streamer publishes the ticks of `symbol` to."""
+    return f"{settings.STREAMER_CHANNEL_PREFIX}:{symbol}"
+
+
+class LiveBar:
+    """Current bar of one symbol and resolution, built from ticks.
+
+    Bars are TradingView bar objects (`time` in milliseconds). The dict is updated in place
+    until the next bar starts.
+    """
+
+    def __init__(self, resolution: str, session: Session = VN_SESSION) -> None:
+        self.resolution = resolution
+        self.session = session
+        self.bar: Optional[Dict[str, Any]] = None
+
+    def seed(self, t: int, o: float, h: float, l: float, c: float, v: int) -> None:  # noqa: E741
+        """Merge the bar at `t` loaded from history into the live bar."""
+        time_ms = t * 1000
+        bar = self.bar
+        if bar is None or bar["time"] < time_ms:
+            self.bar = {"time": time_ms, "open": o, "high": h, "low": l, "close": c, "volume": v}
+        elif bar["time"] == time_ms:
+            # Ticks received while loading may or may not be part of the loaded bar
+            bar["open"] = o
+            bar["high"] = max(h, bar["high"])
+            bar["low"] = min(l, bar["low"])
+            bar["volume"] = max(v, bar["volume"])
+
+    def apply(self, t: int, price: float, volume: int) -> Optional[Dict[str, Any]]:
+        """Add a trade, `None` when it belongs to a bar that is already over."""
+        time_ms = tick_bucket(t, self.resolution, self.session) * 1000
+        bar = self.bar
+        if bar is None or bar["time"] < time_ms:
+            bar = self.bar = {
+                "time": time_ms,
+                "open": price,
+                "high": price,
+                "low": price,
+                "close": price,
+                "volume": volume,
+            }
+        elif bar["time"] == time_ms:
+            bar["high"] = max(bar["high"], price)
+            bar["low"] = min(bar["low"], price)
+            bar["close"] = price
+            bar["volume"] += volume
+        else:
+            return None
+        return bar
+
+    def snapshot(self) -> Optional[Dict[str, Any]]:
+        """Copy of the current value, safe to share between clients."""
+        return None if self.bar is None else dict(self.bar)
+
+
+class LiveQuote(LiveBar):
+    """Quote of one symbol, the daily bar in TradingView `QuoteValues` fields."""
+
+    def __init__(self, session: Session = VN_SESSION) -> None:
+        super().__init__("D", session)
+
+    def snapshot(self) -> Optional[Dict[str, Any]]:
+        bar = self.bar
+        if bar is None:
+            return None
+        # Without `time`, clients replace a pending quote instead of keeping the previous day
+        return {
+            "lp": bar["close"],
+            "open_price": bar["open"],
+            "high_price": bar["high"],
+            "low_price": bar["low"],
+            "volume": bar["volume"],
+        }
+
+
+class StreamClient:
+    """Pending updates of one connection, at most the latest bar per subscription.
+
+    A consumer that falls behind skips intermediate updates instead of queueing them. When a
+    new bar starts, the final state of the previous one is kept so that it is not lost.
+    """
+
+    def __init__(self) -> None:
+        self.subscriptions: "Counter[Key]" = Counter()
+        self._pending: Dict[Key, List[Dict[str, Any]]] = {}
+        self._sent: Dict[Key, Dict[str, Any]] = {}
+        self._ready = asyncio.Event()
+
+    def push(self, key: Key, bar: Dict[str, Any]) -> None:
+        """Queue `bar`, a snapshot shared with the other clients that must not be modified."""
+        pending = self._pending.get(key)
+        if not pending:
+            self._pending[key] = [bar]
+        elif pending[-1].get("time") == bar.get("time"):
+            pending[-1] = bar
+        else:
+            self._pending[key] = [pending[-1], bar]
+        self._ready.set()
+
+    def drop(self, key: Key) -> None:
+        del self.subscriptions[key]
+        self._pending.pop(key, None)
+        self._sent.pop(key, None)
+
+    async def get(self, timeout: Optional[float] = None) -> List[Tuple[Key, Dict[str, Any]]]:
+        """Wait for updates and take all of them, nothing after `timeout` seconds."""
+        if timeout is None:
+            await self._ready.wait()
+        else:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        self._ready.clear()
+        pending, self._pending = self._pending, {}
+        return [(key, bar) for key, bars in pending.items() for bar in bars]
+
+    def delta(self, key: Key, value: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Fields of `value` that changed since the last delta of `key`, `None` if none did.
+
+        A bar is sent whole when it starts; later deltas of the bar always carry its `time`.
+        """
+        sent = self._sent.get(key)
+        self._sent[key] = value
+        if sent is None or sent.get("time") != value.get("time"):
+            return value
+        changed = {field: v for field, v in value.items() if sent.get(field) != v}
+        if not changed:
+            return None
+        if "time" in value:
+            changed["time"] = value["time"]
+        return changed
+
+
+class StreamHub:
+    """Fan out live bars and quotes from the streamer's redis channels to the connected clients.
+
+    The worker holds one redis subscription per symbol and one `LiveBar` per symbol and
+    resolution (or `LiveQuote` per symbol), whatever the number of clients. A new one is seeded
+    with the current bar from `history`, so that the first update is not limited to the trades
+    seen since.
+    """
+
+    def __init__(
+        self, redis: Redis, history: HistoryService, *, session: Session = VN_SESSION
+    ) -> None:
+        self.redis = redis
+        self.history = history
+        self.session = session
+        self._pubsub = redis.pubsub()
+        self._live: Dict[str, Dict[str, LiveBar]] = {}
+        self._clients: Dict[Key, Set[StreamClient]] = {}
+        self._reader: Optional["asyncio.Task[None]"] = None
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+            self._reader = None
+        await self._pubsub.close()
+
+    async def subscribe(self, client: StreamClient, symbol: str, resolution: str) -> None:
+        """
+        Raises:
+            ValueError: unsupported resolution
+            RedisError: subscribing to the symbol channel failed
+        """
+        await self._subscribe(client, (symbol, normalize_resolution(resolution)))
+
+    async def subscribe_quote(self, client: StreamClient, symbol: str) -> None:
+        """
+        Raises:
+            RedisError: subscribing to the symbol channel failed
+        """
+        await self._subscribe(client, (symbol, QUOTE))
+
+    async def unsubscribe(self, client: StreamClient, symbol: str, resolution: str) -> None:
+        await self._unsubscribe(client, (symbol, normalize_resolution(resolution)))
+
+    async def unsubscribe_quote(self, client: StreamClient, symbol: str) -> None:
+        await self._unsubscribe(client, (symbol, QUOTE))
+
+    async def remove(self, client: StreamClient) -> None:
+        """Drop every subscription of a disconnected client."""
+        for key in list(client.subscriptions):
+            await self._remove(client, key)
+
+    async def _subscribe(self, client: StreamClient, key: Key) -> None:
+        client.subscriptions[key] += 1
+        if client.subscriptions[key] > 1:
+            return
+        self._clients.setdefault(key, set()).add(client)
+
+        symbol, name = key
+        lives = self._live.get(symbol)
+        if lives is None:
+            lives = self._live[symbol] = {}
+            try:
+                await self._pubsub.subscribe(tick_channel(symbol))
+            except RedisError:
+                del self._live[symbol]
+                self._discard(client, key)
+                raise
+            if self._reader is None:
+                self._reader = asyncio.ensure_future(self._read())
+
+        live = lives.get(name)
+        if live is None:
+            live = lives[name] = (
+                LiveQuote(self.session) if name == QUOTE else LiveBar(name, self.session)
+            )
+            await self._seed(symbol, live)
+        snapshot = live.snapshot()
+        if snapshot is not None:
+            client.push(key, snapshot)
+
+    async def _unsubscribe(self, client: StreamClient, key: Key) -> None:
+        if client.subscriptions[key] <= 0:
+            return
+        client.subscriptions[key] -= 1
+        if client.subscriptions[key] == 0:
+            await self._remove(client, key)
+
+    def _discard(self, client: StreamClient, key: Key) -> bool:
+        """Forget `client` for `key`, `True` when nobody else is subscribed."""
+        client.drop(key)
+        clients = self._clients.get(key, set())
+        clients.discard(client)
+        if clients:
+            return False
+        self._clients.pop(key, None)
+        return True
+
+    async def _remove(self, client: StreamClient, key: Key) -> None:
+        if not self._discard(client, key):
+            return
+        symbol, name = key
+        lives = self._live.get(symbol, {})
+        lives.pop(name, None)
+        if lives or symbol not in self._live:
+            return
+        del self._live[symbol]
+        try:
+            await self._pubsub.unsubscribe(tick_channel(symbol))
+        except RedisError as e:
+            logger.error("Error when unsubscribing from ticks: {error}", error=str(e))
+
+    async def _seed(self, symbol: str, live: LiveBar) -> None:
+        now = int(time.time())
+        start = tick_bucket(now, live.resolution, self.session)
+        try:
+            bars = await self.history.get_history(symbol, live.resolution, start, now)
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error("Error when seeding live bar: {error}", error=str(e))
+            return
+        if len(bars) and bars.t[-1] == start:
+            i = len(bars) - 1
+            live.seed(
+                int(bars.t[i]),
+                float(bars.o[i]),
+                float(bars.h[i]),
+                float(bars.l[i]),
+                float(bars.c[i]),
+                int(bars.v[i]),
+            )
+
+    async def _next_message(self) -> Optional[Dict[str, Any]]:
+        """Next tick message, `None` on timeouts, errors and other messages."""
+        try:
+            message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+        except RedisError as e:
+            logger.error("Error when reading ticks: {error}", error=str(e))
+            await asyncio.sleep(1.0)
+            return None
+        if message is None or message["type"] != "message":
+            return None
+        return message
+
+    @staticmethod
+    def _parse_tick(message: Dict[str, Any]) -> Optional[Tuple[str, int, float, int]]:
+        """Symbol, time, price and volume of a tick message, `None` if it is invalid."""
+        symbol = message["channel"].decode()[len(tick_channel("")) :]
+        try:
+            tick = json.loads(message["data"])
+            return symbol, int(tick["time"]), float(tick["price"]), int(tick["volume"])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def _apply(self, symbol: str, t: int, price: float, volume: int) -> None:
+        """Apply a tick to the live bars of `symbol` and push the changed ones to their clients."""
+        for name, live in self._live.get(symbol, {}).items():
+            snapshot = live.snapshot() if live.apply(t, price, volume) is not None else None
+            if snapshot is None:
+                continue
+            key = (symbol, name)
+            for client in self._clients.get(key, ()):
+                client.push(key, snapshot)
+
+    async def _read(self) -> None:
+        while True:
+            message = await self._next_message()
+            tick = self._parse_tick(message) if message is not None else None
+            if tick is not None:
+                self._apply(*tick)
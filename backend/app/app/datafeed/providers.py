@@ -0,0 +1,383 @@
+import asyncio
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from app.core.http_client import HttpClients
+from app.core.settings import settings
+from app.datafeed.bars import Bars, RESOLUTION_SECONDS
+
+__all__ = ["Provider", "UDFProvider", "TCBSProvider", "ProviderStats", "ProviderPool", "PROVIDERS"]
+
+DAY_SECONDS = 24 * 60 * 60
+VN_UTC_OFFSET = 7 * 60 * 60
+
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36"  # noqa: B950
+SEC_CH_UA = '"Not?A_Brand";v="8", "Chromium";v="108", "Google Chrome";v="108"'
+
+
+def align_bars(bars: Bars, resolution: str) -> Bars:
+    """Snap bar times to a common convention so that providers can be mixed.
+
+    Intraday bars start on the minute (SSI stamps 1-minute bars at :59), daily and longer bars
+    at 00:00 UTC of their trading date in Asia/Ho_Chi_Minh.
+    """
+    if not len(bars):
+        return bars
+    if resolution in ("D", "W", "M"):
+        t = (bars.t + VN_UTC_OFFSET) // DAY_SECONDS * DAY_SECONDS
+    else:
+        t = bars.t - bars.t % 60
+    return Bars(t=t, o=bars.o, h=bars.h, l=bars.l, c=bars.c, v=bars.v).sorted()
+
+
+class Provider(ABC):
+    """Upstream source of history bars."""
+
+    name: str
+    url: str
+
+    @abstractmethod
+    async def fetch(
+        self, clients: HttpClients, symbol: str, resolution: str, from_time: int, to_time: int
+    ) -> Bars:
+        """Bars of `[from_time, to_time]`, aligned with `align_bars`.
+
+        Raises:
+            httpx.HTTPError: request failed
+            ValueError: error or invalid payload
+        """
+
+
+class UDFProvider(Provider):
+    """Provider exposing a TradingView UDF `/history` endpoint."""
+
+    def __init__(self, name: str, url: str, headers: Dict[str, str]) -> None:
+        self.name = name
+        self.url = url
+        self.headers = headers
+
+    async def fetch(
+        self, clients: HttpClients, symbol: str, resolution: str, from_time: int, to_time: int
+    ) -> Bars:
+        params = {
+            "resolution": resolution,
+            "symbol": symbol,
+            "from": str(from_time),
+            "to": str(to_time),
+        }
+        response = await clients.for_url(self.url).get(
+            self.url, params=params, headers=self.headers
+        )
+        response.raise_for_status()
+        data = response.json()
+        if not isinstance(data, dict):
+            raise ValueError(f"{self.name}: invalid history payload")
+        if data.get("s") == "error":
+            raise ValueError(f"{self.name}: {data.get('errmsg')}")
+        try:
+            bars = Bars.from_history(data)
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"{self.name}: invalid history payload") from e
+        return align_bars(bars, resolution).slice(from_time, to_time)
+
+
+class TCBSProvider(Provider):
+    """TCBS stock-insight bars, which take a bar count instead of a start time."""
+
+    name = "tcbs"
+    url = "https://apipubaws.tcbs.com.vn/stock-insight/v2/stock/bars"
+    long_term_url = "https://apipubaws.tcbs.com.vn/stock-insight/v2/stock/bars-long-term"
+    headers = {
+        "sec-ch-ua": SEC_CH_UA,
+        "Accept-language": "vi",
+        "sec-ch-ua-mobile": "?0",
+        "User-Agent": USER_AGENT,
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+        "Referer": "https://tcinvest.tcbs.com.vn/",
+        "sec-ch-ua-platform": '"Linux"',
+    }
+    # TCBS quotes prices in VND, the UDF providers in thousands of VND
+    price_divisor = 1000.0
+
+    async def fetch(
+        self, clients: HttpClients, symbol: str, resolution: str, from_time: int, to_time: int
+    ) -> Bars:
+        url = self.long_term_url if resolution in ("D", "W", "M") else self.url
+        params = {
+            "ticker": symbol,
+            "type": "stock",
+            "resolution": resolution,
+            "to": str(to_time),
+            "countBack": str(math.ceil((to_time - from_time) / RESOLUTION_SECONDS[resolution]) + 1),
+        }
+        response = await clients.for_url(url).get(url, params=params, headers=self.headers)
+        response.raise_for_status()
+        try:
+            rows = response.json()["data"] or []
+            if not rows:
+                return Bars.empty()
+            frame = pd.DataFrame(rows)
+            bars = Bars(
+                t=pd.to_datetime(frame["tradingDate"], utc=True)
+                .dt.tz_convert(None)
+                .to_numpy(dtype="datetime64[s]")
+                .astype(np.int64),
+                o=frame["open"].to_numpy(dtype=np.float64) / self.price_divisor,
+                h=frame["high"].to_numpy(dtype=np.float64) / self.price_divisor,
+                l=frame["low"].to_numpy(dtype=np.float64) / self.price_divisor,
+                c=frame["close"].to_numpy(dtype=np.float64) / self.price_divisor,
+                v=frame["volume"].to_numpy(dtype=np.float64).astype(np.int64),
+            )
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"{self.name}: invalid history payload") from e
+        return align_bars(bars.sorted(), resolution).slice(from_time, to_time)
+
+
+PROVIDERS: Dict[str, Provider] = {
+    "ssi": UDFProvider(
+        "ssi",
+        "https://iboard.ssi.com.vn/dchart/api/history",
+        {
+            "Accept": "application/json, text/plain, */*",
+            "Accept-Language": "vi,en;q=0.9",
+            "Sec-Fetch-Dest": "empty",
+            "Sec-Fetch-Mode": "cors",
+            "Sec-Fetch-Site": "same-origin",
+            "User-Agent": USER_AGENT,
+            "sec-ch-ua": SEC_CH_UA,
+            "sec-ch-ua-mobile": "?0",
+            "sec-ch-ua-platform": '"Linux"',
+        },
+    ),
+    "vps": UDFProvider(
+        "vps",
+        "https://histdatafeed.vps.com.vn/tradingview/history",
+        {
+            "Accept": "*/*",
+            "Accept-Language": "vi,en;q=0.9",
+            "Origin": "https://chart.vps.com.vn",
+            "Referer": "https://chart.vps.com.vn/",
+            "Sec-Fetch-Dest": "empty",
+            "Sec-Fetch-Mode": "cors",
+            "Sec-Fetch-Site": "same-site",
+            "User-Agent": USER_AGENT,
+            "sec-ch-ua": SEC_CH_UA,
+            "sec-ch-ua-mobile": "?0",
+            "sec-ch-ua-platform": '"Linux"',
+        },
+    ),
+    "vndirect": UDFProvider(
+        "vndirect",
+        "https://dchart-api.vndirect.com.vn/dchart/history",
+        {
+            "Accept": "application/json, text/plain, */*",
+            "Accept-Language": "vi,en;q=0.9",
+            "Origin": "https://dchart.vndirect.com.vn",
+            "Referer": "https://dchart.vndirect.com.vn/",
+            "Sec-Fetch-Dest": "empty",
+            "Sec-Fetch-Mode": "cors",
+            "Sec-Fetch-Site": "same-site",
+            "User-Agent": USER_AGENT,
+            "sec-ch-ua": SEC_CH_UA,
+            "sec-ch-ua-mobile": "?0",
+            "sec-ch-ua-platform": '"Linux"',
+        },
+    ),
+    "mbs": UDFProvider(
+        "mbs",
+        "https://plus24.mbs.com.vn/tradingview/api/1.1/history",
+        {
+            "accept": "*/*",
+            "accept-language": "vi,en;q=0.9",
+            "referer": "https://plus24.mbs.com.vn/apps/StockBoard/MBS/chi-tiet-ma.html",
+            "sec-ch-ua": SEC_CH_UA,
+            "sec-ch-ua-mobile": "?0",
+            "sec-ch-ua-platform": '"Linux"',
+            "sec-fetch-dest": "empty",
+            "sec-fetch-mode": "cors",
+            "sec-fetch-site": "same-origin",
+            "user-agent": USER_AGENT,
+        },
+    ),
+    "tcbs": TCBSProvider(),
+}
+
+
+class ProviderStats:
+    """Rolling latency window and health score of one provider.
+
+    Health is an exponentially weighted success rate. After `max_failures` consecutive
+    failures the provider is skipped for `cooldown` seconds.
+    """
+
+    def __init__(
+        self, window: int = 200, alpha: float = 0.2, max_failures: int = 3, cooldown: float = 30.0
+    ) -> None:
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.alpha = alpha
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.health = 1.0
+        self.failures = 0
+        self.down_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def record_latency(self, latency: float) -> None:
+        self.latencies.append(latency)
+
+    def record_success(self, latency: float) -> None:
+        self.record_latency(latency)
+        self.health += self.alpha * (1.0 - self.health)
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.health -= self.alpha * self.health
+        self.failures += 1
+        if self.failures >= self.max_failures:
+            self.down_until = time.monotonic() + self.cooldown
+
+    def percentile(self, q: float, min_samples: int = 20) -> Optional[float]:
+        if len(self.latencies) < min_samples:
+            return None
+        return float(np.percentile(np.fromiter(self.latencies, dtype=np.float64), q))
+
+
+class ProviderPool:
+    """Fetch history from the healthiest provider, hedging slow calls and failing over.
+
+    Providers are ranked by health, then by their configured order. When the primary has not
+    answered within its p95 latency a hedged request goes to the next provider and the first
+    successful answer wins. Failed calls fail over to the next provider until one succeeds.
+    """
+
+    def __init__(
+        self,
+        providers: Sequence[Provider],
+        *,
+        hedge_delay: float = 0.5,
+        min_hedge_delay: float = 0.05,
+        cooldown: float = 30.0,
+    ) -> None:
+        self.providers = list(providers)
+        self.hedge_delay = hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.stats = {provider.name: ProviderStats(cooldown=cooldown) for provider in providers}
+
+    @classmethod
+    def from_settings(cls) -> "ProviderPool":
+        return cls(
+            [PROVIDERS[name] for name in settings.HISTORY_PROVIDERS],
+            hedge_delay=settings.HISTORY_HEDGE_DELAY,
+            min_hedge_delay=settings.HISTORY_HEDGE_MIN_DELAY,
+            cooldown=settings.HISTORY_PROVIDER_COOLDOWN,
+        )
+
+    def ranked(self) -> List[Provider]:
+        available = [p for p in self.providers if self.stats[p.name].available] or self.providers
+        # Stable sort keeps the configured order between providers of similar health
+        return sorted(available, key=lambda p: -round(self.stats[p.name].health, 1))
+
+    def hedge_delay_for(self, provider: Provider) -> float:
+        p95 = self.stats[provider.name].percentile(95)
+        return self.hedge_delay if p95 is None else max(p95, self.min_hedge_delay)
+
+    async def _timed_fetch(self, provider: Provider, *args: Any) -> Bars:
+        stats = self.stats[provider.name]
+        start = time.perf_counter()
+        try:
+            bars = await provider.fetch(*args)
+        except asyncio.CancelledError:
+            # Lost a hedge race: the call took at least this long
+            stats.record_latency(time.perf_counter() - start)
+            raise
+        except (httpx.HTTPError, ValueError):
+            stats.record_failure()
+            raise
+        stats.record_success(time.perf_counter() - start)
+        return bars
+
+    def _launch(
+        self,
+        candidates: Iterator[Provider],
+        running: Dict["asyncio.Task[Bars]", Provider],
+        args: Tuple[Any, ...],
+    ) -> None:
+        """Start a fetch from the next candidate, if any, into `running`."""
+        provider = next(candidates, None)
+        if provider is not None:
+            running[asyncio.ensure_future(self._timed_fetch(provider, *args))] = provider
+
+    def _wait_timeout(
+        self, running: Dict["asyncio.Task[Bars]", Provider], hedged: bool
+    ) -> Optional[float]:
+        """How long to wait for the primary before hedging, `None` once hedged."""
+        if hedged or len(running) != 1:
+            return None
+        return self.hedge_delay_for(next(iter(running.values())))
+
+    @staticmethod
+    def _collect(
+        done: Set["asyncio.Task[Bars]"], running: Dict["asyncio.Task[Bars]", Provider]
+    ) -> Tuple[Optional[Bars], Optional[BaseException]]:
+        """Bars of the first successful task of `done`, else the error of the last one."""
+        error: Optional[BaseException] = None
+        for task in done:
+            del running[task]
+            if task.exception() is None:
+                return task.result(), None
+            error = task.exception()
+        return None, error
+
+    async def fetch(
+        self, clients: HttpClients, symbol: str, resolution: str, from_time: int, to_time: int
+    ) -> Bars:
+        """Bars of `[from_time, to_time]` from the first provider that answers successfully.
+
+        Raises:
+            httpx.HTTPError: every provider failed, error of the last one
+            ValueError: every provider failed, error of the last one
+        """
+        candidates: Iterator[Provider] = iter(self.ranked())
+        running: Dict["asyncio.Task[Bars]", Provider] = {}
+        args = (clients, symbol, resolution, from_time, to_time)
+        hedged = False
+        last_error: Optional[BaseException] = None
+
+        self._launch(candidates, running, args)
+        try:
+            while running:
+                done, _ = await asyncio.wait(
+                    set(running),
+                    timeout=self._wait_timeout(running, hedged),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # Primary is slower than its p95: race it against the next provider
+                    hedged = True
+                    self._launch(candidates, running, args)
+                    continue
+
+                bars, error = self._collect(done, running)
+                if bars is not None:
+                    return bars
+                last_error = error or last_error
+                if not running:
+                    self._launch(candidates, running, args)
+        finally:
+            for task in running:
+                task.cancel()
+
+        if last_error is not None:
+            raise last_error
+        raise ValueError("No history provider configured")
@@ -0,0 +1,234 @@
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import httpx
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.http_client import HttpClients
+from app.core.settings import settings
+from app.datafeed.live import tick_channel
+from app.datafeed.providers import SEC_CH_UA, USER_AGENT
+
+__all__ = ["parse_vps_quote", "QuoteTable"]
+
+VPS_QUOTE_HEADERS = {
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "vi,en;q=0.9",
+    "Origin": "https://banggia.vps.com.vn",
+    "Referer": "https://banggia.vps.com.vn/",
+    "Sec-Fetch-Dest": "empty",
+    "Sec-Fetch-Mode": "cors",
+    "Sec-Fetch-Site": "same-site",
+    "User-Agent": USER_AGENT,
+    "sec-ch-ua": SEC_CH_UA,
+    "sec-ch-ua-mobile": "?0",
+    "sec-ch-ua-platform": '"Linux"',
+}
+
+
+def _price(item: Dict[str, Any], field: str) -> Optional[float]:
+    """Price `field` of a VPS board row, `None` when missing or zero (no trade yet)."""
+    value = item.get(field)
+    if isinstance(value, str):
+        # Order book levels are "price|volume|color"
+        value = value.split("|", 1)[0]
+    try:
+        price = float(value)  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return None
+    return price or None
+
+
+def _set_change(quote: Dict[str, Any]) -> None:
+    previous = quote.get("prev_close_price")
+    if previous:
+        change = quote["lp"] - previous
+        quote["ch"] = round(change, 4)
+        quote["chp"] = round(change / previous * 100, 2)
+
+
+def parse_vps_quote(item: Any) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Symbol and TradingView quote values of a VPS `getliststockdata` row."""
+    if not isinstance(item, dict) or not item.get("sym"):
+        return None
+    previous = _price(item, "r")
+    last = _price(item, "lastPrice") or previous
+    if last is None:
+        return None
+    symbol = str(item["sym"])
+    quote: Dict[str, Any] = {"short_name": symbol, "lp": last}
+    for name, field in (
+        ("prev_close_price", "r"),
+        ("open_price", "openPrice"),
+        ("high_price", "highPrice"),
+        ("low_price", "lowPrice"),
+        ("bid", "g1"),
+        ("ask", "g4"),
+    ):
+        price = _price(item, field)
+        if price is not None:
+            quote[name] = price
+    try:
+        quote["volume"] = int(float(item.get("lot") or 0))
+    except (TypeError, ValueError):
+        quote["volume"] = 0
+    if "bid" in quote and "ask" in quote:
+        quote["spread"] = round(quote["ask"] - quote["bid"], 4)
+    _set_change(quote)
+    return symbol, quote
+
+
+class QuoteTable:
+    """Latest TradingView quote values of the symbols that were asked for, in memory.
+
+    Misses of a call are loaded together, `batch_size` symbols per upstream request, and
+    concurrent calls wait for the loads already in flight instead of repeating them. A loaded
+    symbol's tick channel is then subscribed so that the streamer keeps its last price, range
+    and volume current. Snapshots are reloaded after `ttl` seconds, which also picks up the
+    reference price of a new session; symbols unknown upstream are not asked again before that.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        clients: HttpClients,
+        *,
+        url: str = settings.QUOTES_URL,
+        ttl: float = settings.QUOTES_TTL,
+        batch_size: int = settings.QUOTES_BATCH_SIZE,
+    ) -> None:
+        self.clients = clients
+        self.url = url
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self._quotes: Dict[str, Dict[str, Any]] = {}
+        self._expires: Dict[str, float] = {}
+        self._loading: Dict[str, "asyncio.Future[None]"] = {}
+        self._pubsub = redis.pubsub()
+        self._subscribed: Set[str] = set()
+        self._reader: Optional["asyncio.Task[None]"] = None
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+            self._reader = None
+        await self._pubsub.close()
+
+    async def get_many(self, symbols: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """Quote values of `symbols`, unknown symbols are left out.
+
+        The values are shared with the table and must not be modified.
+        """
+        now = time.monotonic()
+        waiting: Set["asyncio.Future[None]"] = set()
+        load: List[str] = []
+        for symbol in dict.fromkeys(symbols):
+            if self._expires.get(symbol, 0.0) > now:
+                continue
+            future = self._loading.get(symbol)
+            if future is not None:
+                waiting.add(future)
+            else:
+                load.append(symbol)
+
+        if load:
+            future = asyncio.get_running_loop().create_future()
+            for symbol in load:
+                self._loading[symbol] = future
+            try:
+                await self._load(load)
+            finally:
+                for symbol in load:
+                    del self._loading[symbol]
+                future.set_result(None)
+        if waiting:
+            # Not `gather`, which would cancel the shared loads with this call
+            await asyncio.wait(waiting)
+        return {symbol: self._quotes[symbol] for symbol in symbols if symbol in self._quotes}
+
+    async def _fetch(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        url = f"{self.url}/{','.join(symbols)}"
+        response = await self.clients.for_url(url).get(url, headers=VPS_QUOTE_HEADERS)
+        response.raise_for_status()
+        rows = response.json()
+        if not isinstance(rows, list):
+            raise ValueError("invalid quote payload")
+        return dict(filter(None, map(parse_vps_quote, rows)))
+
+    async def _load(self, symbols: List[str]) -> None:
+        batches = [
+            symbols[i : i + self.batch_size] for i in range(0, len(symbols), self.batch_size)
+        ]
+        results = await asyncio.gather(
+            *(self._fetch(batch) for batch in batches), return_exceptions=True
+        )
+        expires = time.monotonic() + self.ttl
+        for batch, result in zip(batches, results):
+            if isinstance(result, (httpx.HTTPError, ValueError)):
+                # Keep serving the previous snapshot, if any
+                logger.error("Error when loading quotes: {error}", error=str(result))
+                continue
+            if isinstance(result, BaseException):
+                raise result
+            self._quotes.update(result)
+            for symbol in batch:
+                self._expires[symbol] = expires
+        await self._subscribe([symbol for symbol in symbols if symbol in self._quotes])
+
+    async def _subscribe(self, symbols: List[str]) -> None:
+        new = [symbol for symbol in symbols if symbol not in self._subscribed]
+        if not new:
+            return
+        try:
+            await self._pubsub.subscribe(*(tick_channel(symbol) for symbol in new))
+        except RedisError as e:
+            # The snapshots still expire, retried with the next load
+            logger.error("Error when subscribing to ticks: {error}", error=str(e))
+            return
+        self._subscribed.update(new)
+        if self._reader is None:
+            self._reader = asyncio.ensure_future(self._read())
+
+    def apply(self, symbol: str, price: float, volume: int, total_volume: Optional[int]) -> None:
+        """Update the quote of `symbol` with a trade."""
+        quote = self._quotes.get(symbol)
+        if quote is None:
+            return
+        quote["lp"] = price
+        quote.setdefault("open_price", price)
+        quote["high_price"] = max(quote.get("high_price", price), price)
+        quote["low_price"] = min(quote.get("low_price", price), price)
+        quote["volume"] = (
+            total_volume if total_volume is not None else quote.get("volume", 0) + volume
+        )
+        _set_change(quote)
+
+    async def _read(self) -> None:
+        prefix_length = len(tick_channel(""))
+        while True:
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+            except RedisError as e:
+                logger.error("Error when reading ticks: {error}", error=str(e))
+                await asyncio.sleep(1.0)
+                continue
+            if message is None or message["type"] != "message":
+                continue
+
+            try:
+                tick = json.loads(message["data"])
+                total_volume = tick.get("total_volume")
+                self.apply(
+                    message["channel"].decode()[prefix_length:],
+                    float(tick["price"]),
+                    int(tick["volume"]),
+                    None if total_volume is None else int(total_volume),
+                )
+            except (AttributeError, KeyError, TypeError, ValueError):
+                continue
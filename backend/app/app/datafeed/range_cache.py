@@ -0,0 +1,133 @@
+from collections import OrderedDict
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from app.core.settings import settings
+from app.datafeed.bars import Bars
+
+__all__ = ["IntervalSet", "RangeCache", "range_cache"]
+
+
+class IntervalSet:
+    """Sorted, disjoint set of closed integer intervals `[start, end]`."""
+
+    def __init__(self, intervals: Optional[Iterable[Tuple[int, int]]] = None) -> None:
+        self.intervals: List[Tuple[int, int]] = []
+        for start, end in intervals or ():
+            self.add(start, end)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return iter(self.intervals)
+
+    def __len__(self) -> int:
+        return len(self.intervals)
+
+    def add(self, start: int, end: int) -> None:
+        if end < start:
+            return
+        merged: List[Tuple[int, int]] = []
+        for current in self.intervals:
+            # Adjacent integer intervals are merged as well
+            if current[1] < start - 1 or current[0] > end + 1:
+                merged.append(current)
+            else:
+                start, end = min(start, current[0]), max(end, current[1])
+        merged.append((start, end))
+        merged.sort()
+        self.intervals = merged
+
+    def missing(self, start: int, end: int) -> List[Tuple[int, int]]:
+        """Sub-intervals of `[start, end]` that are not in the set."""
+        gaps: List[Tuple[int, int]] = []
+        cursor = start
+        for current_start, current_end in self.intervals:
+            if current_end < cursor:
+                continue
+            if current_start > end:
+                break
+            if current_start > cursor:
+                gaps.append((cursor, current_start - 1))
+            cursor = current_end + 1
+            if cursor > end:
+                break
+        if cursor <= end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def covers(self, start: int, end: int) -> bool:
+        return not self.missing(start, end)
+
+
+class _Series:
+    __slots__ = ("intervals", "bars")
+
+    def __init__(self) -> None:
+        self.intervals = IntervalSet()
+        self.bars = Bars.empty()
+
+
+class RangeCache:
+    """Per-(symbol, resolution) bars together with the time intervals they cover.
+
+    Series are evicted least-recently-used first once the total number of cached bars goes
+    over `max_bars`.
+    """
+
+    def __init__(self, max_bars: int) -> None:
+        self.max_bars = max_bars
+        self._series: "OrderedDict[Tuple[str, str], _Series]" = OrderedDict()
+        self._size = 0
+
+    def _get_series(self, symbol: str, resolution: str) -> _Series:
+        key = (symbol, resolution)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series()
+        self._series.move_to_end(key)
+        return series
+
+    def missing(
+        self, symbol: str, resolution: str, from_time: int, to_time: int
+    ) -> List[Tuple[int, int]]:
+        series = self._series.get((symbol, resolution))
+        if series is None:
+            return [(from_time, to_time)]
+        return series.intervals.missing(from_time, to_time)
+
+    def get(self, symbol: str, resolution: str, from_time: int, to_time: int) -> Bars:
+        return self._get_series(symbol, resolution).bars.slice(from_time, to_time)
+
+    def put(
+        self,
+        symbol: str,
+        resolution: str,
+        bars: Bars,
+        intervals: Iterable[Tuple[int, int]] = (),
+    ) -> None:
+        """Merge `bars` into the series; newer bars win on equal timestamps.
+
+        Args:
+            bars: bars to merge, sorted by time
+            intervals: ranges that `bars` completely describe
+        """
+        series = self._get_series(symbol, resolution)
+        for start, end in intervals:
+            series.intervals.add(start, end)
+        if not len(bars):
+            return
+
+        self._size -= len(series.bars)
+        series.bars = Bars.concat((series.bars, bars))
+        self._size += len(series.bars)
+        self._evict()
+
+    def invalidate(self, symbol: str, resolution: Optional[str] = None) -> None:
+        for key in [k for k in self._series if k[0] == symbol and resolution in (None, k[1])]:
+            self._size -= len(self._series.pop(key).bars)
+
+    def _evict(self) -> None:
+        while self._size > self.max_bars and len(self._series) > 1:
+            _, series = self._series.popitem(last=False)
+            self._size -= len(series.bars)
+
+
+range_cache = RangeCache(max_bars=settings.HISTORY_CACHE_MAX_BARS)
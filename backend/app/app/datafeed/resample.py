@@ -0,0 +1,115 @@
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.datafeed.bars import Bars
+
+__all__ = ["Session", "VN_SESSION", "BASE_RESOLUTION", "bucket_start", "tick_bucket", "resample"]
+
+DAY_SECONDS = 24 * 60 * 60
+
+# Resolution each advertised resolution is derived from; only these are stored
+BASE_RESOLUTION: Dict[str, str] = {
+    "1": "1",
+    "5": "1",
+    "15": "1",
+    "30": "1",
+    "60": "1",
+    "D": "D",
+    "W": "D",
+    "M": "D",
+}
+
+
+@dataclass(frozen=True)
+class Session:
+    """Trading sessions as `(start, end)` minutes of the exchange day."""
+
+    utc_offset: int
+    ranges: Tuple[Tuple[int, int], ...]
+
+
+# HOSE/HNX/UPCOM: 0900-1130, 1300-1500 Asia/Ho_Chi_Minh (UTC+7, no DST)
+VN_SESSION = Session(utc_offset=7 * 60 * 60, ranges=((9 * 60, 11 * 60 + 30), (13 * 60, 15 * 60)))
+
+
+def _intraday_keys(t: np.ndarray, minutes: int, session: Session) -> np.ndarray:
+    """Start time of the session-aligned bucket of every bar.
+
+    Buckets restart at every session open; prints outside a session (ATO before the open,
+    the lunch break, ATC after the close) fall into the nearest bucket of the preceding
+    session, or of the first session for prints before the open.
+    """
+    local = t + session.utc_offset
+    day_start = local - local % DAY_SECONDS
+    minute = (local - day_start) // 60
+
+    starts = np.array([start for start, _ in session.ranges], dtype=np.int64)
+    ends = np.array([end for _, end in session.ranges], dtype=np.int64)
+    index = np.clip(np.searchsorted(starts, minute, side="right") - 1, 0, len(starts) - 1)
+    minute = np.clip(minute, starts[index], ends[index] - 1)
+    bucket = starts[index] + (minute - starts[index]) // minutes * minutes
+    return day_start + bucket * 60 - session.utc_offset
+
+
+def _calendar_keys(t: np.ndarray, resolution: str, session: Session) -> np.ndarray:
+    """Week (Monday) or month start of every daily bar, in the daily bars' time convention."""
+    day = (t + session.utc_offset) // DAY_SECONDS
+    if resolution == "W":
+        # 1970-01-01 was a Thursday
+        first_day = day - (day + 3) % 7
+    else:
+        first_day = (
+            day.astype("datetime64[D]").astype("datetime64[M]").astype("datetime64[D]")
+        ).astype(np.int64)
+    return t - (day - first_day) * DAY_SECONDS
+
+
+def bucket_start(
+    t: np.ndarray, resolution: str, session: Optional[Session] = VN_SESSION
+) -> np.ndarray:
+    """Start time of the `resolution` bar that each base bar time in `t` belongs to."""
+    if BASE_RESOLUTION[resolution] == resolution:
+        return t
+    session = session or Session(utc_offset=0, ranges=((0, 24 * 60),))
+    if resolution in ("W", "M"):
+        return _calendar_keys(t, resolution, session)
+    return _intraday_keys(t, int(resolution), session)
+
+
+def tick_bucket(t: int, resolution: str, session: Session = VN_SESSION) -> int:
+    """Time of the `resolution` bar a trade printed at `t` belongs to.
+
+    Intraday bars start on session-aligned minutes; daily and longer bars at 00:00 UTC of their
+    trading date, like the bars of the history providers.
+    """
+    times = np.array([t], dtype=np.int64)
+    if resolution in ("D", "W", "M"):
+        day = (times + session.utc_offset) // DAY_SECONDS * DAY_SECONDS
+        return int(bucket_start(day, resolution, session)[0])
+    return int(_intraday_keys(times, int(resolution), session)[0])
+
+
+def resample(bars: Bars, resolution: str, session: Optional[Session] = VN_SESSION) -> Bars:
+    """Aggregate base bars ("1" or "D") into `resolution`.
+
+    Args:
+        bars: sorted 1-minute bars for intraday resolutions, daily bars for "W" and "M"
+        resolution: canonical target resolution
+        session: trading sessions to align intraday buckets to, `None` for plain UTC buckets
+    """
+    if BASE_RESOLUTION[resolution] == resolution or not len(bars):
+        return bars
+
+    keys = bucket_start(bars.t, resolution, session)
+    starts = np.flatnonzero(np.diff(keys, prepend=keys[0] - 1))
+    ends = np.append(starts[1:], len(keys)) - 1
+    return Bars(
+        t=keys[starts],
+        o=bars.o[starts],
+        h=np.maximum.reduceat(bars.h, starts),
+        l=np.minimum.reduceat(bars.l, starts),
+        c=bars.c[ends],
+        v=np.add.reduceat(bars.v, starts),
+    )
@@ -0,0 +1,180 @@
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from influxdb_client import WritePrecision
+from influxdb_client.client.influxdb_client_async import InfluxDBClientAsync
+
+from app.datafeed.bars import Bars
+
+__all__ = ["BarStore"]
+
+
+def _flux_time(timestamp: int) -> str:
+    return datetime.fromtimestamp(max(timestamp, 0), tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _flux_string(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _tag_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(",", "\\,").replace("=", "\\=").replace(" ", "\\ ")
+
+
+class BarStore:
+    """OHLCV bars persisted in InfluxDB.
+
+    Bars live in the `bar` measurement, one series per (symbol, resolution). Every range that
+    was fetched from upstream is recorded in `bar_coverage` (point time = range start, field
+    `end` = range end) so that empty ranges are not fetched twice either.
+    """
+
+    measurement = "bar"
+    coverage_measurement = "bar_coverage"
+
+    def __init__(self, client: InfluxDBClientAsync, *, bucket: str, org: str) -> None:
+        self.client = client
+        self.bucket = bucket
+        self.org = org
+
+    def _filter(self, measurement: str, symbol: str, resolution: str) -> str:
+        return (
+            f'r._measurement == "{measurement}" '
+            f'and r.symbol == "{_flux_string(symbol)}" '
+            f'and r.resolution == "{_flux_string(resolution)}"'
+        )
+
+    async def _read_bars(self, query: str) -> Bars:
+        rows: List[Tuple[int, float, float, float, float, int]] = []
+        records = await self.client.query_api().query_stream(query, org=self.org)
+        async for record in records:
+            rows.append(
+                (
+                    int(record.get_time().timestamp()),
+                    record["o"],
+                    record["h"],
+                    record["l"],
+                    record["c"],
+                    record["v"],
+                )
+            )
+        if not rows:
+            return Bars.empty()
+
+        t, o, h, l, c, v = zip(*rows)  # noqa: E741
+        return Bars(
+            t=np.asarray(t, dtype=np.int64),
+            o=np.asarray(o, dtype=np.float64),
+            h=np.asarray(h, dtype=np.float64),
+            l=np.asarray(l, dtype=np.float64),
+            c=np.asarray(c, dtype=np.float64),
+            v=np.asarray(v, dtype=np.int64),
+        )
+
+    async def get_bars(self, symbol: str, resolution: str, from_time: int, to_time: int) -> Bars:
+        return await self._read_bars(
+            f"""
+from(bucket: "{self.bucket}")
+  |> range(start: {_flux_time(from_time)}, stop: {_flux_time(to_time + 1)})
+  |> filter(fn: (r) => {self._filter(self.measurement, symbol, resolution)})
+  |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
+  |> keep(columns: ["_time", "o", "h", "l", "c", "v"])
+  |> sort(columns: ["_time"])
+"""
+        )
+
+    async def get_last_bars(self, symbol: str, resolution: str, to_time: int, limit: int) -> Bars:
+        """Up to `limit` most recent stored bars with `t <= to_time`.
+
+        `tail` runs per field series before the pivot, so only `limit` points of each field
+        are read however far back the series goes.
+        """
+        return await self._read_bars(
+            f"""
+from(bucket: "{self.bucket}")
+  |> range(start: {_flux_time(0)}, stop: {_flux_time(to_time + 1)})
+  |> filter(fn: (r) => {self._filter(self.measurement, symbol, resolution)})
+  |> tail(n: {int(limit)})
+  |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
+  |> keep(columns: ["_time", "o", "h", "l", "c", "v"])
+  |> sort(columns: ["_time"])
+"""
+        )
+
+    async def get_last_time(self, symbol: str, resolution: str, to_time: int) -> Optional[int]:
+        """Time of the most recent stored bar with `t <= to_time`."""
+        query = f"""
+from(bucket: "{self.bucket}")
+  |> range(start: {_flux_time(0)}, stop: {_flux_time(to_time + 1)})
+  |> filter(fn: (r) => {self._filter(self.measurement, symbol, resolution)} and r._field == "c")
+  |> last()
+  |> keep(columns: ["_time", "_value"])
+"""
+        records = await self.client.query_api().query_stream(query, org=self.org)
+        last_time = None
+        async for record in records:
+            last_time = int(record.get_time().timestamp())
+        return last_time
+
+    async def put_bars(self, symbol: str, resolution: str, bars: Bars) -> None:
+        await self.put_bars_many(resolution, [symbol] * len(bars), bars)
+
+    async def put_bars_many(self, resolution: str, symbols: Sequence[str], bars: Bars) -> None:
+        """Write bars of several symbols in one request, bar `i` belonging to `symbols[i]`."""
+        if not len(bars):
+            return
+        lines = [
+            f"{self.measurement},symbol={_tag_value(symbol)},resolution={_tag_value(resolution)} "
+            f"o={o!r},h={h!r},l={l!r},c={c!r},v={v}i {t}"
+            for symbol, t, o, h, l, c, v in zip(  # noqa: E741
+                symbols,
+                bars.t.tolist(),
+                bars.o.tolist(),
+                bars.h.tolist(),
+                bars.l.tolist(),
+                bars.c.tolist(),
+                bars.v.tolist(),
+            )
+        ]
+        await self.client.write_api().write(
+            bucket=self.bucket, org=self.org, record=lines, write_precision=WritePrecision.S
+        )
+
+    async def get_coverage(
+        self, symbol: str, resolution: str, from_time: int, to_time: int
+    ) -> List[Tuple[int, int]]:
+        """Stored ranges that overlap `[from_time, to_time]`, sorted by start."""
+        query = f"""
+from(bucket: "{self.bucket}")
+  |> range(start: {_flux_time(0)}, stop: {_flux_time(to_time + 1)})
+  |> filter(fn: (r) => {self._filter(self.coverage_measurement, symbol, resolution)})
+  |> filter(fn: (r) => r._field == "end" and r._value >= {int(from_time)})
+  |> keep(columns: ["_time", "_value"])
+  |> sort(columns: ["_time"])
+"""
+        coverage: List[Tuple[int, int]] = []
+        records = await self.client.query_api().query_stream(query, org=self.org)
+        async for record in records:
+            coverage.append((int(record.get_time().timestamp()), int(record.get_value())))
+        return coverage
+
+    async def put_coverage(
+        self, symbol: str, resolution: str, from_time: int, to_time: int
+    ) -> None:
+        await self.put_coverage_many(resolution, [symbol], from_time, to_time)
+
+    async def put_coverage_many(
+        self, resolution: str, symbols: Sequence[str], from_time: int, to_time: int
+    ) -> None:
+        """Record `[from_time, to_time]` as stored for every symbol of `symbols` in one request."""
+        if to_time < from_time or not symbols:
+            return
+        lines = [
+            f"{self.coverage_measurement},symbol={_tag_value(symbol)},"
+            f"resolution={_tag_value(resolution)} end={int(to_time)}i {max(int(from_time), 0)}"
+            for symbol in symbols
+        ]
+        await self.client.write_api().write(
+            bucket=self.bucket, org=self.org, record=lines, write_precision=WritePrecision.S
+        )
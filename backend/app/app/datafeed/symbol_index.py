@@ -0,0 +1,273 @@
+import asyncio
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+)
+
+import numpy as np
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import crud
+from app.core.settings import settings
+from app.datafeed.symbol_info import symbol_type
+from app.db.session import async_session
+from app.utils.text import fold_diacritics, trigrams
+
+__all__ = ["SymbolRecord", "load_symbol_records", "SymbolIndex"]
+
+# Joins the names of all symbols into one string, never part of a name
+SEPARATOR = "\x00"
+# Share of the query trigrams a name must contain to match a misspelled query
+FUZZY_MIN_SIMILARITY = 0.5
+
+
+class SymbolRecord(NamedTuple):
+    ticker: str
+    exchange: str
+    # `TickerType` of the ticker table
+    ticker_type: str
+    # TradingView symbol type
+    type: str
+    short_name: str
+    full_name: str
+
+
+async def load_symbol_records() -> List[SymbolRecord]:
+    async with async_session() as db:
+        tickers = await crud.ticker.get_all(db)
+    return [
+        SymbolRecord(
+            ticker=ticker.ticker,
+            exchange=ticker.exchange,
+            ticker_type=ticker.type,
+            type=symbol_type(ticker.type),
+            short_name=ticker.short_name,
+            full_name=ticker.full_name,
+        )
+        for ticker in tickers
+    ]
+
+
+class _Names:
+    """Substring search over one name of every symbol, ignoring case and diacritics.
+
+    The names are folded with `fold_diacritics` and joined into one string, each after a
+    `SEPARATOR`, so that matching is `str.find` in C; `starts` maps a match back to its symbol.
+    """
+
+    def __init__(self, names: Sequence[str]) -> None:
+        # Folding can change the length of a name, offsets are those of the folded names
+        folded = [fold_diacritics(name) for name in names]
+        self.starts: List[int] = []
+        position = 0
+        for name in folded:
+            self.starts.append(position + 1)
+            position += len(name) + 1
+        self.text = "".join(SEPARATOR + name for name in folded)
+
+    def find(self, query: str, before: str = "") -> Iterator[int]:
+        """Symbols whose name contains `query` right after `before`, in symbol order."""
+        pattern = before + query
+        position = self.text.find(pattern)
+        while position >= 0:
+            i = bisect_right(self.starts, position + len(before)) - 1
+            yield i
+            # Skip to the next name
+            if i + 1 == len(self.starts):
+                return
+            position = self.text.find(pattern, self.starts[i + 1] - 1)
+
+
+class _Trigrams:
+    """Trigram index of the folded names of every symbol, for queries with typos or words in
+    between, like "vinamlk" or "ngan hang ngoai thuong"."""
+
+    def __init__(self, names: Sequence[Sequence[str]]) -> None:
+        postings: Dict[str, List[int]] = defaultdict(list)
+        sizes = []
+        for i, symbol_names in enumerate(names):
+            grams = set().union(*(trigrams(fold_diacritics(name)) for name in symbol_names))
+            for gram in grams:
+                postings[gram].append(i)
+            sizes.append(len(grams))
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self.sizes = np.array(sizes, dtype=np.int32)
+
+    def find(self, query: str) -> List[int]:
+        """Symbols containing `FUZZY_MIN_SIMILARITY` of the trigrams of the folded `query`,
+        most similar first."""
+        grams = trigrams(query)
+        lists = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not lists:
+            return []
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.sizes))
+        containment = shared / len(grams)
+        (candidates,) = np.nonzero(containment >= FUZZY_MIN_SIMILARITY)
+        # Ties go to the names with the fewest other trigrams
+        jaccard = shared[candidates] / (len(grams) + self.sizes[candidates] - shared[candidates])
+        order = np.lexsort((candidates, -jaccard, -containment[candidates]))
+        return candidates[order].tolist()
+
+
+class _Results:
+    """Symbols of the accepted `type` and `exchange` in the order they are added, up to `limit`."""
+
+    def __init__(
+        self,
+        records: Sequence[SymbolRecord],
+        limit: int,
+        type: Optional[str],
+        exchange: Optional[str],
+    ) -> None:
+        self._all = records
+        self.limit = limit
+        self.type = type
+        self.exchange = exchange
+        self.found: List[int] = []
+        self.seen: Set[int] = set()
+
+    def accepted(self, i: int) -> bool:
+        record = self._all[i]
+        return (self.type is None or record.type == self.type) and (
+            self.exchange is None or record.exchange == self.exchange
+        )
+
+    def add(self, candidates: Iterable[int]) -> bool:
+        """Add the accepted candidates in order, `True` once `limit` is reached."""
+        for i in candidates:
+            if i not in self.seen and self.accepted(i):
+                self.seen.add(i)
+                self.found.append(i)
+                if len(self.found) >= self.limit:
+                    return True
+        return False
+
+    def records(self) -> List[SymbolRecord]:
+        return [self._all[i] for i in self.found]
+
+
+class SymbolIndex:
+    """Process-local index of the ticker table for the symbol search box.
+
+    Tickers are kept sorted, so that the symbols of a prefix are one contiguous range found by
+    binary search, like the leaves under a trie node. Results are ranked: exact ticker, ticker
+    prefix (shortest first), then short or full names starting with the query, having a word
+    starting with it, containing it, and last sharing most of its trigrams. Names are matched
+    without case or Vietnamese diacritics. The index is loaded at `start` and reloaded in the
+    background when the redis counter `TICKER_VERSION_KEY` changes; searching never touches the
+    database.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        load: Callable[[], Awaitable[List[SymbolRecord]]] = load_symbol_records,
+        refresh_interval: float = settings.SYMBOL_INDEX_REFRESH_INTERVAL,
+    ) -> None:
+        self.redis = redis
+        self.load = load
+        self.refresh_interval = refresh_interval
+        self.build([])
+        self._loaded = False
+        self._version: Optional[bytes] = None
+        self._refresher: Optional["asyncio.Task[None]"] = None
+
+    def build(self, records: Sequence[SymbolRecord]) -> None:
+        records = sorted(records, key=lambda record: record.ticker.upper())
+        self.records: List[SymbolRecord] = records
+        self._tickers = [record.ticker.upper() for record in records]
+        self._short_names = _Names([record.short_name for record in records])
+        self._full_names = _Names([record.full_name for record in records])
+        self._trigrams = _Trigrams([(record.short_name, record.full_name) for record in records])
+
+    async def start(self) -> None:
+        await self.refresh()
+        self._refresher = asyncio.ensure_future(self._refresh_forever())
+
+    async def close(self) -> None:
+        if self._refresher is not None:
+            self._refresher.cancel()
+            self._refresher = None
+
+    async def refresh(self) -> None:
+        """Reload the ticker table if it changed since the last load."""
+        try:
+            version = await self.redis.get(settings.TICKER_VERSION_KEY)
+        except RedisError as e:
+            logger.error("Error when reading ticker version: {error}", error=str(e))
+            if self._loaded:
+                return
+            version = None
+        if self._loaded and version == self._version:
+            return
+        try:
+            records = await self.load()
+        except (SQLAlchemyError, OSError) as e:
+            logger.error("Error when loading symbol index: {error}", error=str(e))
+            return
+        self.build(records)
+        self._loaded = True
+        self._version = version
+
+    async def _refresh_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh()
+
+    def _prefix_matches(self, query: str) -> List[int]:
+        """Tickers starting with `query`, the exact match first as the shortest."""
+        prefix = query.upper()
+        tickers = self._tickers
+        start = bisect_left(tickers, prefix)
+        end = bisect_left(tickers, prefix + "\uffff", start)
+        return sorted(range(start, end), key=lambda i: (len(tickers[i]), tickers[i]))
+
+    def _name_matches(self, folded: str) -> Iterator[Iterable[int]]:
+        """Names starting with the folded query, then with a word starting with it, then
+        containing it."""
+        for before in (SEPARATOR, " ", ""):
+            for names in (self._short_names, self._full_names):
+                yield names.find(folded, before)
+
+    def _trigram_matches(self, folded: str) -> List[int]:
+        """Names sharing most trigrams of the folded query, for queries of 3 letters or more."""
+        return self._trigrams.find(folded) if len(folded) >= 3 else []
+
+    def _stages(self, query: str) -> Iterator[Iterable[int]]:
+        yield self._prefix_matches(query)
+        folded = fold_diacritics(query)
+        yield from self._name_matches(folded)
+        yield self._trigram_matches(folded)
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        *,
+        type: Optional[str] = None,
+        exchange: Optional[str] = None,
+    ) -> List[SymbolRecord]:
+        """Best `limit` symbols matching `query`, of TradingView `type` and `exchange` if set."""
+        if limit <= 0:
+            return []
+        results = _Results(self.records, limit, type, exchange)
+        query = query.strip()
+        stages = self._stages(query) if query else iter([range(len(self.records))])
+        for candidates in stages:
+            if results.add(candidates):
+                break
+        return results.records()
@@ -0,0 +1,117 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.serialization import dumps
+from app.core.settings import settings
+from app.models.ticker import Ticker
+from app.schemas.ticker import TickerType
+
+__all__ = [
+    "SUPPORTED_RESOLUTIONS",
+    "INTRADAY_MULTIPLIERS",
+    "symbol_type",
+    "symbol_session",
+    "symbol_timezone",
+    "symbol_info_group",
+    "SymbolInfoCache",
+]
+
+SUPPORTED_RESOLUTIONS = ["1", "5", "15", "30", "60", "D", "W", "M"]
+INTRADAY_MULTIPLIERS = ["1", "5", "15", "30", "60"]
+
+
+def symbol_type(ticker_type: str) -> str:
+    """TradingView symbol type of a `TickerType`."""
+    return "stock" if ticker_type == TickerType.vn_stock else "crypto"
+
+
+def symbol_session(ticker_type: str) -> str:
+    return "0900-1130,1300-1500" if ticker_type == TickerType.vn_stock else "24x7"
+
+
+def symbol_timezone(ticker_type: str) -> str:
+    return "Asia/Ho_Chi_Minh" if ticker_type == TickerType.vn_stock else "UTC"
+
+
+def symbol_info_group(group: str, tickers: Sequence[Ticker]) -> Dict[str, Any]:
+    """UDF `/symbol_info` response of `group`: one array per field, a scalar for shared values."""
+    return {
+        "symbol": [ticker.ticker for ticker in tickers],
+        "ticker": [ticker.ticker for ticker in tickers],
+        "description": [ticker.full_name for ticker in tickers],
+        "type": [symbol_type(ticker.type) for ticker in tickers],
+        "session-regular": [symbol_session(ticker.type) for ticker in tickers],
+        "timezone": [symbol_timezone(ticker.type) for ticker in tickers],
+        "exchange-listed": group,
+        "exchange-traded": group,
+        "minmovement": 1,
+        "minmovement2": 0,
+        "fractional": False,
+        "pricescale": 100,
+        "has-intraday": True,
+        "has-daily": True,
+        "has-weekly-and-monthly": True,
+        "has-empty-bars": False,
+        "has-no-volume": False,
+        "supported-resolutions": SUPPORTED_RESOLUTIONS,
+        "intraday-multipliers": INTRADAY_MULTIPLIERS,
+    }
+
+
+class SymbolInfoCache:
+    """Encoded `/symbol_info` groups, rebuilt when the ticker table changes.
+
+    Writers of the ticker table increment the redis counter `TICKER_VERSION_KEY`. A group is
+    served while the counter is unchanged, at the cost of one GET per request, and rebuilt at
+    least every `ttl` seconds, which also bounds staleness while redis is unreachable.
+    """
+
+    def __init__(self, redis: Redis, *, ttl: float = settings.SYMBOL_INFO_TTL) -> None:
+        self.redis = redis
+        self.ttl = ttl
+        # group -> (ticker version, build time, response body)
+        self._groups: Dict[str, Tuple[Optional[bytes], float, bytes]] = {}
+        self._lock = asyncio.Lock()
+
+    async def version(self) -> Tuple[bool, Optional[bytes]]:
+        """Current ticker version, and whether redis could be read."""
+        try:
+            return True, await self.redis.get(settings.TICKER_VERSION_KEY)
+        except RedisError as e:
+            logger.error("Error when reading ticker version: {error}", error=str(e))
+            return False, None
+
+    def _cached(self, group: str, known: bool, version: Optional[bytes]) -> Optional[bytes]:
+        entry = self._groups.get(group)
+        if entry is None or time.monotonic() - entry[1] >= self.ttl:
+            return None
+        if known and entry[0] != version:
+            return None
+        return entry[2]
+
+    async def get(self, group: str, load: Callable[[], Awaitable[Sequence[Ticker]]]) -> bytes:
+        """JSON body of `group`, built from the tickers returned by `load` on a miss."""
+        known, version = await self.version()
+        content = self._cached(group, known, version)
+        if content is not None:
+            return content
+        # Concurrent misses wait for one rebuild
+        async with self._lock:
+            content = self._cached(group, known, version)
+            if content is None:
+                content = dumps(symbol_info_group(group, await load()))
+                self._groups[group] = (version, time.monotonic(), content)
+        return content
+
+    async def invalidate(self) -> None:
+        """Drop the groups of every worker, after a change of the ticker table."""
+        self._groups.clear()
+        try:
+            await self.redis.incr(settings.TICKER_VERSION_KEY)
+        except RedisError as e:
+            logger.error("Error when bumping ticker version: {error}", error=str(e))
@@ -5,15 +5,28 @@ import sentry_sdk
 from fastapi import FastAPI, Request
 from fastapi.exceptions import HTTPException, RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
 from influxdb_client.client.influxdb_client_async import InfluxDBClientAsync
+from redis.asyncio import Redis
 from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 
 from app.api.api_v0.api import api_router as api_router_v0
 from app.api.deps import add_swagger_config
+from app.core.http_client import HttpClients
+from app.core.oidc import IdentityCache, TokenVerifier
+from app.core.reference_cache import ReferenceCache
+from app.core.serialization import FastJSONResponse
 from app.core.settings import settings
+from app.crud.base import CRUDBase
 from app.custom_logging import CustomizeLogger
+from app.datafeed import (
+    BarStore,
+    HistoryService,
+    QuoteTable,
+    StreamHub,
+    SymbolIndex,
+    SymbolInfoCache,
+)
 from app.schemas.response import ErrorResponse, Status, ValidationErrorResponse
 from app.signals import *  # noqa
 
@@ -23,16 +36,52 @@ sentry_sdk.init(
 
 
 async def startup(app: FastAPI) -> None:
+    app.state.http_clients = HttpClients.from_settings()
+    app.state.redis = Redis.from_url(settings.REDIS_URL)
     app.state.influxdb_client = InfluxDBClientAsync(
-        url=f"http://{settings.INFLUXDB_HOST}:{settings.INFLUXDB_PORT}"
+        url=settings.INFLUXDB_URL, token=settings.INFLUXDB_TOKEN, org=settings.INFLUXDB_ORG
     )
     if not await app.state.influxdb_client.ping():
         raise RuntimeError("Can not connect to influxdb server")
+    app.state.bar_store = BarStore(
+        app.state.influxdb_client, bucket=settings.INFLUXDB_BUCKET, org=settings.INFLUXDB_ORG
+    )
+    app.state.history = HistoryService(
+        app.state.bar_store,
+        app.state.http_clients,
+        redis=app.state.redis if settings.HISTORY_SINGLEFLIGHT_REDIS else None,
+    )
+    app.state.stream_hub = StreamHub(app.state.redis, app.state.history)
+    app.state.quotes = QuoteTable(app.state.redis, app.state.http_clients)
+    app.state.symbol_info = SymbolInfoCache(app.state.redis)
+    app.state.reference_cache = ReferenceCache(app.state.redis)
+    # Read by `get_cached` and invalidated by the writes of the cached tables
+    CRUDBase.reference_cache = app.state.reference_cache
+    app.state.symbol_index = SymbolIndex(app.state.redis)
+    await app.state.symbol_index.start()
+    app.state.token_verifier = TokenVerifier(app.state.http_clients)
+    await app.state.token_verifier.start()
+    app.state.identity_cache = IdentityCache(
+        app.state.redis if settings.OIDC_IDENTITY_CACHE_REDIS else None
+    )
 
 
 async def shutdown(app: FastAPI) -> None:
+    if hasattr(app.state, "token_verifier"):
+        await app.state.token_verifier.close()
+    if hasattr(app.state, "symbol_index"):
+        await app.state.symbol_index.close()
+    if hasattr(app.state, "quotes"):
+        await app.state.quotes.close()
+    if hasattr(app.state, "stream_hub"):
+        await app.state.stream_hub.close()
     if hasattr(app.state, "influxdb_client"):
         await app.state.influxdb_client.close()
+    if hasattr(app.state, "http_clients"):
+        await app.state.http_clients.aclose()
+    CRUDBase.reference_cache = None
+    if hasattr(app.state, "redis"):
+        await app.state.redis.close()
 
 
 def create_app() -> FastAPI:
@@ -44,6 +93,7 @@ def create_app() -> FastAPI:
         docs_url=f"{settings.PREFIX}/docs",
         redoc_url=f"{settings.PREFIX}/redoc",
         swagger_ui_oauth2_redirect_url=f"{settings.PREFIX}/docs/oauth2-redirect",
+        default_response_class=FastJSONResponse,
     )
     logger = CustomizeLogger.make_logger(Path(__file__).with_name("fastapi_logging.json"))
     app.logger = logger
@@ -61,11 +111,11 @@ add_swagger_config(app)
 
 async def validation_exception_handler(
     request: Request, exc: RequestValidationError
-) -> JSONResponse:
+) -> FastJSONResponse:
     # Exception
     # Override request validation exceptions
-    return JSONResponse(
-        content=ValidationErrorResponse(status=Status.error, message=exc.errors()).dict(),
+    return FastJSONResponse(
+        content=ValidationErrorResponse(status=Status.error, message=exc.errors()),
         status_code=400,
     )
 
@@ -74,12 +124,12 @@ app.add_exception_handler(RequestValidationError, validation_exception_handler)
 
 
 # Override the HTTPException error handler
-async def http_exception_handler(request: Request, exc: HTTPException) -> JSONResponse:
-    return JSONResponse(
+async def http_exception_handler(request: Request, exc: HTTPException) -> FastJSONResponse:
+    return FastJSONResponse(
         content=ErrorResponse(
             status=Status.error,
             message=str(exc.detail),
-        ).dict(),
+        ),
         status_code=exc.status_code,
     )
 
@@ -149,3 +149,51 @@ class TimescaleMark(BaseModel):
     color: TimescaleMarkColor
     label: str
     tooltip: List[str]
+
+
+class QuoteValues(BaseModel):
+    ch: Optional[float] = None
+    chp: Optional[float] = None
+    short_name: Optional[str] = None
+    exchange: Optional[str] = None
+    description: Optional[str] = None
+    lp: Optional[float] = None
+    ask: Optional[float] = None
+    bid: Optional[float] = None
+    spread: Optional[float] = None
+    open_price: Optional[float] = None
+    high_price: Optional[float] = None
+    low_price: Optional[float] = None
+    prev_close_price: Optional[float] = None
+    volume: Optional[float] = None
+
+
+class QuoteData(BaseModel):
+    s: str
+    n: str
+    v: QuoteValues
+
+
+class QuotesOkResponse(BaseModel):
+    s: str
+    d: List[QuoteData]
+
+
+class QuotesErrorResponse(BaseModel):
+    s: str
+    errmsg: str
+
+
+class QuotesResponse(BaseModel):
+    __root__: Union[QuotesOkResponse, QuotesErrorResponse]
+
+
+class StreamAction(str, Enum):
+    subscribe = "subscribe"
+    unsubscribe = "unsubscribe"
+
+
+class StreamRequest(BaseModel):
+    action: StreamAction
+    symbol: str
+    resolution: str
@@ -1,26 +1,70 @@
-from multiprocessing import Process
-from typing import List
+import asyncio
+import signal
+import sys
+import time
+from typing import Any, List
 
+from influxdb_client.client.influxdb_client_async import InfluxDBClientAsync
+from loguru import logger
+from redis.asyncio import Redis
+
+from app.core.settings import settings
+from app.datafeed.history import STORE_ERRORS
+from app.datafeed.store import BarStore
+from app.streamer.bar_builder import BarBuilder
+from app.streamer.coverage import LiveCoverage
+from app.streamer.feed import VPSFeed
+from app.streamer.publisher import TickPublisher
+from app.streamer.supervisor import Supervisor
+from app.streamer.ticks import Tick
 
-def main() -> None:
-    workers: List[Process] = list()
 
+async def flush_bars(builder: BarBuilder, store: BarStore, feed: VPSFeed) -> None:
+    """Close finished live bars and write them to the bar store in batches, with coverage."""
+    coverage = LiveCoverage(builder)
     while True:
-        # Get list symbols from sqlalchemy
-        pass
+        await asyncio.sleep(settings.STREAMER_FLUSH_INTERVAL)
+        now, grace = time.time(), settings.STREAMER_BAR_CLOSE_GRACE
+        closed_until = min(builder.closed_until(now, grace), now - grace)
+        builder.close_before(now, grace)
+        if builder.dropped:
+            coverage.reset(closed_until)
+        symbols, bars = builder.flush()
+        try:
+            await store.put_bars_many("1", symbols, bars)
+            await coverage.extend(store, feed.connected_since, closed_until)
+        except STORE_ERRORS as e:
+            coverage.reset(closed_until)
+            logger.error("Error when writing bar store: {error}", error=str(e))
+
+
+async def stream(symbols: List[str]) -> None:
+    """Publish the ticks of `symbols` to redis and build their 1-minute bars until cancelled."""
+    redis = Redis.from_url(settings.REDIS_URL)
+    influxdb_client = InfluxDBClientAsync(
+        url=settings.INFLUXDB_URL, token=settings.INFLUXDB_TOKEN, org=settings.INFLUXDB_ORG
+    )
+    store = BarStore(influxdb_client, bucket=settings.INFLUXDB_BUCKET, org=settings.INFLUXDB_ORG)
+    publisher = TickPublisher(redis, queue_size=settings.STREAMER_QUEUE_SIZE)
+    builder = BarBuilder(symbols)
+    feed = VPSFeed(symbols)
 
-    # while True:
-    #     for topic_idx, (consume, create_topic_if_not_exists) in enumerate(TOPIC):
-    #         if len(workers[topic_idx]) == 0:
-    #             create_topic_if_not_exists()
+    def on_tick(tick: Tick) -> None:
+        publisher.put(tick)
+        builder.update(tick.symbol, tick.time, tick.price, tick.volume)
 
-    #         num_alive = len([w for w in workers[topic_idx] if w.is_alive()])
+    try:
+        await asyncio.gather(feed.run(on_tick), publisher.run(), flush_bars(builder, store, feed))
+    finally:
+        await influxdb_client.close()
+        await redis.close()
 
-    #         if settings.STREAMER_NUM_PROCESS == num_alive:
-    #             continue
 
-    #         for _ in range(settings.STREAMER_NUM_PROCESS - num_alive):
-    #             p = Process(target=consume, daemon=True)
-    #             p.start()
-    #             workers[topic_idx].append(p)
-    #             logger.info("Starting worker #{pid}", pid=p.pid)
+def _exit(*args: Any) -> None:
+    # Unwind through Supervisor.run so that the workers are stopped
+    sys.exit(0)
+
+
+def main() -> None:
+    signal.signal(signal.SIGTERM, _exit)
+    Supervisor().run()
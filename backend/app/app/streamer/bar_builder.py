@@ -0,0 +1,172 @@
+import math
+from typing import List, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+from app.datafeed.bars import Bars
+from app.datafeed.resample import Session, VN_SESSION
+
+__all__ = ["BarBuilder"]
+
+DAY_SECONDS = 24 * 60 * 60
+
+
+class BarBuilder:
+    """In-progress 1-minute bars of a fixed symbol universe, updated in place from ticks.
+
+    Every symbol owns one slot of preallocated arrays, so memory is fixed per symbol and a tick
+    only writes scalars. Bars are aligned like `datafeed.resample`: a new bar starts at every
+    minute of the trading sessions and out-of-session prints (ATO, lunch break, ATC) are
+    clamped into the nearest session minute.
+
+    A bar is closed when a tick of a later minute arrives, or by `close_before` once its minute
+    is over. Closed bars are copied to a fixed-size buffer until `flush` takes them.
+    """
+
+    def __init__(
+        self, symbols: Sequence[str], *, capacity: int = 0, session: Session = VN_SESSION
+    ) -> None:
+        self.symbols: List[str] = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.session = session
+        self._starts = [start * 60 for start, _ in session.ranges]
+        self._ends = [end * 60 for _, end in session.ranges]
+
+        n = len(self.symbols)
+        # Start of the bar in progress, or of the last closed bar when not `active`
+        self.start = np.full(n, -1, dtype=np.int64)
+        self.active = np.zeros(n, dtype=np.bool_)
+        self.open = np.zeros(n, dtype=np.float64)
+        self.high = np.zeros(n, dtype=np.float64)
+        self.low = np.zeros(n, dtype=np.float64)
+        self.close = np.zeros(n, dtype=np.float64)
+        self.volume = np.zeros(n, dtype=np.int64)
+
+        # Closed bars waiting for `flush`: a whole minute of the universe fits several times
+        capacity = capacity or max(4 * n, 1024)
+        self._closed_symbol = np.zeros(capacity, dtype=np.int32)
+        self._closed = Bars(
+            t=np.zeros(capacity, dtype=np.int64),
+            o=np.zeros(capacity, dtype=np.float64),
+            h=np.zeros(capacity, dtype=np.float64),
+            l=np.zeros(capacity, dtype=np.float64),
+            c=np.zeros(capacity, dtype=np.float64),
+            v=np.zeros(capacity, dtype=np.int64),
+        )
+        self.pending = 0
+        self.dropped = 0
+        self.late = 0
+
+    def minute_start(self, t: int) -> int:
+        """Start of the session-aligned minute of `t`, scalar `resample._intraday_keys`."""
+        offset = self.session.utc_offset
+        local = t + offset
+        day_start = local - local % DAY_SECONDS
+        second = local - day_start
+        for start, end in zip(reversed(self._starts), reversed(self._ends)):
+            if second >= start:
+                second = min(second, end - 60)
+                break
+        else:
+            second = self._starts[0]
+        return day_start + second - second % 60 - offset
+
+    def update(self, symbol: str, t: int, price: float, volume: int) -> None:
+        i = self.index.get(symbol)
+        if i is None:
+            return
+        minute = self.minute_start(t)
+        start = self.start[i]
+        if minute == start and self.active[i]:
+            if price > self.high[i]:
+                self.high[i] = price
+            if price < self.low[i]:
+                self.low[i] = price
+            self.close[i] = price
+            self.volume[i] += volume
+            return
+        if minute <= start:
+            # Print for a bar that was already closed
+            self.late += 1
+            return
+
+        if self.active[i]:
+            self._push(i)
+        self.start[i] = minute
+        self.active[i] = True
+        self.open[i] = self.high[i] = self.low[i] = self.close[i] = price
+        self.volume[i] = volume
+
+    def _push(self, i: int) -> None:
+        k = self.pending
+        if k == len(self._closed_symbol):
+            self.dropped += 1
+            return
+        self._closed_symbol[k] = i
+        self._closed.t[k] = self.start[i]
+        self._closed.o[k] = self.open[i]
+        self._closed.h[k] = self.high[i]
+        self._closed.l[k] = self.low[i]
+        self._closed.c[k] = self.close[i]
+        self._closed.v[k] = self.volume[i]
+        self.pending = k + 1
+
+    def closed_until(self, now: float, grace: float = 0.0) -> float:
+        """Start of the first bar that `close_before(now, grace)` keeps open.
+
+        Infinite after the last session of the day, when every bar is closed.
+        """
+        t = int(now - grace)
+        local = t + self.session.utc_offset
+        if local % DAY_SECONDS >= self._ends[-1]:
+            return math.inf
+        return self.minute_start(t)
+
+    def close_before(self, now: float, grace: float = 0.0) -> int:
+        """Close the bars whose minute ended `grace` seconds before `now`.
+
+        The last bar of a session stays open over a break, since prints of the break are
+        clamped into it; after the last session every bar is closed.
+
+        Returns:
+            number of bars closed
+        """
+        boundary = self.closed_until(now, grace)
+        (closing,) = np.nonzero(self.active & (self.start < boundary))
+        if not len(closing):
+            return 0
+
+        room = len(self._closed_symbol) - self.pending
+        if len(closing) > room:
+            self.dropped += len(closing) - room
+        self.active[closing] = False
+
+        taken = closing[:room]
+        k, end = self.pending, self.pending + len(taken)
+        self._closed_symbol[k:end] = taken
+        self._closed.t[k:end] = self.start[taken]
+        self._closed.o[k:end] = self.open[taken]
+        self._closed.h[k:end] = self.high[taken]
+        self._closed.l[k:end] = self.low[taken]
+        self._closed.c[k:end] = self.close[taken]
+        self._closed.v[k:end] = self.volume[taken]
+        self.pending = end
+        return len(closing)
+
+    def flush(self) -> Tuple[List[str], Bars]:
+        """Take the closed bars, with the symbol of every bar."""
+        if self.dropped:
+            logger.warning("Bar buffer full, {dropped} bars dropped", dropped=self.dropped)
+            self.dropped = 0
+        count, self.pending = self.pending, 0
+        symbols = [self.symbols[i] for i in self._closed_symbol[:count].tolist()]
+        closed = self._closed
+        return symbols, Bars(
+            t=closed.t[:count].copy(),
+            o=closed.o[:count].copy(),
+            h=closed.h[:count].copy(),
+            l=closed.l[:count].copy(),
+            c=closed.c[:count].copy(),
+            v=closed.v[:count].copy(),
+        )
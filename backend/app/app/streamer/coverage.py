@@ -0,0 +1,48 @@
+from typing import Optional
+
+from app.datafeed.store import BarStore
+from app.streamer.bar_builder import BarBuilder
+
+__all__ = ["LiveCoverage"]
+
+
+class LiveCoverage:
+    """Bar store coverage of the bars flushed by `builder`, so that history serves them.
+
+    Live bars are only complete from the first minute after the feed connected, so a range
+    starts there and grows with every flush while the feed stays connected. Bars that never
+    reach the store restart the range after them. Minutes without trades have no bar and are
+    covered all the same.
+
+    The range keeps its start, so every flush overwrites the same coverage point per symbol.
+    """
+
+    def __init__(self, builder: BarBuilder, resolution: str = "1") -> None:
+        self.builder = builder
+        self.resolution = resolution
+        self.connected_since: Optional[float] = None
+        self.start: Optional[int] = None
+        # End of the last bars that were lost, no range starts before it
+        self.lost_until = 0
+
+    def reset(self, closed_until: float) -> None:
+        """Restart the range at `closed_until`, after bars that were lost."""
+        self.lost_until = max(self.lost_until, int(closed_until))
+        if self.start is not None:
+            self.start = max(self.start, self.lost_until)
+
+    async def extend(
+        self, store: BarStore, connected_since: Optional[float], closed_until: float
+    ) -> None:
+        """Cover up to `closed_until` (excluded), every bar before it having been stored."""
+        if connected_since is None:
+            self.connected_since = self.start = None
+            return
+        if connected_since != self.connected_since or self.start is None:
+            # Trades of the connection minute before `connected_since` were missed
+            self.connected_since = connected_since
+            start = self.builder.minute_start(int(connected_since)) + 60
+            self.start = max(start, self.lost_until)
+        await store.put_coverage_many(
+            self.resolution, self.builder.symbols, self.start, int(closed_until) - 1
+        )
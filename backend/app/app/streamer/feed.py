@@ -0,0 +1,71 @@
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+import websockets
+from loguru import logger
+
+from app.core.settings import settings
+from app.streamer.socketio import SocketIOClient
+from app.streamer.ticks import parse_vps_tick, Tick
+
+__all__ = ["VPSFeed"]
+
+VPS_HEADERS: Dict[str, str] = {
+    "Origin": "https://chart.vps.com.vn",
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/109.0.0.0 Safari/537.36",  # noqa: B950
+}
+
+# Subscription and trade events of the VPS realtime feeds
+JOIN_EVENT = "regs"
+TICK_EVENT = "stock"
+
+
+class VPSFeed:
+    """Matched trades of `symbols` from the VPS Socket.IO realtime feed.
+
+    Reconnects with exponential backoff and joins the symbols again after every reconnect.
+    `connected_since` is the time the current connection joined the symbols, `None` while
+    disconnected: every trade since then has been passed on.
+    """
+
+    def __init__(
+        self,
+        symbols: Sequence[str],
+        *,
+        url: str = settings.STREAMER_URL,
+        join_batch_size: int = settings.STREAMER_JOIN_BATCH_SIZE,
+        max_backoff: float = 60.0,
+    ) -> None:
+        self.symbols: List[str] = list(symbols)
+        self.url = url
+        self.join_batch_size = join_batch_size
+        self.max_backoff = max_backoff
+        self.connected_since: Optional[float] = None
+
+    async def _join(self, client: SocketIOClient) -> None:
+        for i in range(0, len(self.symbols), self.join_batch_size):
+            batch = self.symbols[i : i + self.join_batch_size]
+            await client.emit(JOIN_EVENT, {"action": "join", "list": ",".join(batch)})
+
+    async def run(self, on_tick: Callable[[Tick], None]) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                async with SocketIOClient(self.url, VPS_HEADERS) as client:
+                    await self._join(client)
+                    self.connected_since = time.time()
+                    logger.info("Streaming {count} symbols", count=len(self.symbols))
+                    backoff = 1.0
+                    async for event, data in client.events():
+                        if event != TICK_EVENT:
+                            continue
+                        tick = parse_vps_tick(data)
+                        if tick is not None:
+                            on_tick(tick)
+            except (OSError, ValueError, asyncio.TimeoutError, websockets.WebSocketException) as e:
+                logger.error("Error when streaming from VPS: {error}", error=str(e))
+            self.connected_since = None
+
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
@@ -0,0 +1,47 @@
+import asyncio
+
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.serialization import dumps
+from app.datafeed.live import tick_channel
+from app.streamer.ticks import Tick
+
+__all__ = ["TickPublisher"]
+
+
+class TickPublisher:
+    """Publish ticks to their Redis channel, in pipelined batches.
+
+    Ticks are queued by the feed and drained by `run`, so a slow Redis never blocks parsing.
+    When the queue is full new ticks are dropped rather than buffered without bound.
+    """
+
+    def __init__(self, redis: Redis, *, queue_size: int = 10_000, batch_size: int = 500) -> None:
+        self.redis = redis
+        self.batch_size = batch_size
+        self.queue: "asyncio.Queue[Tick]" = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def put(self, tick: Tick) -> None:
+        try:
+            self.queue.put_nowait(tick)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning("Tick queue full, {dropped} ticks dropped", dropped=self.dropped)
+
+    async def run(self) -> None:
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            pipeline = self.redis.pipeline(transaction=False)
+            for tick in batch:
+                pipeline.publish(tick_channel(tick.symbol), dumps(tick.to_dict()))
+            try:
+                await pipeline.execute()
+            except RedisError as e:
+                logger.error("Error when publishing ticks: {error}", error=str(e))
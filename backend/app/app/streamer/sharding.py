@@ -0,0 +1,40 @@
+import bisect
+import hashlib
+from typing import Dict, Iterable, List
+
+__all__ = ["HashRing"]
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hashing of symbols onto `num_shards` shards.
+
+    Every shard owns `replicas` points on the ring, so adding or removing symbols only moves
+    those symbols, and changing the number of shards moves about `1 / num_shards` of them.
+    """
+
+    def __init__(self, num_shards: int, replicas: int = 128) -> None:
+        if num_shards < 1:
+            raise ValueError("num_shards must be positive")
+        self.num_shards = num_shards
+        points = sorted(
+            (_hash(f"shard-{shard}-{replica}"), shard)
+            for shard in range(num_shards)
+            for replica in range(replicas)
+        )
+        self._keys = [key for key, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def shard_of(self, symbol: str) -> int:
+        index = bisect.bisect(self._keys, _hash(symbol)) % len(self._keys)
+        return self._shards[index]
+
+    def partition(self, symbols: Iterable[str]) -> Dict[int, List[str]]:
+        """Sorted symbols of every shard, empty shards included."""
+        shards: Dict[int, List[str]] = {shard: [] for shard in range(self.num_shards)}
+        for symbol in sorted(set(symbols)):
+            shards[self.shard_of(symbol)].append(symbol)
+        return shards
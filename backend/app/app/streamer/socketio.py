@@ -0,0 +1,101 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import websockets
+from loguru import logger
+from websockets.legacy.client import WebSocketClientProtocol
+
+__all__ = ["SocketIOClient"]
+
+# Engine.IO v3 packet types
+OPEN = "0"
+CLOSE = "1"
+PING = "2"
+PONG = "3"
+MESSAGE = "4"
+
+# Socket.IO packet types, sent inside Engine.IO messages
+CONNECT = "0"
+DISCONNECT = "1"
+EVENT = "2"
+
+
+class SocketIOClient:
+    """Minimal Socket.IO client (Engine.IO v3, websocket transport, default namespace).
+
+    Only what the realtime feeds need: emitting and receiving events. Engine.IO v3 clients
+    drive the heartbeat, so a ping is sent every `pingInterval` announced by the server.
+    """
+
+    def __init__(self, url: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self.url = url
+        self.headers = headers or {}
+        self._ws: Optional[WebSocketClientProtocol] = None
+        self._heartbeat: Optional["asyncio.Task[None]"] = None
+
+    async def __aenter__(self) -> "SocketIOClient":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    async def connect(self) -> None:
+        self._ws = await websockets.connect(  # type: ignore
+            self.url, extra_headers=self.headers, ping_interval=None, max_queue=None
+        )
+        packet = await self._ws.recv()
+        if not isinstance(packet, str) or not packet.startswith(OPEN):
+            raise ConnectionError(f"Unexpected Engine.IO handshake: {packet!r}")
+        handshake = json.loads(packet[1:])
+        self._heartbeat = asyncio.ensure_future(
+            self._ping(handshake.get("pingInterval", 25000) / 1000)
+        )
+
+    async def close(self) -> None:
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        if self._ws is not None:
+            await self._ws.close()
+            self._ws = None
+
+    async def _ping(self, interval: float) -> None:
+        try:
+            while self._ws is not None:
+                await asyncio.sleep(interval)
+                await self._ws.send(PING)
+        except websockets.ConnectionClosed:
+            pass
+
+    async def emit(self, event: str, data: Any) -> None:
+        if self._ws is None:
+            raise ConnectionError("Socket.IO client is not connected")
+        await self._ws.send(MESSAGE + EVENT + json.dumps([event, data], separators=(",", ":")))
+
+    async def events(self) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield `(event, data)` until the connection closes.
+
+        Raises:
+            websockets.ConnectionClosed: connection lost
+            ConnectionError: closed by the server
+        """
+        if self._ws is None:
+            raise ConnectionError("Socket.IO client is not connected")
+        async for packet in self._ws:
+            if not isinstance(packet, str) or not packet:
+                continue
+            if packet[0] == CLOSE or packet[:2] == MESSAGE + DISCONNECT:
+                raise ConnectionError("Socket.IO connection closed by server")
+            if packet[:2] != MESSAGE + EVENT:
+                continue
+
+            # 42[<event>, <data>] with an optional ack id between type and payload
+            payload = packet[2:].lstrip("0123456789")
+            try:
+                event, *args = json.loads(payload)
+            except ValueError:
+                logger.warning("Invalid Socket.IO event: {packet}", packet=packet[:200])
+                continue
+            yield event, args[0] if len(args) == 1 else args
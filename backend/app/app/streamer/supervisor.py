@@ -0,0 +1,155 @@
+import asyncio
+import signal
+import time
+from multiprocessing import Process
+from typing import Dict, List, Optional
+
+from loguru import logger
+from redis import Redis
+from redis.client import PubSub
+from redis.exceptions import RedisError
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import crud, deps
+from app.core.settings import settings
+from app.streamer.sharding import HashRing
+
+__all__ = ["Supervisor"]
+
+
+def run_worker(shard: int, symbols: List[str]) -> None:
+    # Imported here so that the supervisor never builds an event loop or redis pool to fork
+    from app.streamer.app import stream
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    logger.info("Shard {shard} streaming {count} symbols", shard=shard, count=len(symbols))
+    asyncio.run(stream(symbols))
+
+
+class Supervisor:
+    """Run one streamer process per shard of the ticker universe.
+
+    Symbols are assigned to shards by consistent hashing. Dead workers are restarted with the
+    same symbols. The ticker table is reloaded every `refresh_interval` seconds and whenever a
+    message arrives on `STREAMER_RELOAD_CHANNEL`; only the workers whose symbols changed are
+    restarted.
+    """
+
+    def __init__(
+        self,
+        num_process: int = settings.STREAMER_NUM_PROCESS,
+        *,
+        refresh_interval: float = settings.STREAMER_REFRESH_INTERVAL,
+        check_interval: float = 5.0,
+        stop_timeout: float = 10.0,
+    ) -> None:
+        self.ring = HashRing(num_process)
+        self.refresh_interval = refresh_interval
+        self.check_interval = check_interval
+        self.stop_timeout = stop_timeout
+        self.assignment: Dict[int, List[str]] = {}
+        self.workers: Dict[int, Process] = {}
+
+    def load_symbols(self) -> Optional[List[str]]:
+        try:
+            with deps.sync_get_db() as db:
+                return crud.ticker.get_symbols_sync(db)
+        except SQLAlchemyError as e:
+            logger.error("Error when loading tickers: {error}", error=str(e))
+            return None
+
+    def rebalance(self, symbols: List[str]) -> None:
+        for shard, shard_symbols in self.ring.partition(symbols).items():
+            if shard_symbols == self.assignment.get(shard):
+                continue
+            logger.info(
+                "Rebalancing shard {shard}: {count} symbols", shard=shard, count=len(shard_symbols)
+            )
+            self._stop(shard)
+            self.assignment[shard] = shard_symbols
+            if shard_symbols:
+                self._start(shard)
+
+    def restart_dead(self) -> None:
+        for shard, symbols in self.assignment.items():
+            worker = self.workers.get(shard)
+            if not symbols or (worker is not None and worker.is_alive()):
+                continue
+            if worker is not None:
+                logger.warning(
+                    "Worker #{pid} of shard {shard} exited with {code}, restarting",
+                    pid=worker.pid,
+                    shard=shard,
+                    code=worker.exitcode,
+                )
+            self._start(shard)
+
+    def _start(self, shard: int) -> None:
+        worker = Process(
+            target=run_worker,
+            args=(shard, self.assignment[shard]),
+            name=f"streamer-{shard}",
+            daemon=True,
+        )
+        worker.start()
+        self.workers[shard] = worker
+        logger.info("Starting worker #{pid} for shard {shard}", pid=worker.pid, shard=shard)
+
+    def _stop(self, shard: int) -> None:
+        worker = self.workers.pop(shard, None)
+        if worker is None:
+            return
+        if worker.is_alive():
+            worker.terminate()
+            worker.join(self.stop_timeout)
+            if worker.is_alive():
+                worker.kill()
+                worker.join()
+        worker.close()
+
+    def stop(self) -> None:
+        for shard in list(self.workers):
+            self._stop(shard)
+
+    def _subscribe(self) -> Optional[PubSub]:
+        try:
+            pubsub = Redis.from_url(settings.REDIS_URL).pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(settings.STREAMER_RELOAD_CHANNEL)
+            return pubsub
+        except RedisError as e:
+            logger.error("Error when subscribing to reloads: {error}", error=str(e))
+            return None
+
+    def _wait_reload(self, pubsub: Optional[PubSub], timeout: float) -> bool:
+        """Wait up to `timeout` seconds for a reload request."""
+        if pubsub is None:
+            time.sleep(timeout)
+            return False
+        try:
+            return pubsub.get_message(timeout=timeout) is not None
+        except RedisError as e:
+            logger.error("Error when waiting for reloads: {error}", error=str(e))
+            time.sleep(timeout)
+            return False
+
+    def run(self) -> None:
+        pubsub: Optional[PubSub] = None
+        next_refresh = 0.0
+        reload = True
+        try:
+            while True:
+                if pubsub is None:
+                    pubsub = self._subscribe()
+                if reload or time.monotonic() >= next_refresh:
+                    next_refresh = time.monotonic() + self.refresh_interval
+                    symbols = self.load_symbols()
+                    if symbols:
+                        self.rebalance(symbols)
+                    else:
+                        logger.warning("No tickers to stream")
+                self.restart_dead()
+                reload = self._wait_reload(pubsub, self.check_interval)
+        finally:
+            self.stop()
+            if pubsub is not None:
+                pubsub.close()
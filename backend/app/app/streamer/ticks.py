@@ -0,0 +1,70 @@
+import json
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+from app.datafeed.resample import VN_SESSION
+
+__all__ = ["Tick", "parse_vps_tick"]
+
+DAY_SECONDS = 24 * 60 * 60
+
+# Message id of matched trades in the VPS feed
+VPS_TRADE_ID = 3220
+
+
+@dataclass
+class Tick:
+    """One matched trade."""
+
+    symbol: str
+    # Unix seconds
+    time: int
+    price: float
+    volume: int
+    # Accumulated volume of the day, when the feed provides it
+    total_volume: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Tick":
+        return cls(**data)
+
+
+def _local_time(clock: str, now: float) -> int:
+    """Unix time of the exchange-local `HH:MM:SS` `clock` on the day of `now`."""
+    hours, minutes, seconds = (int(part) for part in clock.split(":"))
+    local = int(now) + VN_SESSION.utc_offset
+    day_start = local - local % DAY_SECONDS
+    return day_start + hours * 3600 + minutes * 60 + seconds - VN_SESSION.utc_offset
+
+
+def parse_vps_tick(data: Any, now: Optional[float] = None) -> Optional[Tick]:
+    """Normalize a VPS `stock` event, `None` for anything that is not a matched trade."""
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except ValueError:
+            return None
+    if not isinstance(data, dict) or data.get("id", VPS_TRADE_ID) != VPS_TRADE_ID:
+        return None
+
+    now = time.time() if now is None else now
+    try:
+        symbol = str(data["sym"])
+        price = float(data["lastPrice"])
+        volume = int(float(data["lastVol"]))
+        clock = data.get("time") or data.get("timeServer")
+        tick_time = _local_time(clock, now) if clock else int(now)
+        total_volume = data.get("totalVol")
+        return Tick(
+            symbol=symbol,
+            time=tick_time,
+            price=price,
+            volume=volume,
+            total_volume=int(float(total_volume)) if total_volume not in (None, "") else None,
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
@@ -1,61 +1,169 @@
-from typing import Optional
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Tuple
 
-import pandas as pd
 import requests
 from loguru import logger
+from redis import Redis
+from redis.exceptions import RedisError
+from sqlalchemy.exc import SQLAlchemyError
 
 from app import crud, deps, schemas
+from app.core.settings import settings
 from app.worker import app
 
 __all__ = ["task_crawl_ticker"]
 
+# (exchange, full_name, short_name) of a ticker
+Listing = Tuple[str, str, str]
 
-@app.task(name="task_crawl_ticker")
-def task_crawl_ticker() -> None:  # noqa: C901
-    # Get list of tickers from ssi
+# Never delist more than this share of the listed stocks at once, upstream is likely partial
+MAX_DELISTING_RATIO = 0.1
+
+
+def map_com_group_code_to_exchange(com_group_code: str) -> Optional[schemas.TickerExchange]:
+    if com_group_code == "UpcomIndex":
+        return schemas.TickerExchange.UPCOM
+    if com_group_code == "HNXIndex":
+        return schemas.TickerExchange.HNX
+    if com_group_code == "VNINDEX":
+        return schemas.TickerExchange.HOSE
+    return None
+
+
+def parse_listing(items: List[Dict[str, Any]]) -> Dict[str, Listing]:
+    """Listing of the ssi organizations traded on an exchange."""
+    listing: Dict[str, Listing] = {}
+    for item in items:
+        exchange = map_com_group_code_to_exchange(item.get("comGroupCode") or "")
+        if exchange is None or not item.get("ticker"):
+            continue
+        listing[item["ticker"]] = (
+            exchange.value,
+            item.get("organName") or "",
+            item.get("organShortName") or "",
+        )
+    return listing
+
+
+def listing_hash(listing: Dict[str, Listing]) -> str:
+    return hashlib.sha256(json.dumps(sorted(listing.items())).encode()).hexdigest()
 
+
+def diff_listing(
+    upstream: Dict[str, Listing], current: Dict[str, Tuple[str, str, str, str]]
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Rows to insert or update, and stocks to delete, to bring `current` to `upstream`."""
+    upserts: List[Dict[str, Any]] = []
+    for ticker, (exchange, full_name, short_name) in upstream.items():
+        row = current.get(ticker)
+        # A ticker of another type is left alone
+        if row is not None and (
+            row[3] != schemas.TickerType.vn_stock or row[:3] == (exchange, full_name, short_name)
+        ):
+            continue
+        upserts.append(
+            {
+                "ticker": ticker,
+                "exchange": exchange,
+                "name": ticker,
+                "full_name": full_name,
+                "short_name": short_name,
+                "type": schemas.TickerType.vn_stock.value,
+            }
+        )
+    # Other types are not listed by ssi
+    delistings = [
+        ticker
+        for ticker, row in current.items()
+        if row[3] == schemas.TickerType.vn_stock and ticker not in upstream
+    ]
+    return upserts, delistings
+
+
+def fetch_listing() -> Optional[Dict[str, Listing]]:
+    """Listing of ssi, `None` if it can not be fetched."""
     try:
-        tickers = requests.get(
+        items = requests.get(
             "https://fiin-core.ssi.com.vn/Master/GetListOrganization?language=vi"
         ).json()["items"]
-        tickers_df = pd.DataFrame(tickers)
+        return parse_listing(items)
     except Exception as e:
         logger.error("Error when getting tickers from ssi: {error}", error=str(e))
-        return
+        return None
+
+
+def is_synced(digest: str) -> bool:
+    """Whether the listing of hash `digest` was the last one synced."""
+    try:
+        with Redis.from_url(settings.REDIS_URL) as redis:
+            return redis.get(settings.TICKER_SYNC_HASH_KEY) == digest.encode()
+    except RedisError as e:
+        logger.error("Error when reading ticker sync hash: {error}", error=str(e))
+        return False
 
-    with deps.sync_get_db() as db:
-        tickers_db = crud.ticker.get_all_sync(db=db)
 
-        # Save ticker not has in database
-        ticker_must_create = set(tickers_df["ticker"].tolist()).difference(
-            {ticker.ticker for ticker in tickers_db}
+def guard_delistings(
+    delistings: List[str], current: Dict[str, Tuple[str, str, str, str]]
+) -> List[str]:
+    """`delistings`, or none of them if they are too many of the listed stocks."""
+    listed = sum(row[3] == schemas.TickerType.vn_stock for row in current.values())
+    if len(delistings) > MAX_DELISTING_RATIO * listed:
+        logger.warning(
+            "Not delisting {count} of {listed} tickers", count=len(delistings), listed=listed
         )
-        if not ticker_must_create:
-            return
-
-        tickers_df_must_create = tickers_df[tickers_df["ticker"].isin(ticker_must_create)]
-
-        def mapComGroupCodeToExchange(comGroupCode: str) -> Optional[schemas.TickerExchange]:
-            if comGroupCode == "UpcomIndex":
-                return schemas.TickerExchange.UPCOM
-            if comGroupCode == "HNXIndex":
-                return schemas.TickerExchange.HNX
-            if comGroupCode == "VNINDEX":
-                return schemas.TickerExchange.HOSE
-            return None
-
-        for _, row in tickers_df_must_create.iterrows():
-            try:
-                crud.ticker.create_sync(
-                    db=db,
-                    obj_in=schemas.TickerCreate(
-                        ticker=row["ticker"],
-                        exchange=mapComGroupCodeToExchange(row["comGroupCode"]),
-                        name=row["ticker"],
-                        full_name=row["organName"],
-                        short_name=row["organShortName"],
-                        type=schemas.TickerType.vn_stock,
-                    ),
-                )
-            except Exception:
-                logger.error("Error when creating ticker: {error}", row["ticker"])
+        return []
+    return delistings
+
+
+def sync_listing(upstream: Dict[str, Listing]) -> Optional[Tuple[int, int]]:
+    """Bring the stocks of the database to `upstream`, returns the number of upserts and
+    delistings, `None` on database errors."""
+    try:
+        with deps.sync_get_db() as db:
+            current = crud.ticker.get_listing_sync(db)
+            upserts, delistings = diff_listing(upstream, current)
+            delistings = guard_delistings(delistings, current)
+            if upserts or delistings:
+                crud.ticker.sync_listing_sync(db, upserts=upserts, delistings=delistings)
+    except SQLAlchemyError as e:
+        logger.error("Error when syncing tickers: {error}", error=str(e))
+        return None
+    logger.info(
+        "Synced tickers: {upserts} inserted or updated, {delistings} delisted",
+        upserts=len(upserts),
+        delistings=len(delistings),
+    )
+    return len(upserts), len(delistings)
+
+
+def notify_synced(digest: str, changed: bool) -> None:
+    """Record the listing of hash `digest` as synced, and announce the changes if `changed`."""
+    try:
+        with Redis.from_url(settings.REDIS_URL) as redis:
+            redis.set(settings.TICKER_SYNC_HASH_KEY, digest, ex=settings.TICKER_SYNC_HASH_TTL)
+            if changed:
+                # The ticker version was bumped by the sync, let the streamer rebalance its shards
+                redis.publish(settings.STREAMER_RELOAD_CHANNEL, "ticker")
+    except RedisError as e:
+        logger.error("Error when notifying ticker changes: {error}", error=str(e))
+
+
+@app.task(name="task_crawl_ticker")
+def task_crawl_ticker() -> None:
+    # Get list of tickers from ssi
+    upstream = fetch_listing()
+    if upstream is None:
+        return
+    if not upstream:
+        logger.warning("No tickers from ssi")
+        return
+
+    digest = listing_hash(upstream)
+    if is_synced(digest):
+        return
+
+    synced = sync_listing(upstream)
+    if synced is None:
+        return
+    notify_synced(digest, changed=any(synced))
@@ -0,0 +1,40 @@
+import json
+from decimal import Decimal
+from typing import List
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from app.core.serialization import dumps
+
+
+class Child(BaseModel):
+    values: List[float]
+
+
+class Parent(BaseModel):
+    client_id: str = Field(..., alias="client")
+    child: Child
+
+
+def test_models_use_field_aliases() -> None:
+    model = Parent(client="web", child=Child(values=[1.5]))
+
+    assert json.loads(dumps(model)) == {"client": "web", "child": {"values": [1.5]}}
+
+
+def test_constructed_models_are_serialized() -> None:
+    model = Parent.construct(client_id="web", child=Child.construct(values=[1.5]))
+
+    assert json.loads(dumps(model)) == {"client": "web", "child": {"values": [1.5]}}
+
+
+def test_numpy_and_other_types() -> None:
+    payload = {
+        "t": np.arange(3, dtype=np.int64)[::2],
+        "c": np.float64(1.5),
+        "price": Decimal("1.10"),
+        "tags": {"a"},
+    }
+
+    assert json.loads(dumps(payload)) == {"t": [0, 2], "c": 1.5, "price": "1.10", "tags": ["a"]}
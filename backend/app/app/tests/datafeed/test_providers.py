@@ -0,0 +1,132 @@
+import asyncio
+import time
+from typing import Any, List, Optional
+
+import numpy as np
+import pytest
+
+from app.datafeed.bars import Bars
+from app.datafeed.providers import Provider, ProviderPool
+
+
+def make_bars(close: float) -> Bars:
+    return Bars(
+        t=np.array([0], dtype=np.int64),
+        o=np.array([close]),
+        h=np.array([close]),
+        l=np.array([close]),
+        c=np.array([close]),
+        v=np.array([1], dtype=np.int64),
+    )
+
+
+class StubProvider(Provider):
+    """Answers `close` after `latency` seconds, or raises `error`."""
+
+    def __init__(
+        self, name: str, close: float, latency: float = 0.0, error: Optional[Exception] = None
+    ) -> None:
+        self.name = name
+        self.url = f"https://{name}.test/history"
+        self.close = close
+        self.latency = latency
+        self.error = error
+        self.calls = 0
+        self.cancelled = False
+
+    async def fetch(self, *args: Any) -> Bars:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return make_bars(self.close)
+
+
+def fetch(pool: ProviderPool) -> Bars:
+    return asyncio.run(pool.fetch(None, "VNM", "D", 0, 1))  # type: ignore
+
+
+def pool_of(providers: List[Provider], hedge_delay: float = 0.05) -> ProviderPool:
+    return ProviderPool(providers, hedge_delay=hedge_delay, min_hedge_delay=0.01)
+
+
+def test_provider_is_abstract() -> None:
+    with pytest.raises(TypeError):
+        Provider()  # type: ignore
+
+
+def test_fast_primary_is_not_hedged() -> None:
+    primary = StubProvider("primary", 1.0)
+    secondary = StubProvider("secondary", 2.0)
+
+    bars = fetch(pool_of([primary, secondary]))
+
+    assert bars.c[0] == 1.0
+    assert secondary.calls == 0
+
+
+def test_slow_primary_is_hedged_and_cancelled() -> None:
+    primary = StubProvider("primary", 1.0, latency=5.0)
+    secondary = StubProvider("secondary", 2.0, latency=0.01)
+    pool = pool_of([primary, secondary])
+
+    start = time.perf_counter()
+    bars = fetch(pool)
+
+    assert bars.c[0] == 2.0
+    assert time.perf_counter() - start < 1.0
+    assert primary.cancelled
+    # The losing call counts as at least as slow as the hedge delay
+    assert pool.stats["primary"].latencies[0] >= 0.05
+    assert pool.stats["primary"].failures == 0
+
+
+def test_hedge_loses_to_primary() -> None:
+    primary = StubProvider("primary", 1.0, latency=0.1)
+    secondary = StubProvider("secondary", 2.0, latency=5.0)
+
+    bars = fetch(pool_of([primary, secondary]))
+
+    assert bars.c[0] == 1.0
+    assert secondary.calls == 1
+    assert secondary.cancelled
+
+
+def test_failed_primary_fails_over() -> None:
+    primary = StubProvider("primary", 1.0, error=ValueError("down"))
+    secondary = StubProvider("secondary", 2.0)
+    pool = pool_of([primary, secondary])
+
+    bars = fetch(pool)
+
+    assert bars.c[0] == 2.0
+    assert pool.stats["primary"].failures == 1
+    assert pool.stats["secondary"].failures == 0
+
+
+def test_failed_provider_is_ranked_after_healthy_ones() -> None:
+    primary = StubProvider("primary", 1.0, error=ValueError("down"))
+    secondary = StubProvider("secondary", 2.0)
+    pool = pool_of([primary, secondary])
+
+    fetch(pool)
+    assert [provider.name for provider in pool.ranked()] == ["secondary", "primary"]
+
+    assert fetch(pool).c[0] == 2.0
+    assert primary.calls == 1
+
+
+def test_every_provider_failing_raises_the_last_error() -> None:
+    pool = pool_of(
+        [
+            StubProvider("primary", 1.0, error=ValueError("primary down")),
+            StubProvider("secondary", 2.0, latency=0.01, error=ValueError("secondary down")),
+        ]
+    )
+
+    with pytest.raises(ValueError, match="secondary down"):
+        fetch(pool)
@@ -0,0 +1,39 @@
+from typing import Any, Optional
+
+from app.datafeed.symbol_index import _Names, SEPARATOR, SymbolIndex, SymbolRecord
+
+NAMES = ["Ngân hàng  TMCP Ngoại thương ", "Công ty Sữa Việt Nam", "Tập đoàn Vingroup"]
+
+
+class StubRedis:
+    async def get(self, key: str) -> Optional[Any]:
+        return None
+
+
+def test_names_map_matches_back_to_their_symbol() -> None:
+    names = _Names(NAMES)
+
+    assert list(names.find("tap", SEPARATOR)) == [2]
+    assert list(names.find("viet")) == [1]
+    assert list(names.find("ngoai thuong")) == [0]
+
+
+def test_names_find_every_match_after_folded_names() -> None:
+    names = _Names(["  Đông Á ", "Sữa   Đông", "đông"])
+
+    assert list(names.find("dong", SEPARATOR)) == [0, 2]
+    assert list(names.find("dong")) == [0, 1, 2]
+
+
+def test_search_names_with_accents_and_extra_spaces() -> None:
+    index = SymbolIndex(StubRedis())  # type: ignore
+    index.build(
+        [
+            SymbolRecord("VCB", "HOSE", "vn_stock", "stock", "Vietcombank", NAMES[0]),
+            SymbolRecord("VNM", "HOSE", "vn_stock", "stock", "Vinamilk", NAMES[1]),
+            SymbolRecord("VIC", "HOSE", "vn_stock", "stock", "Vingroup", NAMES[2]),
+        ]
+    )
+
+    assert [record.ticker for record in index.search("tập đoàn", 10)] == ["VIC"]
+    assert [record.ticker for record in index.search("sua viet", 10)] == ["VNM"]
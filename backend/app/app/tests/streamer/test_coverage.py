@@ -0,0 +1,64 @@
+import asyncio
+import math
+from typing import Any, List, Optional, Tuple
+
+from app.streamer.bar_builder import BarBuilder
+from app.streamer.coverage import LiveCoverage
+
+# 2023-01-03 10:00:00 in Asia/Ho_Chi_Minh
+TEN_AM = 1672704000 + 3 * 60 * 60
+
+
+class StubStore:
+    def __init__(self) -> None:
+        self.coverage: List[Tuple[str, List[str], int, int]] = []
+
+    async def put_coverage_many(self, resolution: str, symbols: Any, start: int, end: int) -> None:
+        if end >= start:
+            self.coverage.append((resolution, list(symbols), start, end))
+
+
+def extend(
+    coverage: LiveCoverage, store: StubStore, connected_since: Optional[float], now: float
+) -> None:
+    closed_until = min(coverage.builder.closed_until(now), now)
+    asyncio.run(coverage.extend(store, connected_since, closed_until))  # type: ignore
+
+
+def test_range_starts_after_the_connection_minute() -> None:
+    store = StubStore()
+    coverage = LiveCoverage(BarBuilder(["VNM", "VIC"]))
+
+    extend(coverage, store, TEN_AM + 30, TEN_AM + 90)
+    assert store.coverage == []
+
+    extend(coverage, store, TEN_AM + 30, TEN_AM + 150)
+    extend(coverage, store, TEN_AM + 30, TEN_AM + 210)
+    assert store.coverage == [
+        ("1", ["VNM", "VIC"], TEN_AM + 60, TEN_AM + 119),
+        ("1", ["VNM", "VIC"], TEN_AM + 60, TEN_AM + 179),
+    ]
+
+
+def test_reconnect_and_lost_bars_restart_the_range() -> None:
+    store = StubStore()
+    coverage = LiveCoverage(BarBuilder(["VNM"]))
+
+    extend(coverage, store, TEN_AM, TEN_AM + 150)
+    coverage.reset(TEN_AM + 120)
+    extend(coverage, store, TEN_AM, TEN_AM + 210)
+    extend(coverage, store, None, TEN_AM + 270)
+    extend(coverage, store, TEN_AM + 290, TEN_AM + 420)
+
+    assert [(start, end) for _, _, start, end in store.coverage] == [
+        (TEN_AM + 60, TEN_AM + 119),
+        (TEN_AM + 120, TEN_AM + 179),
+        (TEN_AM + 300, TEN_AM + 419),
+    ]
+
+
+def test_every_bar_is_closed_after_the_last_session() -> None:
+    builder = BarBuilder(["VNM"])
+
+    assert builder.closed_until(TEN_AM + 30) == TEN_AM
+    assert builder.closed_until(TEN_AM + 5 * 60 * 60) == math.inf
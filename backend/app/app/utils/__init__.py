@@ -1,3 +1,5 @@
 from .fastapi_pagination import *
 from .file import *
+from .singleflight import *
 from .sql_datetime import *
+from .text import *
@@ -1,11 +1,85 @@
-from typing import Tuple
+from enum import Enum
+from typing import Any, Generic, Optional, Sequence, Tuple, TypeVar
 
-from fastapi_pagination.bases import AbstractParams
+from fastapi import HTTPException, Query, status
+from fastapi_pagination.bases import AbstractParams, CursorRawParams
+from fastapi_pagination.cursor import CursorPage, decode_cursor, encode_cursor
+from pydantic import BaseModel, Field
 
-__all__ = ["get_limit_offset"]
+__all__ = [
+    "get_limit_offset",
+    "TotalMode",
+    "KeysetParams",
+    "KeysetPage",
+    "get_keyset",
+    "create_keyset_page",
+]
+
+T = TypeVar("T")
 
 
 def get_limit_offset(params: AbstractParams) -> Tuple[int, int]:
     raw_params = params.to_raw_params()
     limit, offset = raw_params.limit, raw_params.offset
     return limit, offset
+
+
+class TotalMode(str, Enum):
+    none = "none"
+    estimate = "estimate"
+    exact = "exact"
+
+
+class KeysetParams(BaseModel, AbstractParams):
+    cursor: Optional[str] = Query(None, description="Cursor of the page")
+    size: int = Query(50, ge=1, le=100, description="Page size")
+    total: TotalMode = Query(TotalMode.estimate, description="How to count the items")
+
+    def to_raw_params(self) -> CursorRawParams:
+        return CursorRawParams(cursor=decode_cursor(self.cursor), size=self.size)
+
+
+class KeysetPage(CursorPage[T], Generic[T]):
+    total: Optional[int] = Field(None, description="Number of items, estimated if requested")
+
+    __params_type__ = KeysetParams
+
+
+def get_keyset(params: KeysetParams) -> Tuple[Optional[int], Optional[int], int]:
+    """`after_id`, `before_id` and the page size of the opaque cursor of `params`.
+
+    A cursor is "a:<id>" for the page after id, "b:<id>" for the page before it.
+    """
+    try:
+        raw_params = params.to_raw_params()
+        if raw_params.cursor is None:
+            return None, None, raw_params.size
+        direction, id = str(raw_params.cursor).split(":")
+        if direction not in ("a", "b"):
+            raise ValueError(direction)
+        return (
+            int(id) if direction == "a" else None,
+            int(id) if direction == "b" else None,
+            raw_params.size,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from e
+
+
+def create_keyset_page(
+    items: Sequence[Any],
+    params: KeysetParams,
+    *,
+    has_more: bool,
+    total: Optional[int] = None,
+) -> KeysetPage:
+    """Page of `items` read with `get_keyset(params)`, `has_more` if rows remain past them."""
+    after_id, before_id, _ = get_keyset(params)
+    backward = after_id is None and before_id is not None
+    next_page = previous_page = None
+    if items:
+        if has_more or backward:
+            next_page = encode_cursor(f"a:{items[-1].id}")
+        if (has_more and backward) or after_id is not None:
+            previous_page = encode_cursor(f"b:{items[0].id}")
+    return KeysetPage(items=items, next_page=next_page, previous_page=previous_page, total=total)
@@ -0,0 +1,34 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, TypeVar
+
+__all__ = ["SingleFlight"]
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """Coalesce concurrent calls with the same key into one in-flight task.
+
+    The task is shielded, so a caller that gets cancelled (e.g. client disconnect) does not
+    cancel the work the other callers are waiting on.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, "asyncio.Future[T]"] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = asyncio.ensure_future(fn())
+            call.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(call)
+
+    def _forget(self, key: Hashable, call: "asyncio.Future[T]") -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Mark the exception as retrieved when every caller went away
+        if not call.cancelled():
+            call.exception()
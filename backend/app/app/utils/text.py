@@ -0,0 +1,35 @@
+import re
+import unicodedata
+from typing import Set
+
+__all__ = ["fold_diacritics", "trigrams"]
+
+_whitespace_re = re.compile(r"\s+")
+
+
+def fold_diacritics(text: str) -> str:
+    """Lower-case `text` without diacritics, so that "Ngân hàng Đông Á" and "ngan hang dong a"
+    compare equal.
+
+    >>> fold_diacritics("Sữa Việt  Nam")
+    'sua viet nam'
+    """
+    # "đ" is a letter of its own rather than "d" with a mark, NFKD does not split it
+    text = text.replace("đ", "d").replace("Đ", "D")
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return _whitespace_re.sub(" ", text).strip().lower()
+
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of the words of `text`, padded like `pg_trgm` so that word starts and
+    ends count.
+
+    >>> sorted(trigrams("vnm"))
+    ['  v', ' vn', 'nm ', 'vnm']
+    """
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
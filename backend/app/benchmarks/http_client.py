@@ -0,0 +1,77 @@
+"""Cold vs warm upstream request latency against a local stub server.
+
+Run from `backend/app` (the app settings must be loadable, e.g. inside the backend container):
+
+    python -m benchmarks.http_client --requests 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, List
+
+import httpx
+
+from app.core.http_client import HttpClients
+
+BODY = b'{"s":"ok","t":[1673596800],"o":[27.8],"h":[27.9],"l":[27.7],"c":[27.85],"v":[22100]}'
+
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    # Minimal HTTP/1.1 keep-alive server: read headers, answer with a fixed payload
+    try:
+        while await reader.readuntil(b"\r\n\r\n"):
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(BODY)}\r\n\r\n".encode()
+                + BODY
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+
+async def measure(n: int, request: Callable[[], Awaitable[httpx.Response]]) -> List[float]:
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        (await request()).raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(name: str, latencies: List[float]) -> None:
+    latencies = sorted(latencies)
+    print(  # noqa: T201
+        f"{name:>5}: mean {statistics.mean(latencies):.3f} ms, "
+        f"p50 {latencies[len(latencies) // 2]:.3f} ms, "
+        f"p95 {latencies[int(len(latencies) * 0.95)]:.3f} ms"
+    )
+
+
+async def main(n: int) -> None:
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/dchart/api/history"
+
+    async def cold() -> httpx.Response:
+        async with httpx.AsyncClient(http2=True) as client:
+            return await client.get(url)
+
+    clients = HttpClients()
+
+    async def warm() -> httpx.Response:
+        return await clients.for_url(url).get(url)
+
+    async with server:
+        report("cold", await measure(n, cold))
+        report("warm", await measure(n, warm))
+        await clients.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    asyncio.run(main(parser.parse_args().requests))
@@ -0,0 +1,121 @@
+"""Default FastAPI response serialization vs `FastJSONResponse` on representative payloads.
+
+Run from `backend/app` (the app settings must be loadable, e.g. inside the backend container):
+
+    python -m benchmarks.json_encoding --bars 100000 --repeat 5
+"""
+import argparse
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app import schemas
+from app.core.serialization import FastJSONResponse
+from app.datafeed import Bars, bars_json
+from app.schemas.response import Status, SuccessfulResponse
+
+
+def history_bars(n: int) -> Bars:
+    rng = np.random.default_rng(0)
+    c = 25 + np.cumsum(rng.normal(0, 0.05, n)).round(2)
+    return Bars(
+        t=1_500_000_000 + np.arange(n, dtype=np.int64) * 60,
+        o=c,
+        h=c + 0.1,
+        l=c - 0.1,
+        c=c,
+        v=rng.integers(100, 100_000, n),
+    )
+
+
+def chart_layout(sources: int, points: int) -> Dict[str, Any]:
+    # Shape of a TradingView saved layout: panes of sources with drawing points and styles
+    return {
+        "name": "layout",
+        "layout": "s",
+        "charts": [
+            {
+                "panes": [
+                    {
+                        "sources": [
+                            {
+                                "type": "LineToolTrendLine",
+                                "id": f"src{i}",
+                                "state": {"linecolor": "#2196f3", "linewidth": 2, "visible": True},
+                                "points": [
+                                    {"time_t": 1_500_000_000 + j * 60, "offset": 0, "price": j / 7}
+                                    for j in range(points)
+                                ],
+                            }
+                            for i in range(sources)
+                        ]
+                    }
+                ]
+            }
+        ],
+    }
+
+
+def measure(repeat: int, render: Callable[[], bytes]) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name: str, timings: List[float], size: int) -> None:
+    print(  # noqa: T201
+        f"{name:>24}: mean {statistics.mean(timings):9.3f} ms, "
+        f"min {min(timings):9.3f} ms, {size / 1024:9.1f} KiB"
+    )
+
+
+def compare(
+    name: str, repeat: int, default: Callable[[], bytes], fast: Callable[[], bytes]
+) -> None:
+    report(f"{name} (default)", measure(repeat, default), len(default()))
+    report(f"{name} (fast)", measure(repeat, fast), len(fast()))
+
+
+def main(n: int, repeat: int) -> None:
+    bars = history_bars(n)
+    compare(
+        "history",
+        repeat,
+        # Response model validation, jsonable_encoder and json.dumps
+        lambda: JSONResponse(
+            jsonable_encoder(schemas.tradingview.HistoryFullDataResponse(s="ok", **bars.to_dict()))
+        ).body,
+        lambda: bars_json(bars),
+    )
+
+    chart = schemas.ChartGet(
+        id=1,
+        name="layout",
+        timestamp=0,
+        symbol="VNM",
+        resolution="D",
+        content=chart_layout(200, 500),
+    )
+    compare(
+        "chart",
+        repeat,
+        lambda: JSONResponse(
+            jsonable_encoder(SuccessfulResponse(data=chart, status=Status.ok))
+        ).body,
+        lambda: FastJSONResponse(SuccessfulResponse(data=chart, status=Status.ok)).body,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bars", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.bars, args.repeat)
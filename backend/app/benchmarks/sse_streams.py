@@ -0,0 +1,199 @@
+"""Hold many idle `/tradingview/stream/sse` connections on a single uvicorn worker.
+
+Starts `app.main:app` with one worker, opens `--streams` event streams subscribed to the quotes
+of `--symbol`, keeps them idle for `--hold` seconds (the server only sends keep-alives), then
+publishes one tick and measures how long every stream takes to receive it. Run from
+`backend/app` with the app services reachable, e.g. inside the backend container:
+
+    python -m benchmarks.sse_streams --streams 10000 --hold 60
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from redis.asyncio import Redis
+
+from app.core.settings import settings
+from app.datafeed import tick_channel
+
+
+class Stream:
+    def __init__(self) -> None:
+        self.keep_alives = 0
+        self.received: Optional[float] = None
+        self.closed = False
+
+
+def rss_mib(pid: int) -> float:
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def wait_ready(port: int, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def open_stream(port: int, path: str, stream: Stream, opened: asyncio.Event) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAccept: text/event-stream\r\n\r\n".encode()
+    )
+    head = await reader.readuntil(b"\r\n\r\n")
+    if not head.startswith(b"HTTP/1.1 200"):
+        raise RuntimeError(head.split(b"\r\n", 1)[0].decode())
+    opened.set()
+    try:
+        # Chunked transfer encoding: only look for the event lines
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.startswith(b": keep-alive"):
+                stream.keep_alives += 1
+            elif line.startswith(b"event: quote") and stream.received is None:
+                stream.received = time.perf_counter()
+    finally:
+        stream.closed = True
+        writer.close()
+
+
+def start_server(port: int, batch: int, keep_alive: float) -> "subprocess.Popen[bytes]":
+    return subprocess.Popen(  # noqa: S603
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--port",
+            str(port),
+            "--workers",
+            "1",
+            "--backlog",
+            str(max(batch, 2048)),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ],
+        env={**os.environ, "STREAM_KEEPALIVE_INTERVAL": str(keep_alive)},
+    )
+
+
+async def open_streams(
+    port: int, path: str, streams: List[Stream], batch: int, tasks: List["asyncio.Task[None]"]
+) -> None:
+    """Open `streams` `batch` at a time, adding their reader tasks to `tasks`."""
+    for i in range(0, len(streams), batch):
+        opened = [asyncio.Event() for _ in streams[i : i + batch]]
+        for stream, event in zip(streams[i : i + batch], opened):
+            tasks.append(asyncio.ensure_future(open_stream(port, path, stream, event)))
+        await asyncio.gather(*(event.wait() for event in opened))
+
+
+async def measure_tick(redis: Redis, symbol: str, streams: List[Stream]) -> List[float]:
+    """Publish one tick of `symbol`, latencies in milliseconds of the streams that received it."""
+    sent = time.perf_counter()
+    await redis.publish(
+        tick_channel(symbol), json.dumps({"time": int(time.time()), "price": 1, "volume": 1})
+    )
+    deadline = sent + 30
+    while time.perf_counter() < deadline:
+        if all(stream.received is not None for stream in streams):
+            break
+        await asyncio.sleep(0.05)
+    return sorted(
+        (stream.received - sent) * 1000 for stream in streams if stream.received is not None
+    )
+
+
+def report_idle(streams: List[Stream], hold: float, base_rss: float, idle_rss: float) -> None:
+    n = len(streams)
+    open_count = sum(not stream.closed for stream in streams)
+    alive = sum(stream.keep_alives > 0 for stream in streams)
+    print(  # noqa: T201
+        f"after {hold:.0f} s idle: {open_count} open, {alive} got keep-alives, "
+        f"server RSS {base_rss:.0f} -> {idle_rss:.0f} MiB "
+        f"({(idle_rss - base_rss) * 1024 / n:.1f} KiB per stream)"
+    )
+
+
+def report_delivery(latencies: List[float], n: int) -> None:
+    if not latencies:
+        print("tick delivered to no stream")  # noqa: T201
+        return
+    print(  # noqa: T201
+        f"tick delivered to {len(latencies)}/{n} streams: "
+        f"p50 {statistics.median(latencies):.0f} ms, "
+        f"p99 {latencies[int(len(latencies) * 0.99)]:.0f} ms, "
+        f"max {latencies[-1]:.0f} ms"
+    )
+
+
+async def main(n: int, hold: float, symbol: str, batch: int, keep_alive: float) -> None:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    # Both ends of every connection live on this host
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    if hard < 2 * n + 1024:
+        print(f"RLIMIT_NOFILE {hard} is too low for {n} streams")  # noqa: T201
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = start_server(port, batch, keep_alive)
+    tasks: List["asyncio.Task[None]"] = []
+    redis = Redis.from_url(settings.REDIS_URL)
+    try:
+        await wait_ready(port)
+        base_rss = rss_mib(server.pid)
+        path = f"{settings.PREFIX}{settings.API_V0_STR}/tradingview/stream/sse?quotes={symbol}"
+
+        streams = [Stream() for _ in range(n)]
+        start = time.perf_counter()
+        await open_streams(port, path, streams, batch, tasks)
+        print(f"opened {n} streams in {time.perf_counter() - start:.2f} s")  # noqa: T201
+
+        await asyncio.sleep(hold)
+        # Forget the seeded quote sent on subscribe
+        for stream in streams:
+            stream.received = None
+        report_idle(streams, hold, base_rss, rss_mib(server.pid))
+
+        report_delivery(await measure_tick(redis, symbol, streams), n)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await redis.close()
+        server.terminate()
+        server.wait()
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--streams", type=int, default=10_000)
+    parser.add_argument("--hold", type=float, default=60.0)
+    parser.add_argument("--symbol", default="VNM")
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--keep-alive", type=float, default=15.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.streams, args.hold, args.symbol, args.batch, args.keep_alive))
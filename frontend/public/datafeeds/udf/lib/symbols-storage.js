@@ -12,7 +12,7 @@ function symbolKey(symbol, currency, unit) {
 }
 export class SymbolsStorage {
     constructor(datafeedUrl, datafeedSupportedResolutions, requester) {
-        this._exchangesList = ['NYSE', 'FOREX', 'AMEX'];
+        this._exchangesList = ['HOSE', 'HNX', 'UPCOM'];
         this._symbolsInfo = {};
         this._symbolsList = [];
         this._datafeedUrl = datafeedUrl;
@@ -89,7 +89,7 @@ function symbolKey(symbol: string, currency?: string, unit?: string): string {
 }
 
 export class SymbolsStorage {
-	private readonly _exchangesList: string[] = ['NYSE', 'FOREX', 'AMEX'];
+	private readonly _exchangesList: string[] = ['HOSE', 'HNX', 'UPCOM'];
 	private readonly _symbolsInfo: SymbolInfoMap = {};
 	private readonly _symbolsList: string[] = [];
 	private readonly _datafeedUrl: string;